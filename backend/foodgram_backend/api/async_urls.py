@@ -0,0 +1,54 @@
+from django.urls import include, path
+
+from .async_views import AsyncReadView
+from .views import (
+    CustomUserViewSet,
+    TagsViewSet,
+    IngredientsViewSet,
+    RecipesViewSet
+)
+
+urlpatterns = [
+    path(
+        'users/subscriptions/',
+        AsyncReadView(
+            CustomUserViewSet, {'get': 'get_subscriptions'}).as_view(),
+        name='users-get_subscriptions'
+    ),
+    path(
+        'tags/',
+        AsyncReadView(TagsViewSet, {'get': 'list'}).as_view(),
+        name='tags-list'
+    ),
+    path(
+        'tags/<int:pk>/',
+        AsyncReadView(TagsViewSet, {'get': 'retrieve'}).as_view(),
+        name='tags-detail'
+    ),
+    path(
+        'ingredients/',
+        AsyncReadView(IngredientsViewSet, {'get': 'list'}).as_view(),
+        name='ingredients-list'
+    ),
+    path(
+        'ingredients/<int:pk>/',
+        AsyncReadView(IngredientsViewSet, {'get': 'retrieve'}).as_view(),
+        name='ingredients-detail'
+    ),
+    path(
+        'recipes/',
+        AsyncReadView(
+            RecipesViewSet, {'get': 'list', 'post': 'create'}).as_view(),
+        name='recipes-list'
+    ),
+    path(
+        'recipes/<int:pk>/',
+        AsyncReadView(
+            RecipesViewSet,
+            {'get': 'retrieve', 'patch': 'partial_update',
+             'delete': 'destroy'}
+        ).as_view(),
+        name='recipes-detail'
+    ),
+    path('', include('api.urls')),
+]
@@ -0,0 +1,73 @@
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.db import close_old_connections
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.ASYNC_ORM_WORKERS,
+    thread_name_prefix='async-orm'
+)
+
+
+def call_in_worker(func, *args, **kwargs):
+    """Вызывает функцию в потоке пула и закрывает устаревшие соединения."""
+    try:
+        return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+async def run_in_executor(func, *args, **kwargs):
+    """Выполняет блокирующую функцию в ограниченном пуле потоков.
+
+    Функция видит контекстные переменные вызывающей задачи, в том числе
+    показатели текущего запроса.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+        executor,
+        partial(context.run, call_in_worker, func, *args, **kwargs)
+    )
+
+
+class AsyncReadView:
+    """Асинхронное представление для чтения поверх набора представлений DRF.
+
+    Запрос обрабатывается синхронным представлением действий actions
+    набора viewset_class, а ответ отрисовывается в том же вызове пула
+    потоков executor. Все запросы к базе данных одного запроса API идут
+    через одно подключение, которое закрывается один раз по окончании
+    обработки. Параметры дополнительных действий, например
+    permission_classes, применяются так же, как при регистрации в роутере.
+    """
+
+    def __init__(self, viewset_class, actions):
+        self.viewset_class = viewset_class
+        self.actions = dict(actions)
+        if 'get' in actions:
+            self.actions.setdefault('head', actions['get'])
+        initkwargs = {}
+        for action in actions.values():
+            initkwargs.update(
+                getattr(getattr(viewset_class, action), 'kwargs', {}))
+        self.sync_view = viewset_class.as_view(self.actions, **initkwargs)
+
+    def as_view(self):
+        """Метод получения асинхронной функции представления."""
+        async def view(request, *args, **kwargs):
+            return await run_in_executor(
+                self.respond, request, *args, **kwargs)
+
+        view.csrf_exempt = True
+        return view
+
+    def respond(self, request, *args, **kwargs):
+        """Метод формирования и отрисовки ответа в потоке пула."""
+        response = self.sync_view(request, *args, **kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+        return response
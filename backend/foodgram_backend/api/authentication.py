@@ -0,0 +1,110 @@
+import copy
+import logging
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.authentication import TokenAuthentication
+
+from .cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+token_cache = LRUCache(settings.TOKEN_CACHE_SIZE, settings.TOKEN_CACHE_TIMEOUT)
+
+
+class TokenCacheStats:
+    """Счётчики попаданий в кэш токенов текущего процесса."""
+
+    def __init__(self):
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def record(self, counter):
+        """Метод учёта обращения к кэшу с периодической записью в лог."""
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+            total = self.hits + self.shared_hits + self.misses
+        if total % settings.TOKEN_CACHE_STATS_INTERVAL == 0:
+            logger.info('Кэш токенов: %s', self.as_dict())
+
+    def as_dict(self):
+        """Метод получения счётчиков и доли попаданий."""
+        total = self.hits + self.shared_hits + self.misses
+        return {
+            'hits': self.hits,
+            'shared_hits': self.shared_hits,
+            'misses': self.misses,
+            'hit_rate': round(
+                (self.hits + self.shared_hits) / total, 4) if total else 0.0,
+        }
+
+    def reset(self):
+        """Метод обнуления счётчиков."""
+        with self._lock:
+            self.hits = self.shared_hits = self.misses = 0
+
+
+token_cache_stats = TokenCacheStats()
+
+
+def get_shared_token_cache():
+    """Возвращает общий кэш токенов или None, если он не настроен."""
+    if settings.TOKEN_CACHE_ALIAS is None:
+        return None
+    return caches[settings.TOKEN_CACHE_ALIAS]
+
+
+def get_shared_token_key(key):
+    return f'auth:token:{key}'
+
+
+def invalidate_tokens(*keys):
+    """Удаляет токены из кэша процесса и общего кэша."""
+    shared_cache = get_shared_token_cache()
+    for key in keys:
+        token_cache.delete(key)
+        if shared_cache is not None:
+            shared_cache.delete(get_shared_token_key(key))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Аутентификация по токену с кэшированием пары токен - пользователь.
+
+    Пара хранится в ограниченном LRU-кэше процесса с временем жизни
+    TOKEN_CACHE_TIMEOUT и, если задан TOKEN_CACHE_ALIAS, в общем кэше
+    Django. Записи удаляются при выходе из системы и при изменении или
+    удалении пользователя, а в других процессах устаревают по времени
+    жизни.
+    """
+
+    def authenticate_credentials(self, key):
+        credentials = token_cache.get(key)
+        if credentials is not None:
+            token_cache_stats.record('hits')
+            return self.copy_credentials(credentials)
+        shared_cache = get_shared_token_cache()
+        if shared_cache is not None:
+            credentials = shared_cache.get(get_shared_token_key(key))
+            if credentials is not None:
+                token_cache_stats.record('shared_hits')
+                token_cache.set(key, credentials)
+                return self.copy_credentials(credentials)
+        token_cache_stats.record('misses')
+        credentials = super().authenticate_credentials(key)
+        token_cache.set(key, credentials)
+        if shared_cache is not None:
+            shared_cache.set(
+                get_shared_token_key(key),
+                credentials,
+                settings.TOKEN_CACHE_SHARED_TIMEOUT
+            )
+        return self.copy_credentials(credentials)
+
+    @staticmethod
+    def copy_credentials(credentials):
+        """Метод копирования пользователя, чтобы запросы не делили объект."""
+        user, token = credentials
+        return copy.copy(user), token
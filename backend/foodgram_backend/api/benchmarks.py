@@ -0,0 +1,528 @@
+import json
+import statistics
+import time
+import tracemalloc
+from collections import namedtuple
+from contextlib import contextmanager, nullcontext
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from foodgram_backend.compression import ENCODINGS, compress
+from users.models import CustomUser, Subscription
+from recipes.models import (
+    Favorites,
+    Ingredient,
+    IngredientsInRecipe,
+    Recipe,
+    ShoppingCart,
+    ShoppingTotal,
+    Tag
+)
+from .authentication import token_cache, token_cache_stats
+from .cache import bump_catalog_version, get_recipe_cache
+from .relations import relations_cache
+from .renderers import FastJSONRenderer
+from .representations import IngredientListSerializer, RecipeListSerializer
+from .serializers import IngredientSerializer, RecipeSerializer
+
+BATCH_SIZE = 10000
+
+SMALL_PAGE = 2
+
+LARGE_PAGE = 20
+
+DEFAULT_SCALE = {
+    'users': 100,
+    'recipes': 1000,
+    'ingredients': 500,
+    'ingredients_per_recipe': 10,
+    'tags': 10,
+    'tags_per_recipe': 2,
+    'subscriptions': 20,
+    'favorites': 50,
+    'shopping_cart': 20,
+}
+
+Endpoint = namedtuple(
+    'Endpoint',
+    ('name', 'url_name', 'kwargs', 'params', 'method', 'paginated',
+     'max_queries'),
+)
+
+
+def get_endpoints(recipe_id, author_id, tag_id, ingredient_id):
+    """Возвращает список замеряемых эндпоинтов и их потолки запросов."""
+    return [
+        Endpoint('users-list', 'users-list', {}, {}, 'get', True, 2),
+        Endpoint('users-detail', 'users-detail', {'id': author_id}, {},
+                 'get', False, 1),
+        Endpoint('users-me', 'users-me', {}, {}, 'get', False, 0),
+        Endpoint('users-get_subscriptions', 'users-get_subscriptions', {},
+                 {'recipes_limit': 3}, 'get', True, 3),
+        Endpoint('users-subscribe', 'users-add_delete_subscription',
+                 {'user_id': author_id}, {}, 'post', False, 4),
+        Endpoint('users-unsubscribe', 'users-add_delete_subscription',
+                 {'user_id': author_id}, {}, 'delete', False, 2),
+        Endpoint('tags-list', 'tags-list', {}, {}, 'get', False, 1),
+        Endpoint('tags-detail', 'tags-detail', {'pk': tag_id}, {}, 'get',
+                 False, 1),
+        Endpoint('ingredients-list', 'ingredients-list', {}, {}, 'get',
+                 False, 1),
+        Endpoint('ingredients-name', 'ingredients-list', {},
+                 {'name': 'Ингредиент 1'}, 'get', False, 1),
+        Endpoint('ingredients-search', 'ingredients-list', {},
+                 {'search': 'диент 1'}, 'get', False, 1),
+        Endpoint('ingredients-detail', 'ingredients-detail',
+                 {'pk': ingredient_id}, {}, 'get', False, 1),
+        Endpoint('recipes-list', 'recipes-list', {}, {}, 'get', True, 4),
+        Endpoint('recipes-list-popular', 'recipes-list', {},
+                 {'ordering': '-favorites_count'}, 'get', True, 4),
+        Endpoint('recipes-list-filtered', 'recipes-list', {},
+                 {'is_favorited': 1, 'tags': 'tag-1'}, 'get', True, 4),
+        Endpoint('recipes-list-tags-any', 'recipes-list', {},
+                 {'tags': [f'tag-{number}' for number in range(1, 21)]},
+                 'get', True, 4),
+        Endpoint('recipes-list-tags-all', 'recipes-list', {},
+                 {'tags': ['tag-1', 'tag-2'], 'tags_mode': 'all'},
+                 'get', True, 4),
+        Endpoint('recipes-search', 'recipes-list', {},
+                 {'search': 'рецепт 12'}, 'get', True, 4),
+        Endpoint('recipes-detail', 'recipes-detail', {'pk': recipe_id}, {},
+                 'get', False, 3),
+        Endpoint('recipes-download_shopping_cart',
+                 'recipes-download_shopping_cart', {}, {'format': 'json'},
+                 'get', False, 1),
+        Endpoint('recipes-shopping_cart_summary',
+                 'recipes-shopping_cart_summary', {}, {}, 'get', False, 1),
+        Endpoint('recipes-favorite', 'recipes-add_delete_from_favorites',
+                 {'recipe_id': recipe_id}, {}, 'post', False, 4),
+        Endpoint('recipes-unfavorite', 'recipes-add_delete_from_favorites',
+                 {'recipe_id': recipe_id}, {}, 'delete', False, 3),
+        Endpoint('recipes-shopping_cart',
+                 'recipes-add_delete_from_sopping_cart',
+                 {'recipe_id': recipe_id}, {}, 'post', False, 6),
+        Endpoint('recipes-remove_shopping_cart',
+                 'recipes-add_delete_from_sopping_cart',
+                 {'recipe_id': recipe_id}, {}, 'delete', False, 6),
+    ]
+
+
+def chunked(iterable, size=BATCH_SIZE):
+    """Разбивает итерируемый объект на списки длиной не более size."""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def bulk_insert(model, objects):
+    """Сохраняет объекты пачками внутри одной транзакции."""
+    with transaction.atomic():
+        for chunk in chunked(objects):
+            model.objects.bulk_create(chunk)
+
+
+def generate_data(scale=None):
+    """Наполняет базу данных синтетическими данными для замеров.
+
+    Первичные ключи назначаются явно, поэтому связи создаются без
+    повторных запросов за идентификаторами. Возвращает пользователя,
+    от имени которого выполняются запросы.
+    """
+    scale = {**DEFAULT_SCALE, **(scale or {})}
+    password = make_password('benchmark')
+    users_count = scale['users']
+    recipes_count = scale['recipes']
+    bulk_insert(CustomUser, (
+        CustomUser(
+            id=number,
+            username=f'user{number}',
+            email=f'user{number}@foodgram.ru',
+            first_name='Имя',
+            last_name='Фамилия',
+            password=password,
+        ) for number in range(1, users_count + 1)
+    ))
+    bulk_insert(Tag, (
+        Tag(
+            id=number,
+            name=f'Тег {number}',
+            color=f'#{number:06X}',
+            slug=f'tag-{number}',
+        ) for number in range(1, scale['tags'] + 1)
+    ))
+    bulk_insert(Ingredient, (
+        Ingredient(
+            id=number,
+            name=f'Ингредиент {number}',
+            measurement_unit='г',
+        ) for number in range(1, scale['ingredients'] + 1)
+    ))
+    bulk_insert(Recipe, (
+        Recipe(
+            id=number,
+            name=f'Рецепт {number}',
+            text='Описание рецепта. ' * 20,
+            image='recipes/images/benchmark.jpg',
+            cooking_time=number % 120 + 1,
+            author_id=number % users_count + 1,
+            ingredients_count=min(
+                scale['ingredients_per_recipe'], scale['ingredients']),
+        ) for number in range(1, recipes_count + 1)
+    ))
+    bulk_insert(IngredientsInRecipe, (
+        IngredientsInRecipe(
+            recipe_id=recipe_id,
+            ingredient_id=(
+                (recipe_id * 7 + offset) % scale['ingredients'] + 1),
+            amount=offset + 1,
+        )
+        for recipe_id in range(1, recipes_count + 1)
+        for offset in range(
+            min(scale['ingredients_per_recipe'], scale['ingredients']))
+    ))
+    bulk_insert(Recipe.tags.through, (
+        Recipe.tags.through(
+            recipe_id=recipe_id,
+            tag_id=(recipe_id + offset) % scale['tags'] + 1,
+        )
+        for recipe_id in range(1, recipes_count + 1)
+        for offset in range(min(scale['tags_per_recipe'], scale['tags']))
+    ))
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(
+            no_style(), [CustomUser, Tag, Ingredient, Recipe]
+        ):
+            cursor.execute(sql)
+    bump_catalog_version('tags')
+    bump_catalog_version('ingredients')
+    relations_cache.clear()
+    token_cache.clear()
+    get_recipe_cache().clear()
+    viewer = CustomUser.objects.get(pk=1)
+    bulk_insert(Subscription, (
+        Subscription(subscriber=viewer, subscribed_to_id=author_id)
+        for author_id in range(
+            2, min(scale['subscriptions'] + 2, users_count + 1))
+    ))
+    bulk_insert(Favorites, (
+        Favorites(user=viewer, recipe_id=recipe_id)
+        for recipe_id in range(
+            2, min(scale['favorites'] + 2, recipes_count + 1))
+    ))
+    bulk_insert(ShoppingCart, (
+        ShoppingCart(user=viewer, recipe_id=recipe_id)
+        for recipe_id in range(
+            2, min(scale['shopping_cart'] + 2, recipes_count + 1))
+    ))
+    Recipe.objects.reconcile_counters()
+    Recipe.objects.update_search_index()
+    ShoppingTotal.objects.rebuild()
+    return viewer
+
+
+@contextmanager
+def query_counter(counts):
+    """Добавляет в список число запросов к базе данных, выполненных в блоке."""
+    with CaptureQueriesContext(connection) as queries:
+        yield
+    counts.append(len(queries.captured_queries))
+
+
+@contextmanager
+def timer(durations):
+    """Добавляет в список время выполнения блока в миллисекундах."""
+    started = time.perf_counter()
+    yield
+    durations.append((time.perf_counter() - started) * 1000)
+
+
+@contextmanager
+def memory_tracer(peaks):
+    """Добавляет в список пиковый объём памяти, выделенной в блоке."""
+    tracemalloc.start()
+    try:
+        yield
+        peaks.append(tracemalloc.get_traced_memory()[1])
+    finally:
+        tracemalloc.stop()
+
+
+class BenchmarkRunner:
+    """Замеряет число запросов, время и пиковую память эндпоинтов API.
+
+    Для эндпоинтов с пагинацией число запросов замеряется на двух
+    размерах страницы: оно не должно зависеть от размера страницы и
+    превышать потолок, указанный для эндпоинта. Перед замерами на
+    каждом размере страницы выполняется прогревочный запрос, заполняющий
+    кэши процесса.
+    """
+
+    def __init__(self, user, repeat=5):
+        self.repeat = repeat
+        self.client = APIClient()
+        token, _ = Token.objects.get_or_create(user=user)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + token.key)
+
+    def request(self, endpoint, params, method=None):
+        """Выполняет запрос и дочитывает потоковый ответ до конца."""
+        url = reverse(endpoint.url_name, kwargs=endpoint.kwargs)
+        method = method or endpoint.method
+        if method == 'get':
+            response = self.client.get(url, params)
+        else:
+            response = getattr(self.client, method)(url, format='json')
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response
+
+    def measured(self, endpoint, params, measure):
+        """Выполняет замер запроса к эндпоинту.
+
+        Запросы на запись парные: перед удалением связь создаётся, а после
+        создания удаляется, чтобы каждый замер начинался с того же
+        состояния базы данных.
+        """
+        if endpoint.method == 'delete':
+            self.request(endpoint, params, 'post')
+        with measure():
+            response = self.request(endpoint, params)
+        if endpoint.method == 'post':
+            self.request(endpoint, params, 'delete')
+        return response
+
+    def count_queries(self, endpoint, params):
+        counts = []
+        response = self.measured(
+            endpoint, params, lambda: query_counter(counts))
+        return counts[0], response.status_code
+
+    def measure(self, endpoint):
+        """Возвращает результаты замеров одного эндпоинта."""
+        params = dict(endpoint.params)
+        if endpoint.paginated:
+            params['limit'] = SMALL_PAGE
+        self.measured(endpoint, params, nullcontext)
+        queries, status_code = self.count_queries(endpoint, params)
+        durations = []
+        for _ in range(self.repeat):
+            self.measured(
+                endpoint, params, lambda: timer(durations))
+        peak_memory = []
+        self.measured(endpoint, params, lambda: memory_tracer(peak_memory))
+        result = {
+            'status_code': status_code,
+            'queries': queries,
+            'max_queries': endpoint.max_queries,
+            'time_ms': round(statistics.median(durations), 3),
+            'peak_memory_kb': round(peak_memory[0] / 1024, 1),
+        }
+        if endpoint.paginated:
+            params['limit'] = LARGE_PAGE
+            self.measured(endpoint, params, nullcontext)
+            result['queries_large_page'], _ = self.count_queries(
+                endpoint, params)
+        return result
+
+    def run(self, endpoints):
+        """Замеряет эндпоинты и возвращает отчёт и список нарушений."""
+        report = {}
+        violations = []
+        for endpoint in endpoints:
+            result = report[endpoint.name] = self.measure(endpoint)
+            if result['status_code'] >= 400:
+                violations.append(
+                    f'{endpoint.name}: код ответа {result["status_code"]}')
+            if result['queries'] > endpoint.max_queries:
+                violations.append(
+                    f'{endpoint.name}: {result["queries"]} запросов, '
+                    f'допустимо не более {endpoint.max_queries}'
+                )
+            if result.get('queries_large_page', result['queries']) != (
+                result['queries']
+            ):
+                violations.append(
+                    f'{endpoint.name}: число запросов зависит от размера '
+                    f'страницы ({result["queries"]} при limit={SMALL_PAGE}, '
+                    f'{result["queries_large_page"]} при limit={LARGE_PAGE})'
+                )
+        return report, violations
+
+
+def run_benchmarks(scale=None, repeat=5):
+    """Наполняет базу данных и замеряет все эндпоинты API."""
+    viewer = generate_data(scale)
+    endpoints = get_endpoints(
+        recipe_id=Recipe.objects.exclude(author=viewer).latest('id').id,
+        author_id=CustomUser.objects.exclude(
+            subscribers__subscriber=viewer).exclude(pk=viewer.pk).first().id,
+        tag_id=Tag.objects.first().id,
+        ingredient_id=Ingredient.objects.first().id,
+    )
+    token_cache_stats.reset()
+    report, violations = BenchmarkRunner(viewer, repeat).run(endpoints)
+    return {
+        'scale': {**DEFAULT_SCALE, **(scale or {})},
+        'database': connection.vendor,
+        'endpoints': report,
+        'token_cache': token_cache_stats.as_dict(),
+    }, violations
+
+
+def serialize_recipes(recipe_ids, context, cached=True):
+    """Сериализует рецепты быстрым сериализатором.
+
+    Без cached кэш представлений рецептов предварительно очищается.
+    """
+    if not cached:
+        get_recipe_cache().clear()
+    return RecipeListSerializer(
+        Recipe.objects.select_related('author').filter(pk__in=recipe_ids),
+        many=True, context=context
+    ).data
+
+
+def get_rendering_cases(request, page_size):
+    """Возвращает сериализацию страницы рецептов и всех ингредиентов.
+
+    Для каждого случая задаются обычный и быстрый способы: функция,
+    возвращающая данные ответа из ещё не выполненного набора запросов,
+    и рендерер этих данных.
+    """
+    context = {'request': request}
+    recipe_ids = list(
+        Recipe.objects.values_list('id', flat=True)[:page_size])
+    return {
+        'recipes-page': {
+            'drf': (lambda: RecipeSerializer(
+                Recipe.objects.with_related().filter(pk__in=recipe_ids),
+                many=True, context=context
+            ).data, JSONRenderer()),
+            'fast': (lambda: serialize_recipes(
+                recipe_ids, context, cached=False), FastJSONRenderer()),
+            'cached': (lambda: serialize_recipes(
+                recipe_ids, context), FastJSONRenderer()),
+        },
+        'ingredients-catalog': {
+            'drf': (lambda: IngredientSerializer(
+                Ingredient.objects.all(), many=True).data, JSONRenderer()),
+            'fast': (lambda: IngredientListSerializer(
+                Ingredient.objects.all()).data, FastJSONRenderer()),
+        },
+    }
+
+
+def run_rendering_benchmarks(scale=None, repeat=5, page_size=LARGE_PAGE):
+    """Замеряет стоимость сериализации и рендеринга одного объекта.
+
+    Сравнивает сериализаторы DRF с JSONRenderer и быстрые сериализаторы
+    списков с FastJSONRenderer на странице рецептов и на полном
+    справочнике ингредиентов. Для рецептов быстрый сериализатор
+    замеряется с пустым и с заполненным кэшем представлений. Время
+    сериализации включает запросы к базе данных. Возвращает медианы в
+    микросекундах на объект.
+    """
+    request = Request(APIRequestFactory().get('/'))
+    request.user = generate_data(scale)
+    report = {}
+    for name, modes in get_rendering_cases(request, page_size).items():
+        report[name] = {}
+        for mode, (serialize, renderer) in modes.items():
+            serialize_times, render_times = [], []
+            renderer.render(serialize())
+            for _ in range(repeat):
+                with timer(serialize_times):
+                    data = serialize()
+                with timer(render_times):
+                    renderer.render(data)
+            count = len(data)
+            report[name][mode] = {
+                'objects': count,
+                'serialize_us': round(
+                    statistics.median(serialize_times) * 1000 / count, 2),
+                'render_us': round(
+                    statistics.median(render_times) * 1000 / count, 2),
+            }
+    return report
+
+
+def run_compression_benchmarks(scale=None, repeat=5):
+    """Замеряет экономию трафика и время сжатия ответов эндпоинтов.
+
+    Для ответов GET-эндпоинтов возвращает исходный размер, размер после
+    сжатия в каждой доступной кодировке на уровнях COMPRESSION_LEVELS,
+    долю сэкономленных байтов и медиану времени сжатия в миллисекундах.
+    Для справочников дополнительно замеряются уровни
+    PRECOMPRESSION_LEVELS, на которых ответы сжимаются один раз.
+    """
+    viewer = generate_data(scale)
+    endpoints = get_endpoints(
+        recipe_id=Recipe.objects.exclude(author=viewer).latest('id').id,
+        author_id=None,
+        tag_id=Tag.objects.first().id,
+        ingredient_id=Ingredient.objects.first().id,
+    )
+    client = BenchmarkRunner(viewer, repeat).client
+    report = {}
+    for endpoint in endpoints:
+        if endpoint.method != 'get' or endpoint.name == 'users-detail':
+            continue
+        params = dict(endpoint.params)
+        if endpoint.paginated:
+            params['limit'] = LARGE_PAGE
+        response = client.get(
+            reverse(endpoint.url_name, kwargs=endpoint.kwargs), params)
+        content = b''.join(response.streaming_content) if (
+            response.streaming) else response.content
+        levels = {'dynamic': settings.COMPRESSION_LEVELS}
+        if endpoint.name.startswith(('tags-', 'ingredients-')):
+            levels['precompressed'] = settings.PRECOMPRESSION_LEVELS
+        result = report[endpoint.name] = {'bytes': len(content)}
+        for mode, mode_levels in levels.items():
+            for encoding in ENCODINGS:
+                durations = []
+                for _ in range(repeat):
+                    with timer(durations):
+                        compressed = compress(
+                            content, encoding, mode_levels[encoding])
+                result[f'{encoding}_{mode}'] = {
+                    'bytes': len(compressed),
+                    'saved': round(
+                        1 - len(compressed) / len(content), 4
+                    ) if content else 0.0,
+                    'time_ms': round(statistics.median(durations), 3),
+                }
+    return report
+
+
+def compare_reports(previous, current, time_tolerance=0.2):
+    """Сравнивает два отчёта и возвращает список регрессий."""
+    regressions = []
+    for name, result in current['endpoints'].items():
+        old = previous['endpoints'].get(name)
+        if old is None:
+            continue
+        if result['queries'] > old['queries']:
+            regressions.append(
+                f'{name}: запросов {old["queries"]} -> {result["queries"]}')
+        if result['time_ms'] > old['time_ms'] * (1 + time_tolerance):
+            regressions.append(
+                f'{name}: время {old["time_ms"]} -> {result["time_ms"]} мс')
+    return regressions
+
+
+def dump_report(report, path):
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(report, file, ensure_ascii=False, indent=2)
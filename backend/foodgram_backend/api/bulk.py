@@ -0,0 +1,40 @@
+from rest_framework.response import Response
+
+from .relations import update_relations
+
+BULK_STATUSES = {
+    True: ('added', 'exists'),
+    False: ('removed', 'absent'),
+}
+
+
+def toggle_relations(request, manager, relation_name, ids, found, invalid=()):
+    """Массово создаёт или удаляет связи пользователя запроса с объектами.
+
+    Запрос POST создаёт связи, DELETE - удаляет. found - множество id
+    существующих объектов, invalid - id, связь с которыми недопустима.
+    Менеджер manager выполняет изменения методами add_many() и
+    remove_many(). Возвращает ответ с результатом для каждого id:
+    added, exists, removed, absent, not_found или invalid.
+    """
+    adding = request.method == 'POST'
+    valid = [obj_id for obj_id in ids if obj_id in found and (
+        obj_id not in invalid)]
+    changed = set()
+    if valid:
+        method = manager.add_many if adding else manager.remove_many
+        changed = method(request.user.id, valid)
+    update_relations(request.user, relation_name, changed, adding)
+    changed_status, unchanged_status = BULK_STATUSES[adding]
+    results = []
+    for obj_id in ids:
+        if obj_id not in found:
+            status = 'not_found'
+        elif obj_id in invalid:
+            status = 'invalid'
+        elif obj_id in changed:
+            status = changed_status
+        else:
+            status = unchanged_status
+        results.append({'id': obj_id, 'status': status})
+    return Response({'results': results})
@@ -0,0 +1,193 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from foodgram_backend.compression import (
+    negotiate_encoding, precompress, set_content_encoding)
+from recipes.models import Tag
+
+CATALOG_CACHE_ALIAS = 'catalog'
+
+RECIPE_CACHE_ALIAS = 'recipes'
+
+
+def get_catalog_cache():
+    """Возвращает кэш справочников, общий для всех процессов-воркеров."""
+    return caches[CATALOG_CACHE_ALIAS]
+
+
+def get_catalog_version(name):
+    """Возвращает версию справочника - время его изменения в миллисекундах."""
+    cache = get_catalog_cache()
+    key = f'catalog:{name}:version'
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, int(time.time() * 1000), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_catalog_version(name):
+    """Увеличивает версию справочника, делая устаревшими его кэши."""
+    cache = get_catalog_cache()
+    key = f'catalog:{name}:version'
+    version = max(int(time.time() * 1000), (cache.get(key) or 0) + 1)
+    cache.set(key, version, None)
+    return version
+
+
+def get_tag_ids_by_slug():
+    """Возвращает словарь id тегов по их slug из кэша справочников."""
+    cache = get_catalog_cache()
+    key = 'catalog:tags:{}:ids_by_slug'.format(get_catalog_version('tags'))
+    tag_ids = cache.get(key)
+    if tag_ids is None:
+        tag_ids = dict(Tag.objects.values_list('slug', 'id'))
+        cache.set(key, tag_ids, settings.CATALOG_CACHE_TIMEOUT)
+    return tag_ids
+
+
+def get_recipe_cache():
+    """Возвращает кэш представлений рецептов."""
+    return caches[RECIPE_CACHE_ALIAS]
+
+
+def get_recipe_key(recipe_id, version):
+    """Возвращает ключ представления версии рецепта в кэше."""
+    return f'recipe:{recipe_id}:{version}'
+
+
+class LRUCache:
+    """Потокобезопасный кэш в памяти процесса с вытеснением по LRU.
+
+    Хранит не более max_size записей: при переполнении удаляется запись,
+    к которой дольше всего не обращались. Записи старше timeout секунд
+    считаются устаревшими.
+    """
+
+    def __init__(self, max_size, timeout=None):
+        self.max_size = max_size
+        self.timeout = timeout
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        """Метод получения значения по ключу."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            value, expires = entry
+            if expires is not None and expires < time.monotonic():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        """Метод сохранения значения с вытеснением лишних записей."""
+        expires = None
+        if self.timeout is not None:
+            expires = time.monotonic() + self.timeout
+        with self._lock:
+            self._entries[key] = (value, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        """Метод удаления значения по ключу."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """Метод очистки кэша."""
+        with self._lock:
+            self._entries.clear()
+
+
+catalog_responses = LRUCache(settings.CATALOG_MEMORY_CACHE_SIZE)
+
+
+class CatalogCacheMixin:
+    """Миксин кэширования готовых JSON-ответов справочников.
+
+    Ответ хранится в кэше справочников в виде байтов под ключом, который
+    включает версию справочника catalog_name, и отдаётся с заголовками
+    ETag и Last-Modified. Ответы без параметров запроса хранятся вместе с
+    заранее сжатыми вариантами br, gzip и deflate, ответы с фильтрами,
+    например поиск ингредиентов по началу названия, сжимает
+    CompressionMiddleware. Последние ответы дополнительно хранятся в
+    памяти процесса. Условные запросы с If-None-Match или If-Modified-Since
+    получают ответ 304 Not Modified.
+    """
+
+    catalog_name = None
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            super().retrieve, request, *args, **kwargs)
+
+    def get_cached_response(self, handler, request, *args, **kwargs):
+        """Метод получения ответа из кэша или его формирования."""
+        renderer = request.accepted_renderer
+        if renderer.format != 'json':
+            return handler(request, *args, **kwargs)
+        version = get_catalog_version(self.catalog_name)
+        key = 'catalog:{}:{}:response:{}'.format(
+            self.catalog_name,
+            version,
+            hashlib.md5(request.get_full_path().encode()).hexdigest()
+        )
+        entry = catalog_responses.get(key)
+        if entry is None:
+            cache = get_catalog_cache()
+            entry = cache.get(key)
+            if entry is None:
+                response = handler(request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+                content = renderer.render(
+                    response.data,
+                    request.accepted_media_type,
+                    self.get_renderer_context()
+                )
+                entry = (
+                    quote_etag(hashlib.sha1(content).hexdigest()),
+                    content,
+                    {} if request.GET else precompress(content)
+                )
+                cache.set(key, entry, settings.CATALOG_CACHE_TIMEOUT)
+            catalog_responses.set(key, entry)
+        etag, content, variants = entry
+        last_modified = version // 1000
+        encoding = negotiate_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', ''), variants)
+        response = HttpResponse(
+            variants[encoding] if encoding else content,
+            content_type=renderer.media_type
+        )
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        if variants:
+            patch_vary_headers(response, ('Accept-Encoding',))
+        if encoding:
+            set_content_encoding(response, encoding)
+        return get_conditional_response(
+            request, etag=etag, last_modified=last_modified,
+            response=response
+        )
@@ -0,0 +1,240 @@
+import binascii
+import hashlib
+import uuid
+from base64 import b64decode
+from collections import defaultdict
+from collections.abc import Mapping
+from tempfile import SpooledTemporaryFile
+
+import filetype
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import UploadedFile
+from drf_extra_fields.fields import Base64ImageField
+from PIL import Image
+from rest_framework import serializers
+
+BASE64_CHUNK_SIZE = 64 * 1024
+
+
+class StreamingBase64ImageField(Base64ImageField):
+    """Поле изображения в base64 с потоковым декодированием.
+
+    Строка декодируется частями во временный файл, который переносится
+    на диск при превышении FILE_UPLOAD_MAX_MEMORY_SIZE, поэтому большие
+    фотографии не копируются в память целиком. Если хэш содержимого
+    совпадает с image_digest редактируемого объекта, возвращается его
+    текущий файл без проверки изображения и повторной записи.
+    """
+
+    def to_internal_value(self, base64_data):
+        if base64_data in self.EMPTY_VALUES:
+            return None
+        if not isinstance(base64_data, str):
+            raise serializers.ValidationError(self.INVALID_FILE_MESSAGE)
+        header, _, payload = base64_data.rpartition(';base64,')
+        file = SpooledTemporaryFile(
+            max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE)
+        try:
+            digest = self.decode_to_file(payload, file)
+        except (binascii.Error, ValueError):
+            file.close()
+            raise serializers.ValidationError(self.INVALID_FILE_MESSAGE)
+        instance = getattr(self.parent, 'instance', None)
+        if digest == getattr(instance, 'image_digest', None):
+            file.close()
+            return getattr(instance, self.source)
+        size = file.tell()
+        file.seek(0)
+        extension = self.get_file_extension_from_file(file)
+        if extension not in self.ALLOWED_TYPES:
+            file.close()
+            raise serializers.ValidationError(self.INVALID_TYPE_MESSAGE)
+        content_type = None
+        if self.trust_provided_content_type and header:
+            content_type = header.replace('data:', '')
+        return serializers.ImageField.to_internal_value(self, UploadedFile(
+            file=file,
+            name=f'{uuid.uuid4()}.{extension}',
+            content_type=content_type,
+            size=size
+        ))
+
+    @staticmethod
+    def decode_to_file(payload, file):
+        """Декодирует base64 частями, кратными четырём символам.
+
+        Возвращает SHA-256 декодированного содержимого.
+        """
+        digest = hashlib.sha256()
+        for start in range(0, len(payload), BASE64_CHUNK_SIZE):
+            chunk = b64decode(
+                payload[start:start + BASE64_CHUNK_SIZE], validate=True)
+            digest.update(chunk)
+            file.write(chunk)
+        return digest.hexdigest()
+
+    def get_file_extension_from_file(self, file):
+        """Определяет расширение по заголовку файла, не читая его целиком."""
+        extension = filetype.guess_extension(file.read(261))
+        file.seek(0)
+        if extension is None:
+            try:
+                extension = Image.open(file).format.lower()
+            except OSError:
+                raise serializers.ValidationError(self.INVALID_FILE_MESSAGE)
+            finally:
+                file.seek(0)
+        return 'jpg' if extension == 'jpeg' else extension
+
+
+def get_image_url(name, request=None):
+    """Возвращает ссылку на файл изображения в хранилище."""
+    url = default_storage.url(name)
+    return request.build_absolute_uri(url) if request else url
+
+
+def get_image_thumb(image_name, image_variants, request=None):
+    """Возвращает ссылку на миниатюру изображения рецепта."""
+    thumb = image_variants.get('thumb')
+    if not thumb:
+        if not image_name:
+            return None
+        return get_image_url(image_name, request)
+    return get_image_url(thumb.get('webp') or thumb['jpeg'], request)
+
+
+def get_srcset(image_variants, request=None):
+    """Возвращает набор копий изображения рецепта для атрибута srcset."""
+    return ', '.join(
+        f'{get_image_url(variant.get("webp") or variant["jpeg"], request)} '
+        f'{variant["width"]}w'
+        for variant in image_variants.values()
+    ) or None
+
+
+class RecipeImageVariantsMixin(serializers.Serializer):
+    """Поля ссылок на уменьшенные копии изображения рецепта."""
+
+    image_thumb = serializers.SerializerMethodField()
+    srcset = serializers.SerializerMethodField()
+
+    def get_image_thumb(self, obj):
+        """Метод получения ссылки на миниатюру изображения."""
+        return get_image_thumb(
+            obj.image.name, obj.image_variants, self.context.get('request'))
+
+    def get_srcset(self, obj):
+        """Метод получения набора копий изображения для атрибута srcset."""
+        return get_srcset(obj.image_variants, self.context.get('request'))
+
+
+class BulkPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Поле первичного ключа с объектами, загруженными заранее.
+
+    Объект берётся из загруженных корневым сериализатором с
+    BulkRelatedFieldsMixin, отдельный запрос выполняется, только если
+    объекта среди них нет.
+    """
+
+    def to_internal_value(self, data):
+        resolved = getattr(self.root, 'resolved_objects', {})
+        model = self.get_queryset().model
+        try:
+            return resolved[model][model._meta.pk.to_python(data)]
+        except (KeyError, TypeError, ValidationError):
+            return super().to_internal_value(data)
+
+
+def collect_bulk_ids(fields, data, ids):
+    """Собирает первичные ключи полей BulkPrimaryKeyRelatedField из данных.
+
+    Ключи попадают в словарь ids по полям, вложенные сериализаторы и
+    их списки обходятся рекурсивно.
+    """
+    if not isinstance(data, Mapping):
+        return
+    for field in fields.values():
+        value = data.get(field.field_name)
+        if value is None:
+            continue
+        if isinstance(field, BulkPrimaryKeyRelatedField):
+            ids[field].append(value)
+        elif isinstance(field, serializers.ManyRelatedField) and (
+            isinstance(field.child_relation, BulkPrimaryKeyRelatedField)
+        ) and isinstance(value, list):
+            ids[field.child_relation].extend(value)
+        elif isinstance(field, serializers.ListSerializer) and (
+            isinstance(value, list)
+        ):
+            for item in value:
+                collect_bulk_ids(field.child.fields, item, ids)
+        elif isinstance(field, serializers.Serializer):
+            collect_bulk_ids(field.fields, value, ids)
+
+
+def get_top_field_name(field):
+    """Возвращает имя поля корневого сериализатора, содержащего поле."""
+    while field.parent is not field.root:
+        field = field.parent
+    return field.field_name
+
+
+class BulkRelatedFieldsMixin:
+    """Миксин сериализатора, загружающий связанные объекты пачкой.
+
+    Перед проверкой полей первичные ключи всех полей
+    BulkPrimaryKeyRelatedField из данных, включая вложенные, загружаются
+    одним in_bulk() на модель. Все отсутствующие ключи возвращаются одной
+    ошибкой валидации по полям верхнего уровня.
+    """
+
+    default_error_messages = {
+        'does_not_exist_many': (
+            'Недопустимые первичные ключи {pk_values} - '
+            'объекты не существуют.'
+        ),
+    }
+
+    def to_internal_value(self, data):
+        self.resolved_objects = self.resolve_related(data)
+        return super().to_internal_value(data)
+
+    def resolve_related(self, data):
+        """Метод загрузки объектов полей по первичным ключам из данных."""
+        ids = defaultdict(list)
+        collect_bulk_ids(self.fields, data, ids)
+        keys = defaultdict(dict)
+        for field, values in ids.items():
+            pk_field = field.get_queryset().model._meta.pk
+            for value in values:
+                try:
+                    keys[field][pk_field.to_python(value)] = value
+                except (TypeError, ValidationError):
+                    continue
+        querysets = {}
+        model_keys = defaultdict(set)
+        for field, field_keys in keys.items():
+            queryset = field.get_queryset()
+            querysets.setdefault(queryset.model, queryset)
+            model_keys[queryset.model].update(field_keys)
+        resolved = {
+            model: querysets[model].in_bulk(model_keys[model])
+            for model in model_keys
+        }
+        missing = defaultdict(list)
+        for field, field_keys in keys.items():
+            found = resolved[field.get_queryset().model]
+            missing[get_top_field_name(field)].extend(
+                str(value) for key, value in field_keys.items()
+                if key not in found
+            )
+        errors = {
+            name: [self.error_messages['does_not_exist_many'].format(
+                pk_values=', '.join(values))]
+            for name, values in missing.items() if values
+        }
+        if errors:
+            raise serializers.ValidationError(errors)
+        return resolved
@@ -1,6 +1,8 @@
 import django_filters
+from django.db.models import Count
 
 from recipes.models import Ingredient, Recipe
+from .cache import get_tag_ids_by_slug
 
 
 class IngredientFilter(django_filters.FilterSet):
@@ -17,8 +19,10 @@ class IngredientFilter(django_filters.FilterSet):
 class RecipeFilter(django_filters.FilterSet):
     """Кастомный фильтр для представления рецептов."""
 
-    tags = django_filters.AllValuesMultipleFilter(
-        field_name='tags__slug'
+    tags = django_filters.CharFilter(method='filter_tags')
+    tags_mode = django_filters.ChoiceFilter(
+        choices=(('any', 'Любой из тегов'), ('all', 'Все теги')),
+        method='filter_tags_mode'
     )
     is_favorited = django_filters.NumberFilter(
         field_name='favorites',
@@ -28,6 +32,7 @@ class RecipeFilter(django_filters.FilterSet):
         field_name='shopping_cart',
         method='filter_is_in_shopping_cart'
     )
+    search = django_filters.CharFilter(method='filter_search')
 
     class Meta:
         model = Recipe
@@ -36,6 +41,8 @@ class RecipeFilter(django_filters.FilterSet):
             'is_favorited',
             'is_in_shopping_cart',
             'tags',
+            'tags_mode',
+            'search',
         )
 
     def filter_is_favorited(self, queryset, name, value):
@@ -51,3 +58,37 @@ class RecipeFilter(django_filters.FilterSet):
             return queryset.filter(
                 shopping_cart__user=self.request.user)
         return queryset
+
+    def filter_tags(self, queryset, name, value):
+        """Метод фильтрации рецептов по slug тегов.
+
+        Slug переводятся в id по закэшированному справочнику тегов, а
+        рецепты отбираются полусоединением pk IN (подзапрос к связующей
+        таблице), которое не размножает строки рецептов. При
+        tags_mode=all рецепт должен иметь все указанные теги, иначе -
+        хотя бы один из них.
+        """
+        tag_ids_by_slug = get_tag_ids_by_slug()
+        slugs = set(self.data.getlist(name))
+        tag_ids = [
+            tag_ids_by_slug[slug] for slug in slugs
+            if slug in tag_ids_by_slug
+        ]
+        if not tag_ids:
+            return queryset.none()
+        recipe_tags = Recipe.tags.through.objects.filter(tag_id__in=tag_ids)
+        if self.form.cleaned_data.get('tags_mode') == 'all':
+            if len(tag_ids) < len(slugs):
+                return queryset.none()
+            recipe_tags = recipe_tags.values('recipe_id').annotate(
+                tags_count=Count('tag_id')
+            ).filter(tags_count=len(tag_ids))
+        return queryset.filter(pk__in=recipe_tags.values('recipe_id'))
+
+    def filter_tags_mode(self, queryset, name, value):
+        """Метод-заглушка: режим учитывается в фильтре тегов."""
+        return queryset
+
+    def filter_search(self, queryset, name, value):
+        """Метод полнотекстового поиска с сортировкой по релевантности."""
+        return queryset.search(value)
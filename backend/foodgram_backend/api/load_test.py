@@ -0,0 +1,147 @@
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from recipes.models import Recipe
+from .benchmarks import DEFAULT_SCALE, generate_data, get_endpoints
+
+LOAD_TEST_ENDPOINTS = (
+    'recipes-list',
+    'recipes-list-filtered',
+    'recipes-detail',
+    'tags-list',
+    'ingredients-search',
+    'users-get_subscriptions',
+)
+
+ASYNC_URLCONF = 'foodgram_backend.async_urls'
+
+
+def get_urls(viewer):
+    """Возвращает адреса эндпоинтов чтения, обслуживаемых асинхронно."""
+    endpoints = get_endpoints(
+        recipe_id=Recipe.objects.exclude(author=viewer).latest('id').id,
+        author_id=None,
+        tag_id=None,
+        ingredient_id=None,
+    )
+    urls = {}
+    for endpoint in endpoints:
+        if endpoint.name not in LOAD_TEST_ENDPOINTS:
+            continue
+        url = reverse(endpoint.url_name, kwargs=endpoint.kwargs)
+        if endpoint.params:
+            url = f'{url}?{urlencode(endpoint.params, doseq=True)}'
+        urls[endpoint.name] = url
+    return urls
+
+
+def summarize(results, elapsed):
+    """Возвращает пропускную способность и задержки серии запросов.
+
+    results - списки пар (время ответа в миллисекундах, код ответа)
+    каждого исполнителя.
+    """
+    durations = sorted(
+        duration for samples in results for duration, _ in samples)
+    return {
+        'requests': len(durations),
+        'errors': sum(
+            status_code != 200
+            for samples in results for _, status_code in samples
+        ),
+        'rps': round(len(durations) / elapsed, 1),
+        'p50_ms': round(statistics.median(durations), 3),
+        'p95_ms': round(durations[int(len(durations) * 0.95) - 1], 3),
+    }
+
+
+def run_wsgi(url, headers, requests, concurrency):
+    """Нагружает эндпоинт через WSGI-обработчик из concurrency потоков."""
+    def worker(count):
+        client = Client(**headers)
+        samples = []
+        for _ in range(count):
+            started = time.perf_counter()
+            response = client.get(url)
+            samples.append((
+                (time.perf_counter() - started) * 1000,
+                response.status_code
+            ))
+        return samples
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(
+            worker, split_requests(requests, concurrency)))
+    elapsed = time.perf_counter() - started
+    return summarize(results, elapsed)
+
+
+async def run_asgi(url, headers, requests, concurrency):
+    """Нагружает эндпоинт через ASGI-обработчик из concurrency задач."""
+    client = AsyncClient()
+    headers = {
+        key[len('HTTP_'):]: value for key, value in headers.items()}
+
+    async def worker(count):
+        samples = []
+        for _ in range(count):
+            started = time.perf_counter()
+            response = await client.get(url, **headers)
+            samples.append((
+                (time.perf_counter() - started) * 1000,
+                response.status_code
+            ))
+        return samples
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(
+        worker(count) for count in split_requests(requests, concurrency)))
+    elapsed = time.perf_counter() - started
+    return summarize(results, elapsed)
+
+
+def split_requests(requests, concurrency):
+    """Делит число запросов между concurrency исполнителями."""
+    return [
+        requests // concurrency + (number < requests % concurrency)
+        for number in range(concurrency)
+    ]
+
+
+def run_load_test(scale=None, requests=200, concurrency=10):
+    """Сравнивает пропускную способность путей WSGI и ASGI.
+
+    Каждый эндпоинт из LOAD_TEST_ENDPOINTS сначала прогревается, затем
+    нагружается requests запросами из concurrency потоков через
+    WSGI-обработчик Django и таким же числом одновременных задач через
+    ASGI-обработчик с асинхронными представлениями чтения.
+    """
+    viewer = generate_data(scale)
+    token, _ = Token.objects.get_or_create(user=viewer)
+    headers = {'HTTP_AUTHORIZATION': 'Token ' + token.key}
+    report = {}
+    for name, url in get_urls(viewer).items():
+        run_wsgi(url, headers, concurrency, concurrency)
+        wsgi = run_wsgi(url, headers, requests, concurrency)
+        with override_settings(ROOT_URLCONF=ASYNC_URLCONF):
+            asyncio.run(run_asgi(url, headers, concurrency, concurrency))
+            asgi = asyncio.run(run_asgi(url, headers, requests, concurrency))
+        report[name] = {
+            'wsgi': wsgi,
+            'asgi': asgi,
+            'speedup': round(asgi['rps'] / wsgi['rps'], 2),
+        }
+    return {
+        'scale': {**DEFAULT_SCALE, **(scale or {})},
+        'requests': requests,
+        'concurrency': concurrency,
+        'endpoints': report,
+    }
@@ -0,0 +1,52 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import (
+    setup_test_environment, teardown_test_environment)
+
+from api.benchmarks import (
+    DEFAULT_SCALE, compare_reports, dump_report, run_benchmarks)
+
+
+class Command(BaseCommand):
+    help = (
+        'Наполняет временную базу данных синтетическими данными и замеряет '
+        'число запросов, время и память для эндпоинтов API.'
+    )
+
+    def add_arguments(self, parser):
+        for name, value in DEFAULT_SCALE.items():
+            parser.add_argument(
+                f'--{name.replace("_", "-")}', type=int, default=value)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--output', type=str)
+        parser.add_argument('--compare', type=str)
+
+    def handle(self, *args, **options):
+        scale = {name: options[name] for name in DEFAULT_SCALE}
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0)
+        try:
+            report, violations = run_benchmarks(scale, options['repeat'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+        for name, result in report['endpoints'].items():
+            self.stdout.write(
+                f'{name:<36} {result["queries"]:>3} запр. '
+                f'{result["time_ms"]:>9.2f} мс '
+                f'{result["peak_memory_kb"]:>9.1f} КБ'
+            )
+        self.stdout.write(
+            'Доля попаданий в кэш токенов: '
+            f'{report["token_cache"]["hit_rate"]:.2%}'
+        )
+        if options['output']:
+            dump_report(report, options['output'])
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as file:
+                violations += compare_reports(json.load(file), report)
+        if violations:
+            raise CommandError('\n'.join(violations))
+        self.stdout.write(self.style.SUCCESS('Замеры завершены.'))
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import (
+    setup_test_environment, teardown_test_environment)
+
+from api.benchmarks import (
+    DEFAULT_SCALE, dump_report, run_compression_benchmarks)
+
+
+class Command(BaseCommand):
+    help = (
+        'Наполняет временную базу данных синтетическими данными и замеряет '
+        'размер ответов эндпоинтов API до и после сжатия и время сжатия.'
+    )
+
+    def add_arguments(self, parser):
+        for name, value in DEFAULT_SCALE.items():
+            parser.add_argument(
+                f'--{name.replace("_", "-")}', type=int, default=value)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--output', type=str)
+
+    def handle(self, *args, **options):
+        scale = {name: options[name] for name in DEFAULT_SCALE}
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0)
+        try:
+            report = run_compression_benchmarks(scale, options['repeat'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+        for name, result in report.items():
+            self.stdout.write(f'{name:<36} {result["bytes"]:>9} Б')
+            for variant, compressed in result.items():
+                if variant == 'bytes':
+                    continue
+                self.stdout.write(
+                    f'    {variant:<28} {compressed["bytes"]:>9} Б '
+                    f'экономия {compressed["saved"]:>7.2%} '
+                    f'{compressed["time_ms"]:>8.3f} мс'
+                )
+        if options['output']:
+            dump_report(report, options['output'])
+        self.stdout.write(self.style.SUCCESS('Замеры завершены.'))
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import (
+    setup_test_environment, teardown_test_environment)
+
+from api.benchmarks import (
+    DEFAULT_SCALE, LARGE_PAGE, dump_report, run_rendering_benchmarks)
+
+
+class Command(BaseCommand):
+    help = (
+        'Наполняет временную базу данных синтетическими данными и замеряет '
+        'время сериализации и рендеринга одного объекта для сериализаторов '
+        'DRF и быстрых сериализаторов списков.'
+    )
+
+    def add_arguments(self, parser):
+        for name, value in DEFAULT_SCALE.items():
+            parser.add_argument(
+                f'--{name.replace("_", "-")}', type=int, default=value)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--page-size', type=int, default=LARGE_PAGE)
+        parser.add_argument('--output', type=str)
+
+    def handle(self, *args, **options):
+        scale = {name: options[name] for name in DEFAULT_SCALE}
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0)
+        try:
+            report = run_rendering_benchmarks(
+                scale, options['repeat'], options['page_size'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+        for name, modes in report.items():
+            for mode, result in modes.items():
+                self.stdout.write(
+                    f'{name:<20} {mode:<6} {result["objects"]:>6} об. '
+                    f'сериализация {result["serialize_us"]:>8.2f} мкс/об. '
+                    f'рендеринг {result["render_us"]:>7.2f} мкс/об.'
+                )
+        if options['output']:
+            dump_report(report, options['output'])
+        self.stdout.write(self.style.SUCCESS('Замеры завершены.'))
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import (
+    setup_test_environment, teardown_test_environment)
+
+from api.benchmarks import DEFAULT_SCALE, dump_report
+from api.load_test import run_load_test
+
+
+class Command(BaseCommand):
+    help = (
+        'Наполняет временную базу данных синтетическими данными и '
+        'сравнивает пропускную способность эндпоинтов чтения API '
+        'при обработке через WSGI и через ASGI.'
+    )
+
+    def add_arguments(self, parser):
+        for name, value in DEFAULT_SCALE.items():
+            parser.add_argument(
+                f'--{name.replace("_", "-")}', type=int, default=value)
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=10)
+        parser.add_argument('--output', type=str)
+
+    def handle(self, *args, **options):
+        scale = {name: options[name] for name in DEFAULT_SCALE}
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0)
+        try:
+            report = run_load_test(
+                scale, options['requests'], options['concurrency'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+        for name, result in report['endpoints'].items():
+            wsgi, asgi = result['wsgi'], result['asgi']
+            self.stdout.write(
+                f'{name:<28} WSGI {wsgi["rps"]:>8.1f} зап./с '
+                f'p95 {wsgi["p95_ms"]:>8.2f} мс | '
+                f'ASGI {asgi["rps"]:>8.1f} зап./с '
+                f'p95 {asgi["p95_ms"]:>8.2f} мс | x{result["speedup"]}'
+            )
+            if wsgi['errors'] or asgi['errors']:
+                self.stderr.write(
+                    f'{name}: ошибок WSGI {wsgi["errors"]}, '
+                    f'ASGI {asgi["errors"]}'
+                )
+        if options['output']:
+            dump_report(report, options['output'])
+        self.stdout.write(self.style.SUCCESS('Нагрузочный тест завершён.'))
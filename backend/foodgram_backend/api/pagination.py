@@ -1,5 +1,14 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+from collections import OrderedDict
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import (
     PageNumberPagination as MyPageNumberPagination)
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
 from foodgram_backend.constants import PAGE_SIZE
 
@@ -8,3 +17,89 @@ class PageNumberPagination(MyPageNumberPagination):
 
     page_size_query_param = 'limit'
     page_size = PAGE_SIZE
+
+
+class RecipePagination(PageNumberPagination):
+    """Пагинация рецептов по номеру страницы или по курсору.
+
+    При наличии в запросе параметра cursor (в том числе пустого) рецепты
+    отбираются по ключу (pub_date, id) без OFFSET и без подсчёта общего
+    количества, а в ответе возвращаются непрозрачные курсоры соседних
+    страниц. Курсор всегда задаёт сортировку от новых рецептов к старым,
+    параметр ordering в этом режиме не учитывается. Без параметра cursor
+    работает обычная пагинация page/limit.
+    """
+
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_mode = self.cursor_query_param in request.query_params
+        if not self.cursor_mode:
+            return super().paginate_queryset(queryset, request, view)
+        self.request = request
+        page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(
+            request.query_params[self.cursor_query_param])
+        reverse = False
+        if cursor is None:
+            queryset = queryset.order_by('-pub_date', '-id')
+        else:
+            pub_date, pk, reverse = cursor
+            if reverse:
+                queryset = queryset.filter(
+                    Q(pub_date__gt=pub_date) | Q(pub_date=pub_date, id__gt=pk)
+                ).order_by('pub_date', 'id')
+            else:
+                queryset = queryset.filter(
+                    Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, id__lt=pk)
+                ).order_by('-pub_date', '-id')
+        results = list(queryset[:page_size + 1])
+        has_more = len(results) > page_size
+        results = results[:page_size]
+        if reverse:
+            results.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+        self.page_results = results
+        return results
+
+    def get_paginated_response(self, data):
+        if not self.cursor_mode:
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ('next', self.get_cursor_link(
+                self.has_next, self.page_results[-1:], False)),
+            ('previous', self.get_cursor_link(
+                self.has_previous, self.page_results[:1], True)),
+            ('results', data),
+        ]))
+
+    def get_cursor_link(self, exists, boundary, reverse):
+        """Метод получения ссылки на соседнюю страницу."""
+        if not exists or not boundary:
+            return None
+        return replace_query_param(
+            remove_query_param(
+                self.request.build_absolute_uri(), self.page_query_param),
+            self.cursor_query_param,
+            self.encode_cursor(boundary[0], reverse)
+        )
+
+    @staticmethod
+    def encode_cursor(recipe, reverse):
+        """Кодирует позицию рецепта в непрозрачную строку курсора."""
+        position = f'{recipe.pub_date.isoformat()}|{recipe.pk}|{int(reverse)}'
+        return urlsafe_b64encode(position.encode()).decode()
+
+    def decode_cursor(self, encoded):
+        """Раскодирует курсор в кортеж (pub_date, id, reverse)."""
+        if not encoded:
+            return None
+        try:
+            pub_date, pk, reverse = urlsafe_b64decode(
+                encoded.encode()).decode().split('|')
+            return datetime.fromisoformat(pub_date), int(pk), reverse == '1'
+        except (BinasciiError, UnicodeDecodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
@@ -0,0 +1,163 @@
+import threading
+import time
+from array import array
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import caches
+
+from recipes.models import Favorites, ShoppingCart
+from users.models import Subscription
+from .cache import LRUCache
+
+RELATION_QUERIES = {
+    'favorites': lambda user_id: Favorites.objects.filter(
+        user_id=user_id).values_list('recipe_id', flat=True),
+    'shopping_cart': lambda user_id: ShoppingCart.objects.filter(
+        user_id=user_id).values_list('recipe_id', flat=True),
+    'subscriptions': lambda user_id: Subscription.objects.filter(
+        subscriber_id=user_id).values_list('subscribed_to_id', flat=True),
+}
+
+RELATIONS_CACHE_ALIAS = 'relations'
+
+
+class UserRelations:
+    """Связи пользователя с рецептами и авторами.
+
+    Хранит id рецептов в избранном и корзине и id авторов, на которых
+    подписан пользователь. Каждое множество хранится отсортированным
+    массивом array('q') и загружается из базы данных одним запросом
+    при первом обращении.
+    """
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self._ids = {}
+        self._lock = threading.Lock()
+
+    def get_ids(self, name):
+        """Метод получения отсортированного массива id связей."""
+        ids = self._ids.get(name)
+        if ids is None:
+            loaded = array(
+                'q', sorted(RELATION_QUERIES[name](self.user_id).order_by()))
+            with self._lock:
+                ids = self._ids.setdefault(name, loaded)
+        return ids
+
+    def contains(self, name, obj_id):
+        """Метод проверки наличия связи с объектом."""
+        ids = self.get_ids(name)
+        index = bisect_left(ids, obj_id)
+        return index < len(ids) and ids[index] == obj_id
+
+    def add(self, name, obj_id):
+        """Метод добавления id в загруженное множество связей."""
+        with self._lock:
+            ids = self._ids.get(name)
+            if ids is None:
+                return
+            index = bisect_left(ids, obj_id)
+            if index == len(ids) or ids[index] != obj_id:
+                ids.insert(index, obj_id)
+
+    def discard(self, name, obj_id):
+        """Метод удаления id из загруженного множества связей."""
+        with self._lock:
+            ids = self._ids.get(name)
+            if ids is None:
+                return
+            index = bisect_left(ids, obj_id)
+            if index < len(ids) and ids[index] == obj_id:
+                del ids[index]
+
+
+relations_cache = LRUCache(
+    settings.USER_RELATIONS_CACHE_SIZE,
+    settings.USER_RELATIONS_CACHE_TIMEOUT
+)
+
+
+def get_relations_key(user_id):
+    return f'relations:{user_id}:version'
+
+
+def get_relations_version(user_id):
+    """Возвращает версию связей пользователя из общего кэша.
+
+    Версия - время последнего изменения связей в миллисекундах.
+    """
+    cache = caches[RELATIONS_CACHE_ALIAS]
+    key = get_relations_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, int(time.time() * 1000), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_relations_version(user_id):
+    """Увеличивает версию связей пользователя в общем кэше."""
+    cache = caches[RELATIONS_CACHE_ALIAS]
+    key = get_relations_key(user_id)
+    version = max(int(time.time() * 1000), (cache.get(key) or 0) + 1)
+    cache.set(key, version, None)
+    return version
+
+
+def get_user_relations(user):
+    """Возвращает связи пользователя из кэша, создавая их при промахе.
+
+    Связи из кэша процесса используются, только если их версия совпадает
+    с версией в общем кэше. Версия читается один раз на объект
+    пользователя, то есть на запрос.
+    """
+    version = user.__dict__.get('_relations_version')
+    if version is None:
+        version = user._relations_version = get_relations_version(user.pk)
+    entry = relations_cache.get(user.pk)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+    relations = UserRelations(user.pk)
+    relations_cache.set(user.pk, (version, relations))
+    return relations
+
+
+def has_relation(request, name, obj_id):
+    """Проверяет, связан ли пользователь запроса с объектом."""
+    if request is None or not request.user.is_authenticated:
+        return False
+    return get_user_relations(request.user).contains(name, obj_id)
+
+
+def update_relation(user, name, obj_id, added):
+    """Обновляет связи пользователя после изменения связи с объектом."""
+    update_relations(user, name, (obj_id,), added)
+
+
+def update_relations(user, name, obj_ids, added):
+    """Обновляет связи пользователя после их изменения.
+
+    Версия связей в общем кэше увеличивается один раз на все obj_ids,
+    поэтому другие процессы загрузят связи заново. Связи этого процесса,
+    актуальные на начало запроса, обновляются на месте и сохраняются под
+    новой версией.
+    """
+    if not obj_ids:
+        return
+    seen_version = user.__dict__.get('_relations_version')
+    if seen_version is None:
+        seen_version = get_relations_version(user.pk)
+    version = user._relations_version = bump_relations_version(user.pk)
+    entry = relations_cache.get(user.pk)
+    if entry is None:
+        return
+    relations = entry[1]
+    if entry[0] != seen_version:
+        relations_cache.delete(user.pk)
+        return
+    change = relations.add if added else relations.discard
+    for obj_id in obj_ids:
+        change(name, obj_id)
+    relations_cache.set(user.pk, (version, relations))
@@ -0,0 +1,60 @@
+from rest_framework import renderers
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class PlainTextRenderer(renderers.BaseRenderer):
+    """Рендерер ответов в виде простого текста."""
+
+    media_type = 'text/plain'
+    format = 'txt'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return str(data).encode(self.charset)
+
+
+class CSVRenderer(PlainTextRenderer):
+    """Рендерер ответов в формате CSV."""
+
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    """Рендерер JSON на orjson с откатом на стандартный JSONRenderer.
+
+    Результат побайтно совпадает с JSONRenderer: компактный JSON в UTF-8
+    с экранированными U+2028 и U+2029. Типы, которые orjson не
+    поддерживает или кодирует иначе, например даты и Decimal,
+    кодируются encoder_class DRF. Без установленного orjson и при
+    запросе с отступами используется JSONRenderer.
+    """
+
+    options = 0 if orjson is None else (
+        orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or self.get_indent(
+            accepted_media_type, renderer_context or {}
+        ):
+            return super().render(
+                data, accepted_media_type, renderer_context)
+        try:
+            content = orjson.dumps(
+                data, default=self.encoder_class().default,
+                option=self.options
+            )
+        except orjson.JSONEncodeError:
+            return super().render(
+                data, accepted_media_type, renderer_context)
+        if b'\xe2\x80\xa8' in content or b'\xe2\x80\xa9' in content:
+            content = content.replace(
+                b'\xe2\x80\xa8', b'\\u2028').replace(
+                b'\xe2\x80\xa9', b'\\u2029')
+        return content
@@ -0,0 +1,223 @@
+from collections import defaultdict
+from operator import attrgetter
+
+from django.conf import settings
+from django.db.models import Model, QuerySet
+
+from recipes.models import IngredientsInRecipe, Recipe
+from .cache import get_recipe_cache, get_recipe_key
+from .fields import get_image_thumb, get_image_url, get_srcset
+from .relations import get_user_relations
+from .serializers import (
+    IngredientInRecipeSerializer,
+    IngredientSerializer,
+    TagSerializer
+)
+
+
+class ValuesListSerializer:
+    """Сериализатор списков, собирающий словари из строк values_list().
+
+    Поля ответа и их порядок берутся из Meta.fields сериализатора
+    serializer_class. Набор запросов читается одним values_list() без
+    создания экземпляров моделей, кортежи значений принимаются как есть,
+    а у экземпляров моделей поля читаются заранее собранным attrgetter.
+    """
+
+    serializer_class = None
+
+    def __init__(self, instance=None, many=True, context=None):
+        self.instance = instance
+        self.context = context or {}
+
+    @classmethod
+    def get_fields(cls):
+        return cls.serializer_class.Meta.fields
+
+    @property
+    def data(self):
+        fields = self.get_fields()
+        rows = self.instance
+        if isinstance(rows, QuerySet):
+            rows = rows.values_list(*fields)
+        else:
+            getter = attrgetter(*fields)
+            rows = [
+                getter(row) if isinstance(row, Model) else row
+                for row in rows
+            ]
+        return [dict(zip(fields, row)) for row in rows]
+
+
+class TagListSerializer(ValuesListSerializer):
+    serializer_class = TagSerializer
+
+
+class IngredientListSerializer(ValuesListSerializer):
+    serializer_class = IngredientSerializer
+
+
+TAG_COLUMNS = tuple(f'tag__{field}' for field in TagSerializer.Meta.fields)
+
+INGREDIENT_COLUMNS = (
+    'ingredient_id',
+    'ingredient__name',
+    'ingredient__measurement_unit',
+    'amount',
+)
+
+
+def group_rows(rows, fields):
+    """Группирует строки вида (recipe_id, *значения) в словари по рецептам."""
+    grouped = defaultdict(list)
+    for recipe_id, *values in rows:
+        grouped[recipe_id].append(dict(zip(fields, values)))
+    return grouped
+
+
+class RecipeListSerializer:
+    """Сериализатор рецептов без полей DRF.
+
+    Представление рецепта состоит из общей для всех пользователей части,
+    которая хранится в кэше рецептов по id и версии рецепта, и отметок
+    избранного, корзины и подписки, которые накладываются при ответе из
+    кэша связей пользователя. Общие части страницы читаются из кэша
+    одним get_many(), для промахов теги и ингредиенты читаются двумя
+    запросами values_list(). Рецепты должны быть загружены вместе с
+    авторами. Ответ совпадает с ответом RecipeSerializer.
+    """
+
+    def __init__(self, instance=None, many=False, context=None):
+        self.instance = instance
+        self.many = many
+        self.context = context or {}
+
+    def get_related(self, recipe_ids):
+        """Метод получения тегов и ингредиентов рецептов по их id."""
+        if not recipe_ids:
+            return {}, {}
+        tags = Recipe.tags.through.objects.filter(
+            recipe_id__in=recipe_ids
+        ).order_by('tag_id').values_list('recipe_id', *TAG_COLUMNS)
+        ingredients = IngredientsInRecipe.objects.filter(
+            recipe_id__in=recipe_ids
+        ).values_list('recipe_id', *INGREDIENT_COLUMNS)
+        return (
+            group_rows(tags, TagSerializer.Meta.fields),
+            group_rows(ingredients, IngredientInRecipeSerializer.Meta.fields)
+        )
+
+    @staticmethod
+    def build_entry(recipe, tags, ingredients):
+        """Метод сборки общей для всех пользователей части рецепта."""
+        author = recipe.author
+        return {
+            'id': recipe.id,
+            'tags': tags.get(recipe.id, []),
+            'author': {
+                'id': author.id,
+                'email': author.email,
+                'username': author.username,
+                'first_name': author.first_name,
+                'last_name': author.last_name,
+            },
+            'ingredients': ingredients.get(recipe.id, []),
+            'name': recipe.name,
+            'image': recipe.image.name,
+            'image_variants': recipe.image_variants,
+            'text': recipe.text,
+            'cooking_time': recipe.cooking_time,
+        }
+
+    def get_entries(self, recipes):
+        """Метод получения общих частей рецептов из кэша или их сборки."""
+        cache = get_recipe_cache()
+        keys = {
+            recipe.id: get_recipe_key(recipe.id, recipe.version)
+            for recipe in recipes
+        }
+        cached = cache.get_many(keys.values())
+        entries = {
+            recipe_id: cached[key] for recipe_id, key in keys.items()
+            if key in cached
+        }
+        missing = [recipe for recipe in recipes if recipe.id not in entries]
+        if missing:
+            tags, ingredients = self.get_related(
+                [recipe.id for recipe in missing])
+            built = {
+                recipe.id: self.build_entry(recipe, tags, ingredients)
+                for recipe in missing
+            }
+            cache.set_many(
+                {keys[recipe_id]: entry for recipe_id, entry in built.items()},
+                settings.RECIPE_CACHE_TIMEOUT
+            )
+            entries.update(built)
+        return entries
+
+    @staticmethod
+    def overlay(entry, request, relations):
+        """Метод наложения отметок пользователя на общую часть рецепта."""
+        image = get_image_url(entry['image'], request) if (
+            entry['image']) else None
+        variants = entry['image_variants']
+        return {
+            'id': entry['id'],
+            'tags': entry['tags'],
+            'author': {
+                **entry['author'],
+                'is_subscribed': relations is not None and (
+                    relations.contains('subscriptions', entry['author']['id'])
+                ),
+            },
+            'ingredients': entry['ingredients'],
+            'is_favorited': relations is not None and (
+                relations.contains('favorites', entry['id'])),
+            'is_in_shopping_cart': relations is not None and (
+                relations.contains('shopping_cart', entry['id'])),
+            'name': entry['name'],
+            'image': image,
+            'image_thumb': get_image_thumb(
+                entry['image'], variants, request) if (
+                    variants.get('thumb')) else image,
+            'srcset': get_srcset(variants, request),
+            'text': entry['text'],
+            'cooking_time': entry['cooking_time'],
+        }
+
+    @property
+    def data(self):
+        recipes = list(self.instance) if self.many else [self.instance]
+        entries = self.get_entries(recipes)
+        request = self.context.get('request')
+        relations = None
+        if request is not None and request.user.is_authenticated:
+            relations = get_user_relations(request.user)
+        data = [
+            self.overlay(entries[recipe.id], request, relations)
+            for recipe in recipes
+        ]
+        return data if self.many else data[0]
+
+
+class FastListMixin:
+    """Миксин быстрой сериализации списков без полей DRF.
+
+    При включённой настройке FAST_LIST_RENDERING действия fast_actions
+    сериализуют объекты сериализатором list_serializer_class, остальные
+    действия используют обычный сериализатор представления.
+    """
+
+    list_serializer_class = None
+    fast_actions = ('list',)
+
+    def use_fast_list(self):
+        return self.action in self.fast_actions and (
+            settings.FAST_LIST_RENDERING)
+
+    def get_serializer(self, *args, **kwargs):
+        if not self.use_fast_list():
+            return super().get_serializer(*args, **kwargs)
+        kwargs.setdefault('context', self.get_serializer_context())
+        return self.list_serializer_class(*args, **kwargs)
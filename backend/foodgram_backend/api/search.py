@@ -0,0 +1,89 @@
+import threading
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+
+from recipes.models import Ingredient
+from .cache import get_catalog_version
+
+TRIGRAM_LENGTH = 3
+
+
+def get_trigrams(value):
+    """Возвращает множество триграмм строки."""
+    return {
+        value[position:position + TRIGRAM_LENGTH]
+        for position in range(len(value) - TRIGRAM_LENGTH + 1)
+    }
+
+
+class IngredientSearchIndex:
+    """Поисковый индекс ингредиентов в памяти процесса.
+
+    Названия хранятся в отсортированном массиве в приведённом к единому
+    регистру виде: поиск по началу названия выполняется бинарным поиском,
+    поиск по вхождению - через индекс триграмм. Совпадения по началу
+    названия выдаются первыми. Индекс строится лениво и перестраивается,
+    когда меняется версия справочника ингредиентов в общем кэше.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = None
+
+    def _build(self, version):
+        rows = sorted(
+            Ingredient.objects.values_list('id', 'name', 'measurement_unit'),
+            key=lambda row: (row[1].casefold(), row[1], row[0])
+        )
+        keys = [name.casefold() for _, name, _ in rows]
+        trigrams = defaultdict(set)
+        for position, key in enumerate(keys):
+            for trigram in get_trigrams(key):
+                trigrams[trigram].add(position)
+        return {
+            'version': version,
+            'rows': rows,
+            'keys': keys,
+            'trigrams': dict(trigrams),
+        }
+
+    def _get_data(self):
+        version = get_catalog_version('ingredients')
+        data = self._data
+        if data is None or data['version'] != version:
+            with self._lock:
+                data = self._data
+                if data is None or data['version'] != version:
+                    data = self._data = self._build(version)
+        return data
+
+    def search(self, query):
+        """Возвращает ингредиенты, найденные по началу и вхождению строки.
+
+        Результат - список кортежей (id, name, measurement_unit).
+        """
+        term = query.strip().casefold()
+        data = self._get_data()
+        rows, keys = data['rows'], data['keys']
+        if not term:
+            return list(rows)
+        start = bisect_left(keys, term)
+        end = bisect_right(keys, term + '\U0010ffff', lo=start)
+        if len(term) >= TRIGRAM_LENGTH:
+            postings = sorted(
+                (data['trigrams'].get(trigram, set())
+                 for trigram in get_trigrams(term)),
+                key=len
+            )
+            candidates = set.intersection(*postings)
+        else:
+            candidates = range(len(keys))
+        infix = sorted(
+            (keys[position].find(term), position)
+            for position in candidates
+            if not start <= position < end and term in keys[position]
+        )
+        return rows[start:end] + [rows[position] for _, position in infix]
+
+
+ingredient_index = IngredientSearchIndex()
@@ -1,15 +1,23 @@
+from django.conf import settings
+from django.db import transaction
 from rest_framework import serializers
-from drf_extra_fields.fields import Base64ImageField
 
-from users.models import CustomUser, Subscription
+from users.models import CustomUser
+from recipes.images import schedule_image_variants
 from recipes.models import (
-    Favorites,
     Recipe,
-    ShoppingCart,
+    ShoppingTotal,
     Tag,
     Ingredient,
     IngredientsInRecipe
 )
+from .fields import (
+    BulkPrimaryKeyRelatedField,
+    BulkRelatedFieldsMixin,
+    RecipeImageVariantsMixin,
+    StreamingBase64ImageField
+)
+from .relations import has_relation
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -30,77 +38,61 @@ class UserSerializer(serializers.ModelSerializer):
 
     def get_is_subscribed(self, obj):
         """Метод для отображения поля подписок."""
-        context = self.context.get('request')
-        return (
-            context
-            and context.user.is_authenticated
-            and context.user.subscriptions.filter(
-                subscribed_to=obj
-            ).exists()
-        )
-
-
-class SubscriptionSerializer(serializers.ModelSerializer):
-    """Сериализатор для создания подписок."""
-
-    class Meta:
-        model = Subscription
-        fields = ('subscriber', 'subscribed_to')
-
-    def validate(self, data):
-        """Метод валидации полей сериализатора."""
-        subscriber = data.get('subscriber')
-        subscribed_to = data.get('subscribed_to')
-        if subscriber == subscribed_to:
-            raise serializers.ValidationError(
-                'Невозможно оформить подписку на свой профиль.'
-            )
-        if subscriber.subscriptions.filter(subscribed_to=subscribed_to):
-            raise serializers.ValidationError(
-                'Данный пользователь уже добавлен в подписки'
-            )
-        return data
-
-    def to_representation(self, instance):
-        """Метод представления сериализованных данных."""
-        return SubscriptionGetSerializer(
-            instance.subscribed_to, context=self.context
-        ).data
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
+        return has_relation(
+            self.context.get('request'), 'subscriptions', obj.id)
 
 
 class SubscriptionGetSerializer(UserSerializer):
     """Сериализатор для получения списка подписок."""
 
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.IntegerField(
-        read_only=True,
-        default=0,
-        source='recipes.count'
-    )
+    recipes_count = serializers.SerializerMethodField()
 
     class Meta(UserSerializer.Meta):
         fields = UserSerializer.Meta.fields + (
             'recipes', 'recipes_count',)
 
-    def get_recipes(self, obj):
-        """Метод для получения списка рецептов."""
-        query_params = self.context.get(
-            'request'
-        ).query_params.get('recipes_limit')
-        recipe_data = obj.recipes.all()
+    @staticmethod
+    def get_recipes_limit(request):
+        """Метод получения ограничения количества рецептов из запроса."""
+        recipes_limit = request.query_params.get('recipes_limit')
+        if not recipes_limit:
+            return None
         try:
-            if query_params:
-                recipe_data = recipe_data[:int(query_params)]
+            recipes_limit = int(recipes_limit)
+            if recipes_limit < 0:
+                raise ValueError
         except ValueError:
             raise serializers.ValidationError(
                 'Укажите "recipes_limit" целым положительным чиислом.'
             )
+        return recipes_limit
+
+    def get_recipes(self, obj):
+        """Метод для получения списка рецептов."""
+        recipes_by_author = self.context.get('recipes_by_author')
+        if recipes_by_author is not None:
+            recipe_data = recipes_by_author.get(obj.id, ())
+        else:
+            recipe_data = obj.recipes.all()
+            recipes_limit = self.get_recipes_limit(
+                self.context.get('request'))
+            if recipes_limit is not None:
+                recipe_data = recipe_data[:recipes_limit]
         return RecipeRepresentationSerializer(
             recipe_data,
             many=True,
             context=self.context
         ).data
 
+    def get_recipes_count(self, obj):
+        """Метод для получения количества рецептов автора."""
+        if hasattr(obj, 'recipes_count'):
+            return obj.recipes_count
+        return obj.recipes.count()
+
 
 class TagSerializer(serializers.ModelSerializer):
     """Сериализатор для тегов."""
@@ -148,7 +140,7 @@ class IngredientInRecipeSerializer(serializers.ModelSerializer):
         )
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeSerializer(RecipeImageVariantsMixin, serializers.ModelSerializer):
     """Сериализатов для рецептов."""
 
     tags = TagSerializer(many=True)
@@ -156,7 +148,7 @@ class RecipeSerializer(serializers.ModelSerializer):
     ingredients = serializers.SerializerMethodField()
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
-    image = Base64ImageField()
+    image = StreamingBase64ImageField()
 
     class Meta:
         model = Recipe
@@ -169,33 +161,20 @@ class RecipeSerializer(serializers.ModelSerializer):
             'is_in_shopping_cart',
             'name',
             'image',
+            'image_thumb',
+            'srcset',
             'text',
             'cooking_time',
         )
 
     def get_is_favorited(self, obj):
         """Метод для отображения поля избранного."""
-        context = self.context.get('request')
-        return (
-            context
-            and context.user.is_authenticated
-            and Favorites.objects.filter(
-                user=context.user,
-                recipe=obj
-            ).exists()
-        )
+        return has_relation(self.context.get('request'), 'favorites', obj.id)
 
     def get_is_in_shopping_cart(self, obj):
         """Метод для отображения поля корзины покупок."""
-        context = self.context.get('request')
-        return (
-            context
-            and context.user.is_authenticated
-            and ShoppingCart.objects.filter(
-                user=context.user,
-                recipe=obj
-            ).exists()
-        )
+        return has_relation(
+            self.context.get('request'), 'shopping_cart', obj.id)
 
     def get_ingredients(self, obj):
         """Метод для отображения поля ингредиентов."""
@@ -206,7 +185,7 @@ class RecipeSerializer(serializers.ModelSerializer):
 class IngredientInRecipeEditSerializer(serializers.ModelSerializer):
     """Сериализатор ингредиентов для редактирования рецептов."""
 
-    id = serializers.PrimaryKeyRelatedField(
+    id = BulkPrimaryKeyRelatedField(
         queryset=Ingredient.objects.all()
     )
 
@@ -218,19 +197,25 @@ class IngredientInRecipeEditSerializer(serializers.ModelSerializer):
         )
 
 
-class RecipeEditSerializer(serializers.ModelSerializer):
-    """Сериализатор для редактирования рецептов."""
+class RecipeEditSerializer(
+    BulkRelatedFieldsMixin, serializers.ModelSerializer
+):
+    """Сериализатор для редактирования рецептов.
+
+    Ингредиенты и теги из данных загружаются двумя запросами in_bulk()
+    независимо от их количества.
+    """
 
     ingredients = IngredientInRecipeEditSerializer(
         many=True,
         allow_null=False,
         allow_empty=False,
     )
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = BulkPrimaryKeyRelatedField(
         queryset=Tag.objects.all(),
         many=True
     )
-    image = Base64ImageField()
+    image = StreamingBase64ImageField()
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
 
@@ -249,36 +234,96 @@ class RecipeEditSerializer(serializers.ModelSerializer):
 
     @staticmethod
     def add_ingredients(recipe, ingredients):
-        """Метод для сохранения ингредиентов в рецепте."""
-        recipe.ingredients_in_recipe.all().delete()
-        return recipe.ingredients_in_recipe.bulk_create(
-            [
+        """Метод для сохранения ингредиентов в рецепте.
+
+        Текущие ингредиенты сравниваются с новыми: лишние удаляются,
+        у оставшихся обновляются изменившиеся количества, недостающие
+        добавляются. Изменения количеств переносятся в суммы ингредиентов
+        корзин, где лежит рецепт.
+        """
+        amounts = {
+            ingredient.get('id').id: ingredient.get('amount')
+            for ingredient in ingredients
+        }
+        recipe.ingredients_count = len(amounts)
+        with transaction.atomic():
+            current = {
+                item.ingredient_id: item
+                for item in recipe.ingredients_in_recipe.order_by()
+            }
+            old_amounts = {
+                ingredient_id: item.amount
+                for ingredient_id, item in current.items()
+            }
+            removed = [
+                item.pk for ingredient_id, item in current.items()
+                if ingredient_id not in amounts
+            ]
+            if removed:
+                IngredientsInRecipe.objects.filter(pk__in=removed).delete()
+            changed = []
+            for ingredient_id, item in current.items():
+                if ingredient_id in amounts and (
+                    item.amount != amounts[ingredient_id]
+                ):
+                    item.amount = amounts[ingredient_id]
+                    changed.append(item)
+            if changed:
+                IngredientsInRecipe.objects.bulk_update(changed, ('amount',))
+            added = [
                 IngredientsInRecipe(
-                    recipe=recipe,
-                    ingredient=ingredient.get('id'),
-                    amount=ingredient.get('amount')
-                ) for ingredient in ingredients
+                    recipe=recipe, ingredient_id=ingredient_id, amount=amount)
+                for ingredient_id, amount in amounts.items()
+                if ingredient_id not in current
             ]
-        )
+            if added:
+                IngredientsInRecipe.objects.bulk_create(added)
+            if old_amounts != amounts:
+                ShoppingTotal.objects.apply_recipe_change(
+                    recipe.pk, old_amounts, amounts)
+        return added
 
     def create(self, validated_data):
         """Метод создания рецепта."""
         ingredients = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
         validated_data['author'] = self.context.get('request').user
-        recipe = Recipe.objects.create(**validated_data)
-        self.add_ingredients(recipe=recipe, ingredients=ingredients)
-        recipe.tags.set(tags, clear=True)
-        recipe.save()
+        validated_data['ingredients_count'] = len(ingredients)
+        with transaction.atomic():
+            recipe = Recipe.objects.create(**validated_data)
+            recipe.tags.add(*tags)
+            self.add_ingredients(recipe=recipe, ingredients=ingredients)
+            Recipe.objects.filter(pk=recipe.pk).update_search_index()
+            schedule_image_variants(recipe)
         return recipe
 
     def update(self, instance, validated_data):
-        """Метод обновления рецептов."""
+        """Метод обновления рецептов.
+
+        Теги и ингредиенты меняются только в отличающейся части, а
+        загруженное заново то же изображение не сохраняется повторно.
+        """
         ingredients = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
-        instance.tags.set(tags, clear=True)
-        self.add_ingredients(recipe=instance, ingredients=ingredients)
-        return super().update(instance, validated_data)
+        image = validated_data.get('image')
+        if image is not None and image is instance.image:
+            del validated_data['image']
+            image = None
+        with transaction.atomic():
+            instance.tags.set(tags)
+            self.add_ingredients(recipe=instance, ingredients=ingredients)
+            instance = super().update(instance, validated_data)
+            recipes = Recipe.objects.filter(pk=instance.pk)
+            if image:
+                previous_variants = recipes.values_list(
+                    'image_variants', flat=True).get()
+                recipes.update(image_variants={})
+                instance.image_variants = {}
+            recipes.update_search_index()
+            recipes.bump_version()
+            if image:
+                schedule_image_variants(instance, previous_variants)
+        return instance
 
     def to_representation(self, instance):
         """Метод изменения выходных данных сериализатора."""
@@ -315,7 +360,9 @@ class RecipeEditSerializer(serializers.ModelSerializer):
         return value
 
 
-class RecipeRepresentationSerializer(serializers.ModelSerializer):
+class RecipeRepresentationSerializer(
+    RecipeImageVariantsMixin, serializers.ModelSerializer
+):
     """Сериализатор для представлений корзины и избранного."""
 
     class Meta:
@@ -324,51 +371,22 @@ class RecipeRepresentationSerializer(serializers.ModelSerializer):
             'id',
             'name',
             'image',
+            'image_thumb',
             'cooking_time'
         )
 
 
-class ShoppingCartSerializer(serializers.ModelSerializer):
-    """Сериализатор корзины покупок."""
-
-    class Meta:
-        model = ShoppingCart
-        fields = ('user', 'recipe')
-
-    def validate(self, data):
-        """Метод валидации полей сериализатора."""
-        if ShoppingCart.objects.filter(
-            user=data.get('user'),
-            recipe=data.get('recipe')
-        ).exists():
-            raise serializers.ValidationError(
-                'Данный рецепт уже добавлен в корзину')
-        return data
-
-    def to_representation(self, instance):
-        """Метод представления сериализованных данных."""
-        return RecipeRepresentationSerializer(
-            instance.recipe).data
-
-
-class FavoriteSerializer(serializers.ModelSerializer):
-    """Сериализатор для добавления рецептов в избранное."""
+class BulkIdsSerializer(serializers.Serializer):
+    """Сериализатор списка id для массовых операций."""
 
-    class Meta:
-        model = Favorites
-        fields = ('user', 'recipe')
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False
+    )
 
-    def validate(self, data):
-        """Метод валидации полей сериализатора."""
-        if Favorites.objects.filter(
-            user=data.get('user'),
-            recipe=data.get('recipe')
-        ).exists():
+    def validate_ids(self, value):
+        """Метод проверки размера списка и удаления повторов id."""
+        if len(value) > settings.BULK_WRITE_MAX_ITEMS:
             raise serializers.ValidationError(
-                'Данный рецепт уже добавлен в избранное')
-        return data
-
-    def to_representation(self, instance):
-        """Метод представления сериализованных данных."""
-        return RecipeRepresentationSerializer(
-            instance.recipe).data
+                f'Передайте не более {settings.BULK_WRITE_MAX_ITEMS} id.')
+        return list(dict.fromkeys(value))
@@ -0,0 +1,68 @@
+import csv
+import json
+
+from django.db.models import F
+
+from recipes.models import ShoppingTotal
+
+
+class Echo:
+    """Псевдо-файл, возвращающий записанную строку вместо буферизации."""
+
+    def write(self, value):
+        return value
+
+
+def get_purchase_rows(user):
+    """Возвращает суммы ингредиентов из корзины пользователя.
+
+    Суммы читаются из заранее посчитанной таблицы ShoppingTotal.
+    """
+    return ShoppingTotal.objects.filter(user=user).values(
+        'ingredient_id',
+        name=F('ingredient__name'),
+        measurement_unit=F('ingredient__measurement_unit'),
+        total_amount=F('amount'),
+    ).order_by('name', 'measurement_unit')
+
+
+def purchase_list_txt(rows):
+    """Построчно формирует список покупок в текстовом виде."""
+    yield 'Ваш список покупок: '
+    for row in rows:
+        yield (
+            f'{row["name"]}, {row["total_amount"]} '
+            f'{row["measurement_unit"]}; '
+        )
+
+
+def purchase_list_csv(rows):
+    """Построчно формирует список покупок в формате CSV."""
+    writer = csv.writer(Echo())
+    yield writer.writerow(('name', 'amount', 'measurement_unit'))
+    for row in rows:
+        yield writer.writerow(
+            (row['name'], row['total_amount'], row['measurement_unit']))
+
+
+def purchase_list_json(rows):
+    """Построчно формирует список покупок в формате JSON."""
+    separator = '['
+    for row in rows:
+        yield separator + json.dumps(
+            {
+                'name': row['name'],
+                'amount': row['total_amount'],
+                'measurement_unit': row['measurement_unit'],
+            },
+            ensure_ascii=False
+        )
+        separator = ','
+    yield '[]' if separator == '[' else ']'
+
+
+PURCHASE_LIST_FORMATS = {
+    'txt': purchase_list_txt,
+    'csv': purchase_list_csv,
+    'json': purchase_list_json,
+}
@@ -0,0 +1,84 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from rest_framework.authtoken.models import Token
+
+from recipes.models import Favorites, Ingredient, Recipe, ShoppingCart, Tag
+from users.models import CustomUser
+from .authentication import invalidate_tokens
+from .cache import bump_catalog_version
+from .relations import bump_relations_version, relations_cache
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def bump_tags_version(**kwargs):
+    """Обновляет версию справочника тегов при их изменении."""
+    bump_catalog_version('tags')
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def bump_ingredients_version(**kwargs):
+    """Обновляет версию справочника ингредиентов при их изменении."""
+    bump_catalog_version('ingredients')
+
+
+@receiver((post_save, pre_delete), sender=Tag)
+def bump_tagged_recipes_version(instance, **kwargs):
+    """Обновляет версии рецептов при изменении или удалении их тега."""
+    Recipe.objects.filter(tags=instance).bump_version()
+
+
+@receiver(post_save, sender=Ingredient)
+def update_recipes_search_index(instance, created, **kwargs):
+    """Обновляет поисковый индекс и версии рецептов с ингредиентом."""
+    if not created:
+        recipes = Recipe.objects.filter(ingredients=instance)
+        recipes.update_search_index()
+        recipes.bump_version()
+
+
+@receiver(pre_delete, sender=Recipe)
+def subtract_deleted_recipe_totals(instance, **kwargs):
+    """Удаляет рецепт из корзин, вычитая его из сумм ингредиентов."""
+    ShoppingCart.objects.filter(recipe=instance).delete()
+
+
+@receiver(pre_delete, sender=CustomUser)
+def delete_user_relations(instance, **kwargs):
+    """Удаляет избранное и корзину пользователя перед его удалением.
+
+    Каскадное удаление обходит UserRecipeRelationQuerySet.delete(),
+    поэтому без этого счётчики рецептов и суммы корзины не уменьшатся.
+    """
+    Favorites.objects.filter(user=instance).delete()
+    ShoppingCart.objects.filter(user=instance).delete()
+    bump_relations_version(instance.pk)
+    relations_cache.delete(instance.pk)
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(instance, **kwargs):
+    """Удаляет токен из кэша при выходе пользователя из системы."""
+    invalidate_tokens(instance.key)
+
+
+@receiver(post_save, sender=CustomUser)
+def invalidate_user_tokens(instance, created, **kwargs):
+    """Удаляет из кэша токены изменённого пользователя.
+
+    Это касается смены пароля и деактивации, а также любых других
+    изменений, которые иначе не увидел бы закэшированный request.user.
+    """
+    if not created:
+        invalidate_tokens(*Token.objects.filter(
+            user_id=instance.pk).values_list('key', flat=True))
+
+
+@receiver(post_save, sender=CustomUser)
+def bump_author_recipes_version(instance, created, update_fields, **kwargs):
+    """Обновляет версии рецептов автора при изменении его профиля.
+
+    Обновление только времени последнего входа профиль не меняет.
+    """
+    if not created and set(update_fields or ()) != {'last_login'}:
+        Recipe.objects.filter(author_id=instance.pk).bump_version()
@@ -1,19 +1,74 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+import zlib
+from base64 import b64encode
+from datetime import datetime, timezone
+from decimal import Decimal
+from io import BytesIO, StringIO
+from tempfile import TemporaryDirectory
+
+from asgiref.sync import async_to_sync
+from django.core.cache import caches
+from django.core.files.storage import default_storage
+from django.core.management import CommandError, call_command
+from django.db import connection, connections
+from django.db.backends.signals import connection_created
+from django.test import (
+    AsyncClient, Client, SimpleTestCase, override_settings)
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from PIL import Image
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APITransactionTestCase
 from rest_framework.authtoken.models import Token
 
-from recipes.models import User, Recipe, Ingredient, IngredientsInRecipe, Tag
+from api.benchmarks import get_endpoints, run_benchmarks
+from api.cache import (
+    bump_catalog_version,
+    get_catalog_cache,
+    get_catalog_version,
+    get_recipe_cache
+)
+from api.fields import StreamingBase64ImageField
+from api.relations import (
+    RELATIONS_CACHE_ALIAS,
+    bump_relations_version,
+    get_relations_key,
+    get_relations_version,
+    relations_cache
+)
+from api.renderers import FastJSONRenderer
+from api.serializers import RecipeEditSerializer
+from foodgram_backend.compression import brotli, negotiate_encoding
+from foodgram_backend.db_backends.pool import pools
+from foodgram_backend.db_backends.sqlite3.base import DatabaseWrapper
+from foodgram_backend.instrumentation import (
+    collect_metrics,
+    get_repeated_queries,
+    record_repeated_queries
+)
+from recipes.images import generate_image_variants, get_variant_files
+from users.models import Subscription
+from recipes.models import (
+    User, Favorites, Recipe, Ingredient, IngredientsInRecipe, ShoppingCart,
+    ShoppingTotal, Tag)
 
 
-class RecipesApiTestCase(APITransactionTestCase):
-    """Тесты api рецептов."""
+class ApiTestCase(APITransactionTestCase):
+    """Общие данные тестов api: пользователь, рецепт, ингредиент и тег."""
 
     @classmethod
     def setUpClass(cls):
         cls.url = reverse('recipes-list')
 
     def setUp(self) -> None:
+        relations_cache.clear()
+        get_recipe_cache().clear()
         self.user = User.objects.create_user(username='vi')
         token = Token.objects.create(user=self.user)
         self.client.credentials(HTTP_AUTHORIZATION='Token ' + token.key)
@@ -35,6 +90,10 @@ class RecipesApiTestCase(APITransactionTestCase):
         )
         self.tag = Tag.objects.create(name='dinner', color='red')
 
+
+class RecipesApiTestCase(ApiTestCase):
+    """Тесты api рецептов."""
+
     def test_smoke(self):
         self.assertTrue(True)
 
@@ -76,3 +135,1215 @@ class RecipesApiTestCase(APITransactionTestCase):
             amount=ing.get('amount'),
             ingredient=self.salt.id).last()
         self.assertEqual(ing.get('amount'), str(rec_ing.amount))
+
+    def test_list_query_count_does_not_depend_on_page_size(self):
+        for number in range(10):
+            recipe = Recipe.objects.create(
+                author=User.objects.create_user(
+                    username=f'author{number}', email=f'{number}@mail.ru'),
+                name=f'Recipe {number}',
+                text='Text',
+                cooking_time=5,
+            )
+            recipe.tags.add(self.tag)
+            IngredientsInRecipe.objects.create(
+                ingredient=self.salt, amount=number + 1, recipe=recipe)
+
+        self.client.get(self.url)
+        get_recipe_cache().clear()
+        with CaptureQueriesContext(connection) as small_page:
+            self.client.get(self.url, {'limit': 2})
+        get_recipe_cache().clear()
+        with CaptureQueriesContext(connection) as large_page:
+            resp = self.client.get(self.url, {'limit': 10})
+
+        self.assertEqual(len(resp.data['results']), 10)
+        self.assertEqual(
+            len(small_page.captured_queries),
+            len(large_page.captured_queries)
+        )
+
+    def test_ingredient_search_ranks_prefix_matches_first(self):
+        url = reverse('ingredients-list')
+        for name in ('Соль морская', 'морская капуста', 'Морковь'):
+            Ingredient.objects.create(name=name, measurement_unit='г')
+
+        resp = self.client.get(url, {'search': 'мор'})
+
+        self.assertEqual(
+            [ingredient['name'] for ingredient in resp.data],
+            ['Морковь', 'морская капуста', 'Соль морская']
+        )
+        Ingredient.objects.create(name='Морс', measurement_unit='мл')
+        resp = self.client.get(url, {'search': 'МОРС'})
+        self.assertEqual(resp.data[0]['name'], 'Морс')
+
+    def test_cursor_pagination(self):
+        for number in range(4):
+            Recipe.objects.create(
+                author=self.user, name=f'R{number}', text='Text',
+                cooking_time=5,
+            )
+        expected = list(Recipe.objects.order_by(
+            '-pub_date', '-id').values_list('id', flat=True))
+
+        resp = self.client.get(self.url, {'cursor': '', 'limit': 2})
+        self.assertNotIn('count', resp.data)
+        self.assertIsNone(resp.data['previous'])
+        received = [recipe['id'] for recipe in resp.data['results']]
+        while resp.data['next']:
+            resp = self.client.get(resp.data['next'])
+            received += [recipe['id'] for recipe in resp.data['results']]
+        self.assertEqual(received, expected)
+
+        resp = self.client.get(resp.data['previous'])
+        self.assertEqual(
+            [recipe['id'] for recipe in resp.data['results']],
+            expected[2:4]
+        )
+        resp = self.client.get(self.url, {'cursor': 'broken'})
+        self.assertEqual(resp.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_recipe_search(self):
+        pepper = Ingredient.objects.create(
+            name='Перец', measurement_unit='г')
+        by_name = Recipe.objects.create(
+            author=self.user, name='Перцовый суп', text='Суп',
+            cooking_time=5)
+        by_ingredient = Recipe.objects.create(
+            author=self.user, name='Рагу', text='Овощи', cooking_time=5)
+        IngredientsInRecipe.objects.create(
+            ingredient=pepper, amount=1, recipe=by_ingredient)
+        by_text = Recipe.objects.create(
+            author=self.user, name='Салат', text='Посыпать перцем',
+            cooking_time=5)
+        Recipe.objects.update_search_index()
+
+        resp = self.client.get(self.url, {'search': 'пер'})
+        self.assertEqual(
+            [recipe['id'] for recipe in resp.data['results']],
+            [by_name.id, by_ingredient.id, by_text.id]
+        )
+        self.assertEqual(resp.data['count'], 3)
+
+        pepper.name = 'Паприка'
+        pepper.save()
+        resp = self.client.get(self.url, {'search': 'паприка'})
+        self.assertEqual(
+            [recipe['id'] for recipe in resp.data['results']],
+            [by_ingredient.id]
+        )
+        by_text.delete()
+        resp = self.client.get(self.url, {'search': 'пер'})
+        self.assertEqual(resp.data['count'], 1)
+
+    def test_tags_filter(self):
+        lunch = Tag.objects.create(name='lunch', color='blue', slug='lunch')
+        self.tag.slug = 'dinner'
+        self.tag.save()
+        both = Recipe.objects.create(
+            author=self.user, name='Both', text='Text', cooking_time=5)
+        both.tags.set((self.tag, lunch))
+        self.recipe.tags.set((self.tag,))
+
+        resp = self.client.get(self.url, {'tags': ['dinner', 'lunch']})
+        self.assertEqual(resp.data['count'], 2)
+        self.assertEqual(
+            [recipe['id'] for recipe in resp.data['results']],
+            [both.id, self.recipe.id]
+        )
+        resp = self.client.get(
+            self.url, {'tags': ['dinner', 'lunch'], 'tags_mode': 'all'})
+        self.assertEqual(
+            [recipe['id'] for recipe in resp.data['results']], [both.id])
+        resp = self.client.get(
+            self.url, {'tags': ['dinner', 'unknown'], 'tags_mode': 'all'})
+        self.assertEqual(resp.data['count'], 0)
+        resp = self.client.get(self.url, {'tags': 'unknown'})
+        self.assertEqual(resp.data['count'], 0)
+        resp = self.client.get(self.url, {'tags_mode': 'some'})
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_image_variants(self):
+        buffer = BytesIO()
+        Image.new('RGB', (1200, 800), 'red').save(buffer, 'JPEG')
+        payload = 'data:image/jpeg;base64,' + b64encode(
+            buffer.getvalue()).decode()
+        with TemporaryDirectory() as media_root, override_settings(
+            MEDIA_ROOT=media_root
+        ):
+            field = StreamingBase64ImageField()
+            self.recipe.image.save(
+                'cookie.jpg', field.to_internal_value(payload))
+
+            stale = Recipe.objects.get(pk=self.recipe.id)
+            variants = generate_image_variants(
+                self.recipe.id, self.recipe.image.name)
+            stale.name = 'Stale cookie'
+            stale.save()
+
+            self.assertEqual(variants['thumb']['width'], 320)
+            self.recipe.refresh_from_db()
+            self.assertEqual(self.recipe.image_variants, variants)
+            resp = self.client.get(
+                reverse('recipes-detail', args=(self.recipe.id,)))
+            self.assertIn('_thumb.', resp.data['image_thumb'])
+            self.assertIn(' 960w', resp.data['srcset'])
+
+            old_name = self.recipe.image.name
+            self.recipe.image.save(
+                'pie.jpg', field.to_internal_value(payload))
+            new_variants = generate_image_variants(
+                self.recipe.id, self.recipe.image.name, variants)
+            stale_variants = generate_image_variants(
+                self.recipe.id, old_name)
+            for name in get_variant_files(variants):
+                self.assertFalse(default_storage.exists(name))
+            for name in get_variant_files(new_variants):
+                self.assertTrue(default_storage.exists(name))
+            self.recipe.refresh_from_db()
+            self.assertEqual(self.recipe.image_variants, new_variants)
+            self.assertEqual(stale_variants, variants)
+
+    def test_recipe_update_diff(self):
+        buffer = BytesIO()
+        Image.new('RGB', (40, 30), 'red').save(buffer, 'JPEG')
+        payload = 'data:image/jpeg;base64,' + b64encode(
+            buffer.getvalue()).decode()
+        pepper = Ingredient.objects.create(name='Pepper', measurement_unit='g')
+        lunch = Tag.objects.create(name='lunch', color='blue', slug='lunch')
+        self.tag.slug = 'dinner'
+        self.tag.save()
+        self.recipe.tags.add(self.tag)
+        url = reverse('recipes-detail', args=(self.recipe.id,))
+        data = {
+            'ingredients': [
+                {'id': self.salt.id, 'amount': 5},
+                {'id': pepper.id, 'amount': 2},
+            ],
+            'tags': [self.tag.id, lunch.id],
+            'image': payload,
+            'name': 'Cookie',
+            'text': 'Badabada',
+            'cooking_time': 10,
+        }
+        with TemporaryDirectory() as media_root, override_settings(
+            MEDIA_ROOT=media_root
+        ):
+            self.recipe.image = StreamingBase64ImageField(
+            ).to_internal_value(payload)
+            self.recipe.save()
+            Recipe.objects.filter(pk=self.recipe.pk).update(
+                image_variants={'thumb': {'jpeg': 'thumb.jpg', 'width': 32}})
+            self.recipe.refresh_from_db()
+            image_name = self.recipe.image.name
+            self.assertEqual(len(self.recipe.image_digest), 64)
+
+            with CaptureQueriesContext(connection) as queries:
+                resp = self.client.patch(url, data, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertFalse(any(
+            query['sql'].startswith('DELETE')
+            for query in queries.captured_queries
+        ))
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image.name, image_name)
+        self.assertTrue(self.recipe.image_variants)
+        self.assertEqual(self.recipe.ingredients_count, 2)
+        self.assertEqual(
+            IngredientsInRecipe.objects.get(recipe=self.recipe, amount=5).pk,
+            self.recipe_ing.pk
+        )
+        self.assertEqual(
+            set(self.recipe.tags.values_list('id', flat=True)),
+            {self.tag.id, lunch.id}
+        )
+
+        del data['image']
+        data['ingredients'] = [{'id': pepper.id, 'amount': 2}]
+        data['tags'] = [lunch.id]
+        self.client.patch(url, data, format='json')
+        self.assertEqual(
+            list(self.recipe.ingredients_in_recipe.values_list(
+                'ingredient_id', 'amount')),
+            [(pepper.id, 2)]
+        )
+        self.assertEqual(list(self.recipe.tags.all()), [lunch])
+
+    def test_recipe_payload_bulk_resolution(self):
+        Ingredient.objects.bulk_create(
+            Ingredient(name=f'Ingredient {number}', measurement_unit='g')
+            for number in range(30)
+        )
+        ingredients = list(Ingredient.objects.exclude(pk=self.salt.pk))
+        tags = [self.tag] + [
+            Tag.objects.create(
+                name=f'tag{number}', color=f'#00000{number}',
+                slug=f'tag{number}'
+            ) for number in range(3)
+        ]
+        data = {
+            'ingredients': [
+                {'id': ingredient.id, 'amount': 2}
+                for ingredient in ingredients
+            ],
+            'tags': [tag.id for tag in tags],
+        }
+        serializer = RecipeEditSerializer(
+            self.recipe, data=data, partial=True)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.assertEqual(len(queries), 2)
+        self.assertEqual(
+            [item['id'] for item in serializer.validated_data['ingredients']],
+            ingredients
+        )
+        self.assertEqual(serializer.validated_data['tags'], tags)
+
+        data['ingredients'][0]['id'] = 9998
+        data['ingredients'].append({'id': 9999, 'amount': 1})
+        data['tags'].append('9997')
+        serializer = RecipeEditSerializer(
+            self.recipe, data=data, partial=True)
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('9998, 9999', serializer.errors['ingredients'][0])
+        self.assertIn('9997', serializer.errors['tags'][0])
+
+
+class RelationsApiTestCase(ApiTestCase):
+    """Тесты избранного, корзины и подписок."""
+
+    def test_subscriptions_recipes_limit(self):
+        url = reverse('users-get_subscriptions')
+        for number in range(5):
+            author = User.objects.create_user(
+                username=f'author{number}', email=f'{number}@mail.ru')
+            Subscription.objects.create(
+                subscriber=self.user, subscribed_to=author)
+            for recipe_number in range(number + 1):
+                Recipe.objects.create(
+                    author=author, name=f'R{number}-{recipe_number}',
+                    text='Text', cooking_time=5,
+                )
+
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as small_page:
+            self.client.get(url, {'limit': 1, 'recipes_limit': 2})
+        with CaptureQueriesContext(connection) as large_page:
+            resp = self.client.get(url, {'limit': 5, 'recipes_limit': 2})
+
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            len(small_page.captured_queries),
+            len(large_page.captured_queries)
+        )
+        for author in resp.data['results']:
+            expected = Recipe.objects.filter(author_id=author['id'])
+            self.assertTrue(author['is_subscribed'])
+            self.assertEqual(author['recipes_count'], expected.count())
+            self.assertEqual(
+                [recipe['id'] for recipe in author['recipes']],
+                list(expected.order_by('-pub_date', '-id').values_list(
+                    'id', flat=True)[:2])
+            )
+        resp = self.client.get(url, {'recipes_limit': 'many'})
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_favorites_counter(self):
+        popular = Recipe.objects.create(
+            author=self.user, name='Popular', text='Text', cooking_time=5)
+        url = reverse('recipes-add_delete_from_favorites', args=(popular.id,))
+
+        self.client.post(url)
+        popular.refresh_from_db()
+        self.assertEqual(popular.favorites_count, 1)
+        popular.name = 'Popular recipe'
+        popular.save()
+        popular.refresh_from_db()
+        self.assertEqual(popular.favorites_count, 1)
+        resp = self.client.get(self.url, {'ordering': '-favorites_count'})
+        self.assertEqual(resp.data['results'][0]['id'], popular.id)
+
+        self.client.delete(url)
+        popular.refresh_from_db()
+        self.assertEqual(popular.favorites_count, 0)
+        Recipe.objects.filter(pk=popular.pk).update(favorites_count=7)
+        self.assertEqual(Recipe.objects.reconcile_counters(), 2)
+        popular.refresh_from_db()
+        self.assertEqual(popular.favorites_count, 0)
+
+    def test_relation_flags_cache(self):
+        author = User.objects.create_user(username='author', email='a@a.ru')
+        self.recipe.author = author
+        self.recipe.save()
+        detail_url = reverse('recipes-detail', args=(self.recipe.id,))
+        self.client.get(detail_url)
+
+        self.client.post(reverse(
+            'recipes-add_delete_from_favorites', args=(self.recipe.id,)))
+        self.client.post(reverse(
+            'users-add_delete_subscription', args=(author.id,)))
+        with CaptureQueriesContext(connection) as queries:
+            resp = self.client.get(detail_url)
+        self.assertTrue(resp.data['is_favorited'])
+        self.assertTrue(resp.data['author']['is_subscribed'])
+        self.assertFalse(resp.data['is_in_shopping_cart'])
+        self.assertFalse(any(
+            'recipes_favorites' in query['sql']
+            for query in queries.captured_queries
+        ))
+
+        self.client.delete(reverse(
+            'recipes-add_delete_from_favorites', args=(self.recipe.id,)))
+        resp = self.client.get(detail_url)
+        self.assertFalse(resp.data['is_favorited'])
+
+        Favorites.objects.add(self.user.id, self.recipe.id)
+        self.assertFalse(self.client.get(detail_url).data['is_favorited'])
+        bump_relations_version(self.user.id)
+        self.assertTrue(self.client.get(detail_url).data['is_favorited'])
+
+    def test_concurrent_relation_toggles(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest(
+                'SQLite в памяти не поддерживает одновременную запись, '
+                'в SQLITE3_TEST_DATABASE должен быть задан файл базы.')
+        threads_count = 8
+        barrier = threading.Barrier(threads_count)
+        responses = []
+        token = Token.objects.get(user=self.user)
+
+        def toggle(method, url):
+            client = self.client_class()
+            client.credentials(HTTP_AUTHORIZATION='Token ' + token.key)
+            barrier.wait()
+            try:
+                responses.append(getattr(client, method)(url).status_code)
+            finally:
+                connections.close_all()
+
+        for url_name, counter_field in (
+            ('recipes-add_delete_from_favorites', 'favorites_count'),
+            ('recipes-add_delete_from_sopping_cart', 'shopping_cart_count'),
+        ):
+            url = reverse(url_name, args=(self.recipe.id,))
+            for method, created in (('post', 1), ('delete', 0)):
+                responses.clear()
+                threads = [
+                    threading.Thread(target=toggle, args=(method, url))
+                    for _ in range(threads_count)
+                ]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                self.recipe.refresh_from_db()
+                self.assertEqual(len(responses), threads_count)
+                self.assertEqual(
+                    sorted(responses)[0],
+                    status.HTTP_201_CREATED if created
+                    else status.HTTP_204_NO_CONTENT
+                )
+                self.assertEqual(
+                    responses.count(status.HTTP_400_BAD_REQUEST),
+                    threads_count - 1
+                )
+                self.assertEqual(
+                    getattr(self.recipe, counter_field), created)
+                self.assertEqual(ShoppingTotal.objects.find_drift(), [])
+
+    def test_bulk_relations(self):
+        url = reverse('recipes-bulk_favorites')
+        recipes = [self.recipe] + [
+            Recipe.objects.create(
+                author=self.user, name=f'Recipe {number}', text='Text',
+                cooking_time=5
+            ) for number in range(3)
+        ]
+        Favorites.objects.add(self.user.id, recipes[1].id)
+        self.client.get(self.url)
+        ids = [recipe.id for recipe in recipes]
+
+        with CaptureQueriesContext(connection) as queries:
+            resp = self.client.post(
+                url, {'ids': ids + [ids[0], 9999]}, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.data['results'], [
+            {'id': ids[0], 'status': 'added'},
+            {'id': ids[1], 'status': 'exists'},
+            {'id': ids[2], 'status': 'added'},
+            {'id': ids[3], 'status': 'added'},
+            {'id': 9999, 'status': 'not_found'},
+        ])
+        with CaptureQueriesContext(connection) as single_queries:
+            self.client.delete(url, {'ids': [ids[2]]}, format='json')
+        self.assertEqual(len(queries), len(single_queries))
+        self.assertEqual(
+            Recipe.objects.filter(pk__in=ids, favorites_count=1).count(), 3)
+        self.assertEqual(
+            [recipe['is_favorited']
+             for recipe in self.client.get(self.url).data['results']],
+            [True, False, True, True]
+        )
+
+        resp = self.client.delete(url, {'ids': ids[1:]}, format='json')
+        self.assertEqual(
+            [result['status'] for result in resp.data['results']],
+            ['removed', 'absent', 'removed']
+        )
+        self.assertEqual(
+            Favorites.objects.filter(user=self.user).count(), 1)
+        self.assertFalse(
+            Recipe.objects.filter(pk__in=ids[1:], favorites_count__gt=0))
+
+        version = 10 ** 15
+        caches[RELATIONS_CACHE_ALIAS].set(
+            get_relations_key(self.user.id), version, None)
+        self.client.post(
+            reverse('recipes-bulk_shopping_cart'), {'ids': ids[:2]},
+            format='json'
+        )
+        self.assertEqual(
+            ShoppingCart.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(get_relations_version(self.user.id), version + 1)
+
+        authors = [
+            User.objects.create_user(
+                username=f'author{number}', email=f'{number}@mail.ru')
+            for number in range(2)
+        ]
+        url = reverse('users-bulk_subscription')
+        resp = self.client.post(
+            url, {'ids': [authors[0].id, self.user.id, authors[1].id]},
+            format='json'
+        )
+        self.assertEqual(
+            [result['status'] for result in resp.data['results']],
+            ['added', 'invalid', 'added']
+        )
+        self.assertEqual(
+            Subscription.objects.filter(subscriber=self.user).count(), 2)
+        resp = self.client.delete(url, {'ids': [authors[0].id]}, format='json')
+        self.assertEqual(resp.data['results'][0]['status'], 'removed')
+        resp = self.client.post(
+            url, {'ids': [authors[0].id, authors[1].id]}, format='json')
+        self.assertEqual(
+            [result['status'] for result in resp.data['results']],
+            ['added', 'exists']
+        )
+        self.assertEqual(
+            Subscription.objects.remove_many(
+                self.user.id, [authors[1].id, authors[1].id, 9999]),
+            {authors[1].id}
+        )
+        self.assertEqual(
+            Subscription.objects.remove_many(self.user.id, [authors[1].id]),
+            set()
+        )
+
+        with self.settings(BULK_WRITE_MAX_ITEMS=2):
+            resp = self.client.post(url, {'ids': ids}, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+        for payload in ({}, {'ids': []}, {'ids': ['a']}):
+            resp = self.client.post(url, payload, format='json')
+            self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_relation_counters_model_paths(self):
+        other = Recipe.objects.create(
+            author=self.user, name='Other', text='Text', cooking_time=5)
+        cart = ShoppingCart.objects.create(user=self.user, recipe=self.recipe)
+        Favorites.objects.create(user=self.user, recipe=self.recipe)
+        favorite = Favorites.objects.create(user=self.user, recipe=other)
+        self.recipe.refresh_from_db()
+        self.assertEqual(
+            (self.recipe.favorites_count, self.recipe.shopping_cart_count),
+            (1, 1)
+        )
+        self.assertEqual(ShoppingTotal.objects.get().amount, 32)
+
+        favorite.recipe = self.recipe
+        favorite.user = User.objects.create_user(
+            username='other', email='other@mail.ru')
+        favorite.save()
+        cart.delete()
+        self.assertEqual(
+            Recipe.objects.filter(pk=other.pk).values_list(
+                'favorites_count', flat=True).get(), 0)
+        self.recipe.refresh_from_db()
+        self.assertEqual(
+            (self.recipe.favorites_count, self.recipe.shopping_cart_count),
+            (2, 0)
+        )
+        self.assertFalse(ShoppingTotal.objects.exists())
+        self.assertEqual(
+            Favorites.objects.filter(recipe=self.recipe).delete()[0], 2)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.favorites_count, 0)
+
+    def test_user_delete_updates_relation_counters(self):
+        other = User.objects.create_user(
+            username='other', email='other@mail.ru')
+        Favorites.objects.add(other.id, self.recipe.id)
+        ShoppingCart.objects.add(other.id, self.recipe.id)
+        version = bump_relations_version(other.id)
+        self.recipe.refresh_from_db()
+        self.assertEqual(
+            (self.recipe.favorites_count, self.recipe.shopping_cart_count),
+            (1, 1)
+        )
+        self.assertTrue(ShoppingTotal.objects.filter(user=other).exists())
+
+        other.delete()
+        self.recipe.refresh_from_db()
+        self.assertEqual(
+            (self.recipe.favorites_count, self.recipe.shopping_cart_count),
+            (0, 0)
+        )
+        self.assertFalse(ShoppingTotal.objects.exists())
+        self.assertGreater(bump_relations_version(other.id), version + 1)
+
+
+class ShoppingCartApiTestCase(ApiTestCase):
+    """Тесты списка покупок."""
+
+    def test_download_shopping_cart_formats(self):
+        url = reverse('recipes-download_shopping_cart')
+        ShoppingCart.objects.create(user=self.user, recipe=self.recipe)
+
+        resp = self.client.get(url)
+        self.assertEqual(
+            b''.join(resp.streaming_content).decode(),
+            'Ваш список покупок: Salt, 32 kg; '
+        )
+        resp = self.client.get(url, {'format': 'csv'})
+        self.assertEqual(resp['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual(
+            b''.join(resp.streaming_content).decode().splitlines(),
+            ['name,amount,measurement_unit', 'Salt,32,kg']
+        )
+        resp = self.client.get(url, {'format': 'json'})
+        self.assertEqual(
+            json.loads(b''.join(resp.streaming_content)),
+            [{'name': 'Salt', 'amount': 32, 'measurement_unit': 'kg'}]
+        )
+
+    def test_download_shopping_cart_query_count(self):
+        url = reverse('recipes-download_shopping_cart')
+        query_counts = []
+        self.client.get(url)
+        for cart_size in (1, 10, 100):
+            ShoppingCart.objects.filter(user=self.user).delete()
+            for number in range(cart_size):
+                recipe = Recipe.objects.create(
+                    author=self.user, name=f'R{number}', text='Text',
+                    cooking_time=5,
+                )
+                IngredientsInRecipe.objects.create(
+                    ingredient=self.salt, amount=1, recipe=recipe)
+                ShoppingCart.objects.create(user=self.user, recipe=recipe)
+            with CaptureQueriesContext(connection) as queries:
+                content = b''.join(
+                    self.client.get(url, {'format': 'json'}).streaming_content)
+            self.assertEqual(json.loads(content)[0]['amount'], cart_size)
+            query_counts.append(len(queries.captured_queries))
+        self.assertEqual(len(set(query_counts)), 1)
+
+    def test_shopping_totals(self):
+        summary_url = reverse('recipes-shopping_cart_summary')
+        pepper = Ingredient.objects.create(name='Pepper', measurement_unit='g')
+        recipe = Recipe.objects.create(
+            author=self.user, name='Soup', text='Text', cooking_time=5)
+        IngredientsInRecipe.objects.create(
+            ingredient=self.salt, amount=8, recipe=recipe)
+        IngredientsInRecipe.objects.create(
+            ingredient=pepper, amount=3, recipe=recipe)
+
+        self.client.post(
+            reverse('recipes-add_delete_from_sopping_cart',
+                    kwargs={'recipe_id': self.recipe.id}))
+        self.client.post(
+            reverse('recipes-bulk_shopping_cart'), {'ids': [recipe.id]},
+            format='json'
+        )
+        resp = self.client.get(summary_url)
+        self.assertEqual(resp.data, {
+            'recipes_count': 2,
+            'ingredients': [
+                {'id': pepper.id, 'name': 'Pepper',
+                 'measurement_unit': 'g', 'amount': 3},
+                {'id': self.salt.id, 'name': 'Salt',
+                 'measurement_unit': 'kg', 'amount': 40},
+            ],
+        })
+
+        RecipeEditSerializer.add_ingredients(
+            recipe, [{'id': self.salt, 'amount': 10}])
+        self.assertEqual(
+            dict(ShoppingTotal.objects.filter(user=self.user).values_list(
+                'ingredient_id', 'amount')),
+            {self.salt.id: 42}
+        )
+        self.client.delete(
+            reverse('recipes-add_delete_from_sopping_cart',
+                    kwargs={'recipe_id': self.recipe.id}))
+        self.assertEqual(
+            list(ShoppingTotal.objects.values_list('amount', flat=True)),
+            [10]
+        )
+        recipe.delete()
+        self.assertFalse(ShoppingTotal.objects.exists())
+        relations_cache.clear()
+        self.assertEqual(
+            self.client.get(summary_url).data,
+            {'recipes_count': 0, 'ingredients': []}
+        )
+
+        ShoppingCart.objects.add(self.user.id, self.recipe.id)
+        ShoppingTotal.objects.update(amount=1)
+        self.assertEqual(
+            ShoppingTotal.objects.find_drift(),
+            [(self.user.id, self.salt.id, 32, 1)]
+        )
+        with self.assertRaises(CommandError):
+            call_command('check_shopping_totals', stdout=StringIO())
+        call_command('check_shopping_totals', '--fix', stdout=StringIO())
+        self.assertEqual(ShoppingTotal.objects.find_drift(), [])
+        self.assertEqual(ShoppingTotal.objects.rebuild(), 1)
+
+
+class ApiCacheTestCase(ApiTestCase):
+    """Тесты кэширования ответов и аутентификации."""
+
+    def test_catalog_conditional_get(self):
+        url = reverse('tags-list')
+
+        resp = self.client.get(url)
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(json.loads(resp.content)[0]['name'], self.tag.name)
+        etag = resp['ETag']
+
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        Tag.objects.create(name='lunch', color='green', slug='lunch')
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(json.loads(resp.content)), 2)
+
+    def test_cached_token_authentication(self):
+        me_url = reverse('users-me')
+        self.client.get(me_url)
+        with CaptureQueriesContext(connection) as queries:
+            resp = self.client.get(me_url)
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertFalse(any(
+            'authtoken_token' in query['sql']
+            for query in queries.captured_queries
+        ))
+
+        self.user.first_name = 'Виктор'
+        self.user.save()
+        resp = self.client.get(me_url)
+        self.assertEqual(resp.data['first_name'], 'Виктор')
+
+        self.user.is_active = False
+        self.user.save()
+        resp = self.client.get(me_url)
+        self.assertEqual(resp.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        self.user.is_active = True
+        self.user.save()
+        self.client.get(me_url)
+        resp = self.client.post(reverse('logout'))
+        self.assertEqual(resp.status_code, status.HTTP_204_NO_CONTENT)
+        resp = self.client.get(me_url)
+        self.assertEqual(resp.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_recipe_representation_cache(self):
+        self.recipe.tags.add(self.tag)
+        reader = User.objects.create_user(
+            username='reader', email='reader@mail.ru')
+        Favorites.objects.add(reader.id, self.recipe.id)
+        reader_client = self.client_class()
+        reader_client.force_authenticate(reader)
+        url = reverse('recipes-detail', kwargs={'pk': self.recipe.id})
+
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            resp = self.client.get(self.url)
+        self.assertEqual(len(queries), 2)
+        self.assertFalse(resp.data['results'][0]['is_favorited'])
+        self.assertTrue(reader_client.get(url).data['is_favorited'])
+
+        version = self.recipe.version
+        self.user.save(update_fields=['last_login'])
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.version, version)
+
+        self.tag.name = 'supper'
+        self.tag.save()
+        self.assertEqual(
+            self.client.get(url).data['tags'][0]['name'], 'supper')
+        self.salt.name = 'Sea salt'
+        self.salt.save()
+        self.assertEqual(
+            self.client.get(url).data['ingredients'][0]['name'], 'Sea salt')
+        self.user.first_name = 'Vika'
+        self.user.save()
+        self.assertEqual(
+            self.client.get(self.url).data['results'][0]['author'][
+                'first_name'],
+            'Vika'
+        )
+        self.tag.delete()
+        self.assertEqual(self.client.get(url).data['tags'], [])
+
+
+class ApiRenderingTestCase(ApiTestCase):
+    """Тесты отрисовки, сжатия и асинхронных ответов."""
+
+    def test_async_read_views(self):
+        Favorites.objects.add(self.user.id, self.recipe.id)
+        author = User.objects.create_user(
+            username='author', email='author@example.com')
+        Subscription.objects.create(subscriber=self.user, subscribed_to=author)
+        self.tag.slug = 'dinner'
+        self.tag.save()
+        self.recipe.tags.add(self.tag)
+        token = Token.objects.get(user=self.user)
+        urls = [
+            self.url,
+            self.url + '?is_favorited=1&tags=' + self.tag.slug,
+            reverse('recipes-detail', kwargs={'pk': self.recipe.id}),
+            reverse('tags-list'),
+            reverse('ingredients-list') + '?search=sa',
+            reverse('users-get_subscriptions'),
+        ]
+        expected = [self.client.get(url).json() for url in urls]
+        client = AsyncClient()
+        with self.settings(ROOT_URLCONF='foodgram_backend.async_urls'):
+            for url, data in zip(urls, expected):
+                with self.subTest(url=url):
+                    resp = async_to_sync(client.get)(
+                        url, AUTHORIZATION='Token ' + token.key)
+                    self.assertEqual(resp.status_code, status.HTTP_200_OK)
+                    self.assertEqual(resp.json(), data)
+            created = []
+
+            def count_connection(connection, **kwargs):
+                created.append(connection.alias)
+
+            connection_created.connect(count_connection)
+            relations_cache.clear()
+            get_recipe_cache().clear()
+            try:
+                async_to_sync(client.get)(
+                    self.url, AUTHORIZATION='Token ' + token.key)
+            finally:
+                connection_created.disconnect(count_connection)
+            self.assertEqual(created, ['default'])
+            resp = async_to_sync(client.get)(
+                reverse('users-get_subscriptions'))
+            self.assertEqual(resp.status_code, status.HTTP_401_UNAUTHORIZED)
+            resp = async_to_sync(client.post)(reverse('recipes-list'), {})
+            self.assertEqual(resp.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_fast_list_rendering(self):
+        Favorites.objects.add(self.user.id, self.recipe.id)
+        second_tag = Tag.objects.create(
+            name='lunch', color='#00FF00', slug='lunch')
+        self.recipe.tags.add(self.tag, second_tag)
+        self.recipe.image = 'recipes/images/cookie.jpg'
+        self.recipe.save()
+        Recipe.objects.filter(pk=self.recipe.pk).update(image_variants={
+            'thumb': {
+                'jpeg': 'recipes/images/variants/cookie_thumb.jpeg',
+                'webp': 'recipes/images/variants/cookie_thumb.webp',
+                'width': 320,
+            }
+        })
+        Ingredient.objects.create(name='Pepper', measurement_unit='g')
+        urls = [
+            self.url,
+            self.url + '?limit=1&is_favorited=1',
+            reverse('recipes-detail', kwargs={'pk': self.recipe.id}),
+            reverse('tags-list'),
+            reverse('ingredients-list'),
+            reverse('ingredients-list') + '?search=pe',
+        ]
+        responses = {}
+        for fast in (False, True):
+            bump_catalog_version('tags')
+            bump_catalog_version('ingredients')
+            with self.settings(FAST_LIST_RENDERING=fast):
+                responses[fast] = [self.client.get(url) for url in urls]
+        for url, slow, fast in zip(urls, responses[False], responses[True]):
+            with self.subTest(url=url):
+                self.assertEqual(fast.status_code, status.HTTP_200_OK)
+                self.assertEqual(fast.content, slow.content)
+
+    def test_fast_json_renderer(self):
+        data = {
+            'date': datetime(2024, 1, 2, 3, 4, 5, 678000, tzinfo=timezone.utc),
+            'amount': Decimal('1.50'),
+            'text': 'строка\u2028абзац',
+            1: [None, True, 1.5],
+        }
+        self.assertEqual(
+            FastJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(
+            FastJSONRenderer().render(data, 'application/json; indent=2'),
+            JSONRenderer().render(data, 'application/json; indent=2')
+        )
+
+    def test_response_compression(self):
+        Ingredient.objects.bulk_create(
+            Ingredient(name=f'Ingredient {number}', measurement_unit='g')
+            for number in range(50)
+        )
+        self.recipe.text = 'Long recipe description. ' * 50
+        self.recipe.save()
+        ShoppingCart.objects.create(user=self.user, recipe=self.recipe)
+        url = reverse('ingredients-list')
+        plain = self.client.get(url).content
+        encodings = [
+            ('gzip', gzip.decompress),
+            ('gzip;q=0.5, deflate', zlib.decompress),
+        ]
+        if brotli is not None:
+            encodings.append(('br, gzip', brotli.decompress))
+        for accept_encoding, decompress in encodings:
+            with self.subTest(accept_encoding=accept_encoding):
+                for _ in range(2):
+                    resp = self.client.get(
+                        url, HTTP_ACCEPT_ENCODING=accept_encoding)
+                    self.assertIn('Accept-Encoding', resp['Vary'])
+                    self.assertEqual(decompress(resp.content), plain)
+                self.assertEqual(
+                    resp['Content-Encoding'],
+                    negotiate_encoding(accept_encoding)
+                )
+                resp = self.client.get(
+                    url, HTTP_ACCEPT_ENCODING=accept_encoding,
+                    HTTP_IF_NONE_MATCH=resp['ETag']
+                )
+                self.assertEqual(
+                    resp.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        filtered = {'name': 'Ingredient'}
+        plain = self.client.get(url, filtered).content
+        key = 'catalog:ingredients:{}:response:{}'.format(
+            get_catalog_version('ingredients'),
+            hashlib.md5(f'{url}?name=Ingredient'.encode()).hexdigest()
+        )
+        self.assertEqual(get_catalog_cache().get(key)[2], {})
+        resp = self.client.get(url, filtered, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(resp['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(resp.content), plain)
+
+        resp = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(resp['Content-Encoding'], 'gzip')
+        self.assertEqual(
+            json.loads(gzip.decompress(resp.content))['results'][0]['text'],
+            self.recipe.text
+        )
+        resp = self.client.get(
+            reverse('recipes-download_shopping_cart'),
+            {'format': 'csv'}, HTTP_ACCEPT_ENCODING='gzip'
+        )
+        self.assertEqual(resp['Content-Encoding'], 'gzip')
+        self.assertEqual(
+            gzip.decompress(b''.join(resp.streaming_content)).decode(),
+            'name,amount,measurement_unit\r\nSalt,32,kg\r\n'
+        )
+        resp = self.client.get(
+            reverse('tags-detail', kwargs={'pk': self.tag.id}),
+            HTTP_ACCEPT_ENCODING='gzip'
+        )
+        self.assertFalse(resp.has_header('Content-Encoding'))
+        self.assertIsNone(negotiate_encoding('gzip;q=0, *;q=0'))
+        self.assertIsNone(negotiate_encoding(''))
+
+    def test_server_timing(self):
+        self.assertFalse(self.client.get(self.url).has_header('Server-Timing'))
+        with self.settings(SERVER_TIMING_HEADER=True):
+            with CaptureQueriesContext(connection) as queries:
+                resp = self.client.get(self.url)
+            timings = dict(
+                item.split(';', 1)
+                for item in resp['Server-Timing'].split(', ')
+            )
+            self.assertEqual(set(timings), {'total', 'db', 'serialize'})
+            self.assertIn(f'desc="{len(queries)} queries"', timings['db'])
+
+            with self.settings(ROOT_URLCONF='foodgram_backend.async_urls'):
+                resp = async_to_sync(AsyncClient().get)(self.url)
+            self.assertRegex(
+                resp['Server-Timing'], r'db;dur=[\d.]+;desc="[1-9]')
+
+        with self.assertLogs(
+            'foodgram_backend.instrumentation', 'DEBUG'
+        ) as logs:
+            self.client.get(self.url)
+        self.assertEqual(logs.records[0].levelname, 'DEBUG')
+        with self.settings(SLOW_REQUEST_THRESHOLD_MS=0):
+            with self.assertLogs(
+                'foodgram_backend.instrumentation', 'INFO'
+            ) as logs:
+                self.client.get(self.url)
+        self.assertEqual(
+            json.loads(logs.records[0].getMessage())['view'], 'recipes-list')
+
+        with self.settings(SLOW_QUERY_THRESHOLD_MS=0):
+            with self.assertLogs(
+                'foodgram_backend.instrumentation', 'WARNING'
+            ) as logs:
+                self.client.get(reverse('tags-list'))
+        self.assertIn('tags-list', logs.output[0])
+        self.assertIn('SELECT', logs.output[0])
+
+        with self.settings(N_PLUS_ONE_THRESHOLD=3):
+            with collect_metrics('recipes-list', sampled=True) as metrics:
+                for _ in range(3):
+                    Tag.objects.get(pk=self.tag.pk)
+                Recipe.objects.count()
+            self.assertEqual(metrics.query_count, 4)
+            repeated = metrics.get_repeated_queries()
+            self.assertEqual(len(repeated), 1)
+            self.assertEqual(repeated[0][1], 3)
+            record_repeated_queries(metrics)
+        self.assertIn(repeated[0][0], get_repeated_queries()['recipes-list'])
+
+
+class RecipeAdminTestCase(ApiTestCase):
+    """Тесты админки рецептов."""
+
+    def test_admin_ingredient_edit_refreshes_recipe(self):
+        admin_user = User.objects.create_superuser(
+            username='admin', email='admin@mail.ru', password='admin')
+        client = Client()
+        client.force_login(admin_user)
+        url = reverse('recipes-detail', args=(self.recipe.id,))
+        self.client.get(url)
+        ShoppingCart.objects.add(self.user.id, self.recipe.id)
+
+        resp = client.post(
+            reverse(
+                'admin:recipes_ingredientsinrecipe_change',
+                args=(self.recipe_ing.id,)
+            ),
+            {
+                'recipe': self.recipe.id,
+                'ingredient': self.salt.id,
+                'amount': 99,
+            }
+        )
+        self.assertEqual(resp.status_code, 302)
+        self.assertEqual(
+            self.client.get(url).data['ingredients'][0]['amount'], 99)
+        self.assertEqual(ShoppingTotal.objects.get().amount, 99)
+
+        client.post(
+            reverse(
+                'admin:recipes_ingredientsinrecipe_delete',
+                args=(self.recipe_ing.id,)
+            ),
+            {'post': 'yes'}
+        )
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.ingredients_count, 0)
+        self.assertEqual(self.client.get(url).data['ingredients'], [])
+        self.assertFalse(ShoppingTotal.objects.exists())
+
+    def test_admin_recipe_search(self):
+        admin_user = User.objects.create_superuser(
+            username='admin', email='admin@mail.ru', password='admin')
+        client = Client()
+        client.force_login(admin_user)
+        author = User.objects.create_user(
+            username='pastry_chef', email='chef@mail.ru')
+        other = Recipe.objects.create(
+            author=author, name='Pie', text='Text', cooking_time=5)
+        other.tags.add(self.tag)
+        Recipe.objects.update_search_index()
+        url = reverse('admin:recipes_recipe_changelist')
+
+        for search_term, expected in (
+            ('pastry_chef', [other]),
+            ('dinner', [other]),
+            ('Salt', [self.recipe]),
+            ('Badabada', [self.recipe]),
+        ):
+            resp = client.get(url, {'q': search_term})
+            self.assertEqual(
+                list(resp.context['cl'].result_list), expected, search_term)
+
+
+class LoadCommandsTestCase(ApiTestCase):
+    """Тесты команд загрузки данных."""
+
+    def test_bulk_loaders(self):
+        pepper = Ingredient.objects.create(name='Pepper', measurement_unit='g')
+        fixtures = {
+            'ingredients.csv': 'Sugar,g\nBroken,\nPepper,g\nSalt,kg\n',
+            'ingredients.json': json.dumps([
+                {'name': 'Flour', 'measurement_unit': 'g'},
+                {'name': 'Pepper', 'measurement_unit': 'g'},
+            ]),
+            'tags.csv': 'Lunch,#90EE90,lunch\nBreakfast,#E26C2D\n',
+            'users.csv': (
+                'cook,Tom,Hicks,cook@mail.com,ASDfg123456,False\n'
+                'halfrow,Tom\n'
+                'chef,Ann,Lee,chef@mail.com,ASDfg123456\n'
+            ),
+            'recipes.csv': (
+                'name;text;cooking_time;image;author_username;'
+                'ingredients_id;ingredients_amount;tags\n'
+                f'Pancakes;Text;15;recipes/images/a.jpg;cook;'
+                f'{self.salt.id},{pepper.id};100,2;{self.tag.id}\n'
+                f'Omelette;Text;5;recipes/images/b.jpg;cook;'
+                f'{self.salt.id};1,2;{self.tag.id}\n'
+                f'Porridge;Text;5;recipes/images/c.jpg;ghost;'
+                f'{self.salt.id};1;{self.tag.id}\n'
+                f'Toast;Text;5;recipes/images/d.jpg;cook;'
+                f'999999;1;{self.tag.id}\n'
+            ),
+        }
+        commands = (
+            ('load_ingredients', 'ingredients.csv'),
+            ('load_ingredients', 'ingredients.json'),
+            ('load_tags', 'tags.csv'),
+            ('load_users', 'users.csv'),
+            ('load_recipes', 'recipes.csv'),
+        )
+        with TemporaryDirectory() as directory:
+            for file_name, content in fixtures.items():
+                with open(os.path.join(directory, file_name), 'w') as file:
+                    file.write(content)
+            for attempt in range(2):
+                errors = StringIO()
+                for command, file_name in commands:
+                    call_command(
+                        command, os.path.join(directory, file_name),
+                        '--chunk-size', '2',
+                        stdout=StringIO(), stderr=errors
+                    )
+                self.assertEqual(
+                    sorted(Ingredient.objects.values_list(
+                        'name', 'measurement_unit')),
+                    [('Flour', 'g'), ('Pepper', 'g'), ('Salt', 'kg'),
+                     ('Sugar', 'g')]
+                )
+                self.assertEqual(
+                    list(Tag.objects.order_by('id').values_list(
+                        'slug', flat=True)),
+                    [self.tag.slug, 'lunch']
+                )
+                self.assertEqual(
+                    sorted(User.objects.exclude(pk=self.user.pk).values_list(
+                        'username', 'is_superuser')),
+                    [('chef', False), ('cook', False)]
+                )
+                self.assertEqual(
+                    Token.objects.filter(
+                        user__username__in=('chef', 'cook')).count(),
+                    2
+                )
+                recipe = Recipe.objects.get(author__username='cook')
+                self.assertEqual(recipe.name, 'Pancakes')
+                self.assertEqual(recipe.ingredients_count, 2)
+                self.assertEqual(
+                    sorted(recipe.ingredients_in_recipe.values_list(
+                        'ingredient_id', 'amount')),
+                    [(self.salt.id, 100), (pepper.id, 2)]
+                )
+                self.assertEqual(
+                    list(recipe.tags.values_list('id', flat=True)),
+                    [self.tag.id]
+                )
+                self.assertEqual(Recipe.objects.count(), 2)
+                self.assertEqual(IngredientsInRecipe.objects.count(), 3)
+            errors = errors.getvalue()
+        self.assertIn(
+            'Не заполнены столбцы: measurement_unit. Номер строки: 2', errors)
+        self.assertIn('Не заполнены столбцы: slug. Номер строки: 2', errors)
+        self.assertIn(
+            'Не заполнены столбцы: last_name, email, password. '
+            'Номер строки: 2',
+            errors
+        )
+        self.assertIn('Не совпадает количество', errors)
+        self.assertIn('Не найден автор ghost. Номер строки: 3', errors)
+        self.assertIn('Не найдены ингредиенты или теги: [999999].', errors)
+
+
+class ApiBenchmarkTestCase(APITransactionTestCase):
+    """Потолки числа запросов для эндпоинтов api."""
+
+    def test_query_ceilings(self):
+        report, violations = run_benchmarks(
+            {'users': 30, 'recipes': 60, 'ingredients': 40}, repeat=1)
+
+        self.assertEqual(violations, [])
+        self.assertGreater(report['token_cache']['hit_rate'], 0.9)
+        self.assertEqual(
+            set(report['endpoints']),
+            {endpoint.name for endpoint in get_endpoints(0, 0, 0, 0)}
+        )
+
+
+class ConnectionPoolTestCase(SimpleTestCase):
+    """Тесты пула подключений к базе данных."""
+
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.name = os.path.join(self.directory.name, 'pool.sqlite3')
+
+    def tearDown(self):
+        pools.clear()
+        self.directory.cleanup()
+
+    def make_connection(self):
+        settings_dict = {
+            **connection.settings_dict,
+            'ENGINE': 'foodgram_backend.db_backends.sqlite3',
+            'NAME': self.name,
+            'POOL': {'SIZE': 1, 'IDLE_TIMEOUT': 60},
+        }
+        wrapper = DatabaseWrapper(settings_dict, alias='pool')
+        wrapper.ensure_connection()
+        return wrapper
+
+    def test_pool_reuse_and_eviction(self):
+        first = self.make_connection()
+        raw_connection = first.connection
+        first.close()
+        second = self.make_connection()
+        self.assertIs(second.connection, raw_connection)
+
+        third = self.make_connection()
+        self.assertIsNot(third.connection, raw_connection)
+        pool = second.get_pool()
+        second.close()
+        third.close()
+        self.assertEqual(pool.get_stats(), {
+            'created': 2, 'reused': 1, 'evicted_idle': 0,
+            'evicted_overflow': 1, 'failed_checks': 0, 'in_use': 0,
+            'idle': 1,
+        })
+
+        pool.idle_timeout = 0
+        time.sleep(0.01)
+        fourth = self.make_connection()
+        self.assertIsNot(fourth.connection, raw_connection)
+        pool.idle_timeout = 60
+        broken_connection = fourth.connection
+        fourth.close()
+        broken_connection.close()
+        fifth = self.make_connection()
+        self.assertIsNot(fifth.connection, broken_connection)
+        fifth.close()
+        stats = pool.get_stats()
+        self.assertEqual(stats['evicted_idle'], 1)
+        self.assertEqual(stats['failed_checks'], 1)
+        self.assertEqual(stats['created'], 4)
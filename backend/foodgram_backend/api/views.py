@@ -1,32 +1,46 @@
-from django.http import HttpResponse
-from django.db.models import Sum
+from django.db.models import BooleanField, Count, Value
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from rest_framework import (
-    status, permissions, viewsets, serializers)
+    filters, status, permissions, viewsets, serializers)
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from rest_framework.renderers import JSONRenderer
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
 
 from users.models import CustomUser, Subscription
 from recipes.models import (
-    Favorites,
-    IngredientsInRecipe, ShoppingCart, Tag, Ingredient, Recipe)
+    Favorites, ShoppingCart, Tag, Ingredient, Recipe)
+from foodgram_backend.instrumentation import ViewTimingMixin
+from foodgram_backend.queries import insert_or_ignore
 from .serializers import (
-    FavoriteSerializer,
+    BulkIdsSerializer,
     SubscriptionGetSerializer,
-    SubscriptionSerializer,
     TagSerializer,
     IngredientSerializer,
+    RecipeRepresentationSerializer,
     RecipeSerializer,
-    UserSerializer, RecipeEditSerializer, ShoppingCartSerializer
+    UserSerializer, RecipeEditSerializer
 )
+from .bulk import toggle_relations
+from .cache import CatalogCacheMixin
 from .filters import IngredientFilter, RecipeFilter
 from .permissions import IsAdminAuthorOrReadOnly
-from .pagination import PageNumberPagination
+from .pagination import PageNumberPagination, RecipePagination
+from .relations import get_user_relations, update_relation
+from .representations import (
+    FastListMixin,
+    IngredientListSerializer,
+    RecipeListSerializer,
+    TagListSerializer
+)
+from .search import ingredient_index
+from .renderers import CSVRenderer, PlainTextRenderer
+from .shopping_list import PURCHASE_LIST_FORMATS, get_purchase_rows
 
 
-class CustomUserViewSet(UserViewSet):
+class CustomUserViewSet(ViewTimingMixin, UserViewSet):
     """Представление для работы с пользователями."""
 
     queryset = CustomUser.objects.all()
@@ -50,27 +64,51 @@ class CustomUserViewSet(UserViewSet):
     )
     def subscribe(self, request, user_id):
         """Метод создания и удаления подписок."""
-
-        user = get_object_or_404(CustomUser, pk=user_id)
-        data = {'subscriber': request.user.id, 'subscribed_to': user.id}
         if self.request.method == 'POST':
-            serializer = SubscriptionSerializer(
-                data=data,
-                context={'request': request}
-            )
-            serializer.is_valid(raise_exception=True)
-            serializer.save()
+            user = get_object_or_404(CustomUser, pk=user_id)
+            if user == request.user:
+                raise serializers.ValidationError(
+                    'Невозможно оформить подписку на свой профиль.')
+            if not insert_or_ignore(
+                Subscription, subscriber=request.user.id, subscribed_to=user.id
+            ):
+                raise serializers.ValidationError(
+                    'Данный пользователь уже добавлен в подписки')
+            update_relation(request.user, 'subscriptions', user.id, True)
+            serializer = SubscriptionGetSerializer(
+                user, context={'request': request})
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         if self.request.method == 'DELETE':
-            if not request.user.subscriptions.exists():
-                raise serializers.ValidationError(
-                    'У данного пользователя нет подписок')
-            Subscription.objects.filter(
+            deleted, _ = Subscription.objects.filter(
                 subscriber=request.user,
-                subscribed_to=user
+                subscribed_to_id=user_id
             ).delete()
+            update_relation(request.user, 'subscriptions', int(user_id), False)
+            if not deleted:
+                get_object_or_404(CustomUser, pk=user_id)
+                raise serializers.ValidationError(
+                    'Вы не подписаны на данного пользователя')
             return Response(status=status.HTTP_204_NO_CONTENT)
 
+    @action(
+        detail=False,
+        methods=['post', 'delete'],
+        permission_classes=(permissions.IsAuthenticated,),
+        url_path='subscribe',
+        url_name='bulk_subscription',
+    )
+    def bulk_subscribe(self, request):
+        """Метод массового создания и удаления подписок по списку id."""
+        serializer = BulkIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data['ids']
+        found = set(CustomUser.objects.filter(
+            pk__in=ids).values_list('pk', flat=True))
+        return toggle_relations(
+            request, Subscription.objects, 'subscriptions', ids, found,
+            invalid={request.user.id}
+        )
+
     @action(
         detail=False,
         methods=['get'],
@@ -80,51 +118,94 @@ class CustomUserViewSet(UserViewSet):
     )
     def get_subscriptions(self, request):
         """Метод получения списка подписок."""
+        recipes_limit = SubscriptionGetSerializer.get_recipes_limit(request)
         subscribed_to_queryset = CustomUser.objects.filter(
-            id__in=(
-                request.user.subscriptions.all().values('subscribed_to')
-            )
-        )
+            subscribers__subscriber=request.user
+        ).annotate(
+            recipes_count=Count('recipes'),
+            is_subscribed=Value(True, output_field=BooleanField())
+        ).order_by('id')
         queryset = self.filter_queryset(subscribed_to_queryset)
         page = self.paginate_queryset(queryset)
+        recipes_by_author = Recipe.objects.latest_by_author(
+            [author.id for author in page], recipes_limit)
         serializer = SubscriptionGetSerializer(
             page,
-            context={'request': request},
+            context={
+                'request': request,
+                'recipes_by_author': recipes_by_author
+            },
             many=True
         )
         return self.get_paginated_response(serializer.data)
 
 
-class TagsViewSet(viewsets.ReadOnlyModelViewSet):
+class TagsViewSet(
+    ViewTimingMixin, CatalogCacheMixin, FastListMixin,
+    viewsets.ReadOnlyModelViewSet
+):
     """Представление для тегов."""
 
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
+    list_serializer_class = TagListSerializer
     pagination_class = None
+    catalog_name = 'tags'
     permission_classes = (permissions.AllowAny,)
 
 
-class IngredientsViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientsViewSet(
+    ViewTimingMixin, CatalogCacheMixin, FastListMixin,
+    viewsets.ReadOnlyModelViewSet
+):
     """Представление для ингредиентов."""
 
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
+    list_serializer_class = IngredientListSerializer
     pagination_class = None
+    catalog_name = 'ingredients'
     permission_classes = (permissions.AllowAny,)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = IngredientFilter
 
+    def list(self, request, *args, **kwargs):
+        """Метод получения ингредиентов с поиском по параметру search."""
+        search = request.query_params.get('search')
+        if search is None:
+            return super().list(request, *args, **kwargs)
+        ingredients = ingredient_index.search(search)
+        if not self.use_fast_list():
+            ingredients = [
+                Ingredient(
+                    pk=pk, name=name, measurement_unit=measurement_unit)
+                for pk, name, measurement_unit in ingredients
+            ]
+        serializer = self.get_serializer(ingredients, many=True)
+        return Response(serializer.data)
 
-class RecipesViewSet(viewsets.ModelViewSet):
+
+class RecipesViewSet(
+    ViewTimingMixin, FastListMixin, viewsets.ModelViewSet
+):
     """Представление для рецептов."""
 
     queryset = Recipe.objects.all()
     serializer_class = RecipeSerializer
+    list_serializer_class = RecipeListSerializer
+    fast_actions = ('list', 'retrieve')
     permission_classes = (IsAdminAuthorOrReadOnly,)
     http_method_names = ['get', 'post', 'patch', 'delete']
-    pagination_class = PageNumberPagination
-    filter_backends = (DjangoFilterBackend,)
+    pagination_class = RecipePagination
+    filter_backends = (DjangoFilterBackend, filters.OrderingFilter)
     filterset_class = RecipeFilter
+    ordering_fields = ('pub_date', 'favorites_count', 'shopping_cart_count')
+
+    def get_queryset(self):
+        """Метод получения рецептов с заранее подготовленными связями."""
+        if self.use_fast_list():
+            return Recipe.objects.select_related('author')
+        return Recipe.objects.with_related()
 
     def get_serializer_class(self):
         """Метод для получения сериализатора."""
@@ -132,6 +213,50 @@ class RecipesViewSet(viewsets.ModelViewSet):
             return RecipeEditSerializer
         return RecipeSerializer
 
+    def toggle_relation(
+        self, request, recipe_id, model, relation_name, messages
+    ):
+        """Метод добавления и удаления связи пользователя с рецептом.
+
+        Связь создаётся и удаляется одним запросом, а ответ определяется
+        числом затронутых строк. messages - тексты ошибок для уже
+        существующей и отсутствующей связи.
+        """
+        recipe_id = int(recipe_id)
+        if request.method == 'POST':
+            recipe = get_object_or_404(
+                Recipe.objects.only(
+                    'id', 'name', 'image', 'image_variants', 'cooking_time'),
+                pk=recipe_id
+            )
+            if not model.objects.add(request.user.id, recipe_id):
+                raise serializers.ValidationError(messages[0])
+            update_relation(request.user, relation_name, recipe_id, True)
+            return Response(
+                RecipeRepresentationSerializer(recipe).data,
+                status=status.HTTP_201_CREATED
+            )
+        removed = model.objects.remove(request.user.id, recipe_id)
+        update_relation(request.user, relation_name, recipe_id, False)
+        if not removed:
+            get_object_or_404(Recipe, pk=recipe_id)
+            raise serializers.ValidationError(messages[1])
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    def bulk_toggle_relation(self, request, model, relation_name):
+        """Метод массового добавления и удаления связей с рецептами.
+
+        Существование рецептов из списка ids проверяется одним запросом,
+        связи создаются одним bulk_create() и удаляются одним DELETE.
+        """
+        serializer = BulkIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data['ids']
+        found = set(Recipe.objects.filter(
+            pk__in=ids).values_list('pk', flat=True))
+        return toggle_relations(
+            request, model.objects, relation_name, ids, found)
+
     @action(
         detail=False,
         methods=['post', 'delete'],
@@ -141,63 +266,57 @@ class RecipesViewSet(viewsets.ModelViewSet):
     )
     def add_delete_from_sopping_cart(self, request, recipe_id):
         """Метод добавления и удаления рецептов в корзину покупок."""
-        if self.request.method == 'POST':
-            data = {
-                'user': self.request.user.id,
-                'recipe': recipe_id
-            }
-            serializer = ShoppingCartSerializer(
-                data=data,
-                context={'request': request}
-            )
-            serializer.is_valid(raise_exception=True)
-            serializer.save()
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-        if self.request.method == 'DELETE':
-            recipe = get_object_or_404(Recipe, pk=recipe_id)
-            shopping_cart = ShoppingCart.objects.filter(
-                recipe=recipe,
-                user=self.request.user
+        return self.toggle_relation(
+            request, recipe_id, ShoppingCart, 'shopping_cart', (
+                'Данный рецепт уже добавлен в корзину',
+                'Данный рецепт не был добавлен в корзину покупок',
             )
-            if not shopping_cart.exists():
-                raise serializers.ValidationError(
-                    'Данный рецепт не был добавлен в корзину покупок')
-            shopping_cart.delete()
-            return Response(status=status.HTTP_204_NO_CONTENT)
+        )
 
     @action(
         detail=False,
         methods=['get'],
         permission_classes=(permissions.IsAuthenticated,),
+        url_path='shopping_cart/summary',
+        url_name='shopping_cart_summary'
+    )
+    def shopping_cart_summary(self, request):
+        """Метод получения сумм ингредиентов корзины покупок в JSON."""
+        return Response({
+            'recipes_count': len(get_user_relations(
+                request.user).get_ids('shopping_cart')),
+            'ingredients': [
+                {
+                    'id': row['ingredient_id'],
+                    'name': row['name'],
+                    'measurement_unit': row['measurement_unit'],
+                    'amount': row['total_amount'],
+                }
+                for row in get_purchase_rows(request.user)
+            ],
+        })
+
+    @action(
+        detail=False,
+        methods=['get'],
+        permission_classes=(permissions.IsAuthenticated,),
+        renderer_classes=(PlainTextRenderer, CSVRenderer, JSONRenderer),
         url_path='download_shopping_cart',
         url_name='download_shopping_cart'
     )
     def download_from_shopping_cart(self, request):
-        """Метод получения списка покупок."""
-        shopping_cart = ShoppingCart.objects.filter(
-            user=request.user).values('recipe')
-        recipes_ids = [id['recipe'] for id in shopping_cart]
-        purchase = IngredientsInRecipe.objects.filter(
-            recipe_id__in=recipes_ids,
-        ).values('ingredient_id').annotate(buy_amount=Sum('amount'))
-        purchase_data = 'Ваш список покупок: '
-        for buy_item in purchase:
-            ingredient = Ingredient.objects.get(
-                pk=buy_item.get('ingredient_id'))
-            purchase_data += (
-                ingredient.name + ', '
-                + str(buy_item.get('buy_amount'))
-                + ' ' + ingredient.measurement_unit + '; '
-            )
-        response = HttpResponse(
-            purchase_data,
+        """Метод получения списка покупок в форматах txt, csv и json."""
+        renderer = request.accepted_renderer
+        rows = get_purchase_rows(request.user).iterator()
+        return StreamingHttpResponse(
+            PURCHASE_LIST_FORMATS[renderer.format](rows),
             headers={
-                'Content-Type': 'text/plain',
+                'Content-Type': f'{renderer.media_type}; charset=utf-8',
                 'Content-Disposition': (
-                    'attachment; filename="purchase_list.txt"'),
+                    'attachment; '
+                    f'filename="purchase_list.{renderer.format}"'),
             },
         )
-        return response
 
     @action(
         detail=False,
@@ -208,26 +327,32 @@ class RecipesViewSet(viewsets.ModelViewSet):
     )
     def add_delete_from_favorites(self, request, recipe_id):
         """Метод для добавления и удаления рецепта в избранное."""
-        if self.request.method == 'POST':
-            data = {
-                'user': self.request.user.id,
-                'recipe': recipe_id
-            }
-            serializer = FavoriteSerializer(
-                data=data,
-                context={'request': request}
-            )
-            serializer.is_valid(raise_exception=True)
-            serializer.save()
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-        if self.request.method == 'DELETE':
-            recipe = get_object_or_404(Recipe, pk=recipe_id)
-            favorites = Favorites.objects.filter(
-                recipe=recipe,
-                user=self.request.user
+        return self.toggle_relation(
+            request, recipe_id, Favorites, 'favorites', (
+                'Данный рецепт уже добавлен в избранное',
+                'Данный рецепт не был добавлен в кизбранное',
             )
-            if not favorites.exists():
-                raise serializers.ValidationError(
-                    'Данный рецепт не был добавлен в кизбранное')
-            favorites.delete()
-            return Response(status=status.HTTP_204_NO_CONTENT)
+        )
+
+    @action(
+        detail=False,
+        methods=['post', 'delete'],
+        permission_classes=(permissions.IsAuthenticated,),
+        url_path='favorite',
+        url_name='bulk_favorites'
+    )
+    def bulk_favorites(self, request):
+        """Метод массового добавления и удаления рецептов в избранное."""
+        return self.bulk_toggle_relation(request, Favorites, 'favorites')
+
+    @action(
+        detail=False,
+        methods=['post', 'delete'],
+        permission_classes=(permissions.IsAuthenticated,),
+        url_path='shopping_cart',
+        url_name='bulk_shopping_cart'
+    )
+    def bulk_shopping_cart(self, request):
+        """Метод массового добавления и удаления рецептов в корзину."""
+        return self.bulk_toggle_relation(
+            request, ShoppingCart, 'shopping_cart')
@@ -0,0 +1,184 @@
+import zlib
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_CONTENT_TYPES = (
+    'application/javascript',
+    'application/json',
+    'application/xml',
+    'image/svg+xml',
+)
+
+
+class ZlibEncoding:
+    """Кодирование gzip или deflate стандартным модулем zlib."""
+
+    def __init__(self, wbits):
+        self.wbits = wbits
+
+    def compress(self, data, level):
+        compressor = zlib.compressobj(level, zlib.DEFLATED, self.wbits)
+        return compressor.compress(data) + compressor.flush()
+
+    def compress_sequence(self, sequence, level):
+        """Метод сжатия потока со сбросом буфера после каждой части."""
+        compressor = zlib.compressobj(level, zlib.DEFLATED, self.wbits)
+        for chunk in sequence:
+            data = compressor.compress(chunk) + compressor.flush(
+                zlib.Z_SYNC_FLUSH)
+            if data:
+                yield data
+        yield compressor.flush()
+
+
+class BrotliEncoding:
+    """Кодирование br модулем brotli."""
+
+    def compress(self, data, level):
+        return brotli.compress(data, quality=level)
+
+    def compress_sequence(self, sequence, level):
+        """Метод сжатия потока со сбросом буфера после каждой части."""
+        compressor = brotli.Compressor(quality=level)
+        for chunk in sequence:
+            data = compressor.process(chunk) + compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+
+
+ENCODINGS = {
+    'gzip': ZlibEncoding(16 + zlib.MAX_WBITS),
+    'deflate': ZlibEncoding(zlib.MAX_WBITS),
+}
+if brotli is not None:
+    ENCODINGS = {'br': BrotliEncoding(), **ENCODINGS}
+
+
+def parse_accept_encoding(header):
+    """Возвращает словарь весов кодировок из заголовка Accept-Encoding."""
+    weights = {}
+    for item in header.split(','):
+        coding, _, params = item.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        weight = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[coding] = weight
+    return weights
+
+
+def negotiate_encoding(header, available=ENCODINGS):
+    """Выбирает кодировку ответа по заголовку Accept-Encoding.
+
+    Из кодировок available, допустимых для клиента, выбирается кодировка
+    с наибольшим весом, при равных весах - более ранняя в available.
+    Возвращает None, если сжимать ответ не нужно.
+    """
+    weights = parse_accept_encoding(header)
+    default = weights.get('*', 0.0)
+    best, best_weight = None, 0.0
+    for encoding in available:
+        weight = weights.get(encoding, default)
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+def compress(data, encoding, level=None):
+    """Сжимает байты в кодировке encoding."""
+    if level is None:
+        level = settings.COMPRESSION_LEVELS[encoding]
+    return ENCODINGS[encoding].compress(data, level)
+
+
+def precompress(data):
+    """Сжимает байты во всех доступных кодировках заранее.
+
+    Возвращает словарь сжатых вариантов, меньших исходных данных. Для
+    коротких данных возвращается пустой словарь.
+    """
+    if len(data) < settings.COMPRESSION_MIN_LENGTH:
+        return {}
+    variants = {}
+    for encoding in ENCODINGS:
+        compressed = compress(
+            data, encoding, settings.PRECOMPRESSION_LEVELS[encoding])
+        if len(compressed) < len(data):
+            variants[encoding] = compressed
+    return variants
+
+
+def is_compressible(response):
+    """Проверяет, имеет ли смысл сжимать ответ такого типа."""
+    content_type = response.get('Content-Type', '').split(';')[0].strip()
+    return (
+        content_type.startswith('text/')
+        or content_type.endswith('+json')
+        or content_type in COMPRESSIBLE_CONTENT_TYPES
+    )
+
+
+def set_content_encoding(response, encoding):
+    """Отмечает ответ как сжатый в кодировке encoding.
+
+    Сильный ETag становится слабым, как требует RFC 7232, при этом
+    условные запросы по нему продолжают совпадать.
+    """
+    etag = response.get('ETag')
+    if etag and etag.startswith('"'):
+        response.headers['ETag'] = 'W/' + etag
+    response.headers['Content-Encoding'] = encoding
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """Сжатие ответов в кодировке br, gzip или deflate.
+
+    Кодировка выбирается по заголовку Accept-Encoding, br доступна при
+    установленном модуле brotli. Ответы короче COMPRESSION_MIN_LENGTH,
+    уже сжатые ответы и ответы несжимаемых типов не изменяются.
+    Потоковые ответы сжимаются по частям без накопления в памяти.
+    """
+
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding') or (
+            not is_compressible(response)
+        ):
+            return response
+        if not response.streaming and len(response.content) < (
+            settings.COMPRESSION_MIN_LENGTH
+        ):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = negotiate_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+        level = settings.COMPRESSION_LEVELS[encoding]
+        if response.streaming:
+            response.streaming_content = ENCODINGS[
+                encoding].compress_sequence(response.streaming_content, level)
+            del response.headers['Content-Length']
+        else:
+            compressed = ENCODINGS[encoding].compress(
+                response.content, level)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+        set_content_encoding(response, encoding)
+        return response
@@ -9,3 +9,18 @@ MIN_ACCEPTABLE_VALUE = 1
 MAX_ACCEPTABLE_VALUE = 32767
 
 PAGE_SIZE = 6
+
+RECIPE_IMAGE_VARIANTS = {
+    'thumb': 320,
+    'feed': 960,
+}
+
+RECIPE_IMAGE_QUALITY = 80
+
+RECIPE_SEARCH_CONFIG = 'russian'
+
+RECIPE_SEARCH_WEIGHTS = {
+    'name': 10.0,
+    'ingredients': 5.0,
+    'text': 1.0,
+}
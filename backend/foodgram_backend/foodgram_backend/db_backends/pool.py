@@ -0,0 +1,196 @@
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_OPTIONS = {
+    'SIZE': 10,
+    'IDLE_TIMEOUT': 300,
+    'HEALTH_CHECKS': True,
+    'STATS_INTERVAL': 1000,
+}
+
+
+class ConnectionPool:
+    """Пул открытых подключений к базе данных одного процесса.
+
+    Подключение, возвращённое в пул, выдаётся повторно вместо открытия
+    нового. Простаивавшие дольше idle_timeout секунд подключения и
+    подключения сверх size закрываются. При выдаче подключение проходит
+    проверку check, если включены health_checks.
+    """
+
+    def __init__(self, size, idle_timeout, health_checks, stats_interval):
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.health_checks = health_checks
+        self.stats_interval = stats_interval
+        self._idle = []
+        self._lock = threading.Lock()
+        self.stats = {
+            'created': 0,
+            'reused': 0,
+            'evicted_idle': 0,
+            'evicted_overflow': 0,
+            'failed_checks': 0,
+            'in_use': 0,
+        }
+
+    def count(self, name):
+        self.stats[name] += 1
+
+    def acquire(self, connect, check, close):
+        """Метод выдачи подключения из пула или открытия нового."""
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                connection, released_at = self._idle.pop()
+            if time.monotonic() - released_at > self.idle_timeout:
+                self.discard(connection, close, 'evicted_idle')
+                continue
+            if self.health_checks:
+                try:
+                    check(connection)
+                except Exception:
+                    self.discard(connection, close, 'failed_checks')
+                    continue
+            with self._lock:
+                self.count('reused')
+                self.count('in_use')
+            self.log_stats()
+            return connection
+        connection = connect()
+        with self._lock:
+            self.count('created')
+            self.count('in_use')
+        self.log_stats()
+        return connection
+
+    def release(self, connection, close):
+        """Метод возврата подключения в пул."""
+        now = time.monotonic()
+        with self._lock:
+            self.stats['in_use'] -= 1
+            expired = [
+                idle for idle, released_at in self._idle
+                if now - released_at > self.idle_timeout
+            ]
+            self._idle = [
+                (idle, released_at) for idle, released_at in self._idle
+                if now - released_at <= self.idle_timeout
+            ]
+            pooled = len(self._idle) < self.size
+            if pooled:
+                self._idle.append((connection, now))
+        for idle in expired:
+            self.discard(idle, close, 'evicted_idle')
+        if not pooled:
+            self.discard(connection, close, 'evicted_overflow')
+
+    def discard(self, connection, close, reason=None, in_use=False):
+        """Метод закрытия подключения, исключённого из пула."""
+        with self._lock:
+            if reason is not None:
+                self.count(reason)
+            if in_use:
+                self.stats['in_use'] -= 1
+        try:
+            close(connection)
+        except Exception:
+            logger.warning('Не удалось закрыть подключение из пула.')
+
+    def get_stats(self):
+        """Метод получения статистики пула."""
+        with self._lock:
+            return {**self.stats, 'idle': len(self._idle)}
+
+    def log_stats(self):
+        stats = self.stats
+        if (stats['created'] + stats['reused']) % self.stats_interval == 0:
+            logger.info(
+                'Пул подключений процесса %s: %s', os.getpid(),
+                self.get_stats()
+            )
+
+
+pools = {}
+pools_lock = threading.Lock()
+
+
+def get_pool(key, options):
+    """Возвращает пул подключений процесса для ключа настроек."""
+    with pools_lock:
+        pool = pools.get(key)
+        if pool is None:
+            options = {**DEFAULT_POOL_OPTIONS, **options}
+            pool = pools[key] = ConnectionPool(
+                size=options['SIZE'],
+                idle_timeout=options['IDLE_TIMEOUT'],
+                health_checks=options['HEALTH_CHECKS'],
+                stats_interval=options['STATS_INTERVAL'],
+            )
+        return pool
+
+
+def get_pool_stats():
+    """Возвращает статистику всех пулов процесса по алиасам баз данных."""
+    with pools_lock:
+        return {key[0]: pool.get_stats() for key, pool in pools.items()}
+
+
+class PooledDatabaseWrapperMixin:
+    """Миксин бэкенда базы данных, берущий подключения из пула.
+
+    Вместо закрытия подключение откатывает незавершённую транзакцию и
+    возвращается в пул процесса. Пулы не разделяются между процессами,
+    в том числе после fork. Настройки пула задаются ключом POOL в
+    настройках базы данных.
+    """
+
+    def get_pool(self):
+        return get_pool(
+            (self.alias, str(self.settings_dict['NAME']), os.getpid()),
+            self.settings_dict.get('POOL', {})
+        )
+
+    def get_new_connection(self, conn_params):
+        return self.get_pool().acquire(
+            lambda: super(
+                PooledDatabaseWrapperMixin, self
+            ).get_new_connection(conn_params),
+            self.check_pooled_connection,
+            self.close_pooled_connection,
+        )
+
+    def _close(self):
+        if self.connection is None:
+            return
+        pool = self.get_pool()
+        if self.in_atomic_block:
+            pool.discard(
+                self.connection, self.close_pooled_connection, in_use=True)
+            return
+        try:
+            with self.wrap_database_errors:
+                self.connection.rollback()
+        except Exception:
+            pool.discard(
+                self.connection, self.close_pooled_connection,
+                'failed_checks', in_use=True
+            )
+            raise
+        pool.release(self.connection, self.close_pooled_connection)
+
+    def check_pooled_connection(self, connection):
+        """Проверяет, что подключение из пула ещё работает."""
+        cursor = connection.cursor()
+        try:
+            cursor.execute('SELECT 1')
+        finally:
+            cursor.close()
+
+    def close_pooled_connection(self, connection):
+        connection.close()
@@ -0,0 +1,12 @@
+from django.db.backends.postgresql import base
+
+from ..pool import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    """Бэкенд PostgreSQL с пулом подключений."""
+
+    def check_pooled_connection(self, connection):
+        if connection.closed:
+            raise base.Database.InterfaceError('Подключение закрыто.')
+        super().check_pooled_connection(connection)
@@ -0,0 +1,264 @@
+import json
+import logging
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+current_metrics = ContextVar('current_metrics', default=None)
+
+MAX_SIGNATURES_PER_VIEW = 100
+
+repeated_queries = defaultdict(Counter)
+repeated_queries_lock = threading.Lock()
+
+
+class RequestMetrics:
+    """Показатели обработки одного запроса.
+
+    Считаются число и суммарное время запросов к базе данных и время
+    работы представления вне базы данных, которое для запросов на чтение
+    почти целиком уходит на сериализацию. Для отобранных запросов
+    sampled дополнительно собираются тексты SQL для поиска повторов.
+    """
+
+    def __init__(self, view_name=None, sampled=False, request=None):
+        self._view_name = view_name
+        self.request = request
+        self.sampled = sampled
+        self.started = time.perf_counter()
+        self.query_count = 0
+        self.db_time = 0.0
+        self.serialize_time = None
+        self.signatures = Counter()
+        self._view_started = None
+        self._lock = threading.Lock()
+
+    @property
+    def view_name(self):
+        if self._view_name is None and self.request is not None and (
+            self.request.resolver_match is not None
+        ):
+            self._view_name = self.request.resolver_match.view_name
+        return self._view_name
+
+    def add_query(self, sql, duration):
+        """Метод учёта выполненного запроса к базе данных."""
+        with self._lock:
+            self.query_count += 1
+            self.db_time += duration
+            if self.sampled:
+                self.signatures[sql] += 1
+        if duration * 1000 >= settings.SLOW_QUERY_THRESHOLD_MS:
+            logger.warning(
+                'Медленный запрос %.1f мс в %s: %s',
+                duration * 1000, self.view_name, sql
+            )
+
+    def start_view(self):
+        """Метод отметки начала работы представления."""
+        self._view_started = (time.perf_counter(), self.db_time)
+
+    def finish_view(self):
+        """Метод отметки окончания работы представления."""
+        if self._view_started is None:
+            return
+        started, db_time = self._view_started
+        self.serialize_time = max(
+            time.perf_counter() - started - (self.db_time - db_time), 0.0)
+        self._view_started = None
+
+    def get_repeated_queries(self):
+        """Возвращает пары (SQL, число выполнений) повторённых запросов.
+
+        Повтором считается запрос с одинаковым текстом SQL, выполненный
+        за время обработки не меньше N_PLUS_ONE_THRESHOLD раз.
+        """
+        return [
+            (sql, count) for sql, count in self.signatures.most_common()
+            if count >= settings.N_PLUS_ONE_THRESHOLD
+        ]
+
+    def get_timings(self):
+        """Возвращает длительности этапов обработки в миллисекундах."""
+        timings = {
+            'total': (time.perf_counter() - self.started) * 1000,
+            'db': self.db_time * 1000,
+        }
+        if self.serialize_time is not None:
+            timings['serialize'] = self.serialize_time * 1000
+        return timings
+
+
+def get_server_timing(metrics, timings):
+    """Возвращает значение заголовка Server-Timing."""
+    items = []
+    for name, duration in timings.items():
+        item = f'{name};dur={duration:.1f}'
+        if name == 'db':
+            item += f';desc="{metrics.query_count} queries"'
+        items.append(item)
+    return ', '.join(items)
+
+
+def record_query(execute, sql, params, many, context):
+    """Обёртка выполнения SQL, учитывающая запросы текущего запроса."""
+    metrics = current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.add_query(sql, time.perf_counter() - started)
+
+
+def install_execute_wrapper(sender=None, connection=None, **kwargs):
+    """Подключает record_query к подключению к базе данных.
+
+    Обёртка ставится первой, чтобы не мешать временным обёрткам,
+    которые снимаются с конца списка.
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
+
+
+connection_created.connect(install_execute_wrapper)
+
+
+@contextmanager
+def collect_metrics(view_name=None, sampled=False, request=None):
+    """Контекст сбора показателей запросов к базе данных."""
+    metrics = RequestMetrics(view_name, sampled, request)
+    token = current_metrics.set(metrics)
+    try:
+        yield metrics
+    finally:
+        current_metrics.reset(token)
+
+
+def record_repeated_queries(metrics):
+    """Метод учёта и записи в журнал повторённых запросов представления."""
+    repeated = metrics.get_repeated_queries()
+    if not repeated:
+        return
+    with repeated_queries_lock:
+        signatures = repeated_queries[metrics.view_name]
+        for sql, _ in repeated:
+            if sql in signatures or len(signatures) < (
+                MAX_SIGNATURES_PER_VIEW
+            ):
+                signatures[sql] += 1
+    for sql, count in repeated:
+        logger.warning(
+            'Повторённый запрос в %s выполнен %s раз: %s',
+            metrics.view_name, count, sql
+        )
+
+
+def get_repeated_queries():
+    """Возвращает число запросов с повторами SQL по именам представлений."""
+    with repeated_queries_lock:
+        return {
+            view_name: dict(signatures)
+            for view_name, signatures in repeated_queries.items()
+        }
+
+
+class ServerTimingMiddleware:
+    """Показатели производительности запросов.
+
+    Для каждого запроса считаются число и время запросов к базе данных,
+    время сериализации и общее время обработки. Они записываются в
+    журнал строкой JSON с уровнем INFO для отобранных запросов и
+    запросов дольше SLOW_REQUEST_THRESHOLD_MS, иначе с уровнем DEBUG.
+    При включённой настройке SERVER_TIMING_HEADER они же отправляются в
+    заголовке Server-Timing.
+    Запросы к базе данных дольше SLOW_QUERY_THRESHOLD_MS записываются
+    в журнал вместе с SQL. Доля INSTRUMENTATION_SAMPLE_RATE запросов
+    проверяется на повторы одинаковых запросов, признак проблемы N+1.
+    Для потоковых ответов общее время не включает отправку тела.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        for connection in connections.all():
+            if connection.connection is not None:
+                install_execute_wrapper(connection=connection)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with collect_metrics(
+            sampled=self.is_sampled(), request=request
+        ) as metrics:
+            response = self.get_response(request)
+        return self.process_response(request, response, metrics)
+
+    async def __acall__(self, request):
+        with collect_metrics(
+            sampled=self.is_sampled(), request=request
+        ) as metrics:
+            response = await self.get_response(request)
+        return self.process_response(request, response, metrics)
+
+    def is_sampled(self):
+        return random.random() < settings.INSTRUMENTATION_SAMPLE_RATE
+
+    def process_response(self, request, response, metrics):
+        timings = metrics.get_timings()
+        if settings.SERVER_TIMING_HEADER:
+            response.headers['Server-Timing'] = get_server_timing(
+                metrics, timings)
+        level = logging.INFO if metrics.sampled or timings['total'] >= (
+            settings.SLOW_REQUEST_THRESHOLD_MS
+        ) else logging.DEBUG
+        if logger.isEnabledFor(level):
+            logger.log(level, json.dumps({
+                'method': request.method,
+                'path': request.path,
+                'view': metrics.view_name,
+                'status': response.status_code,
+                'queries': metrics.query_count,
+                **{
+                    f'{name}_ms': round(duration, 3)
+                    for name, duration in timings.items()
+                },
+            }))
+        if metrics.sampled:
+            record_repeated_queries(metrics)
+        return response
+
+
+class ViewTimingMixin:
+    """Миксин представления DRF, отмечающий время его работы.
+
+    Время между проверкой прав доступа и формированием ответа без учёта
+    запросов к базе данных попадает в показатель serialize.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        metrics = current_metrics.get()
+        if metrics is not None:
+            metrics.start_view()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        metrics = current_metrics.get()
+        if metrics is not None:
+            metrics.finish_view()
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -0,0 +1,142 @@
+import csv
+import json
+import os
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+LOAD_CHUNK_SIZE = 5000
+
+JSON_READ_SIZE = 64 * 1024
+
+
+def chunked(iterable, size):
+    """Разбивает итерируемый объект на списки длиной не более size."""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def iter_json_array(file):
+    """Построчно читает элементы JSON-массива, не загружая файл целиком."""
+    decoder = json.JSONDecoder()
+    buffer = file.read(JSON_READ_SIZE).lstrip()
+    if not buffer.startswith('['):
+        raise ValueError('Ожидается JSON-массив.')
+    buffer = buffer[1:]
+    while True:
+        buffer = buffer.lstrip().lstrip(',').lstrip()
+        if buffer.startswith(']'):
+            return
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            data = file.read(JSON_READ_SIZE)
+            if not data:
+                raise
+            buffer += data
+            continue
+        yield item
+        buffer = buffer[end:]
+        if len(buffer) < JSON_READ_SIZE:
+            buffer += file.read(JSON_READ_SIZE)
+
+
+class BulkLoadCommand(BaseCommand):
+    """Базовая команда пакетной загрузки данных из CSV и JSON файлов.
+
+    Файлы читаются потоково и обрабатываются пачками по chunk_size строк.
+    Каждая пачка сохраняется в своей транзакции через bulk_create с
+    ignore_conflicts=True, поэтому повторный запуск не создаёт дубликатов
+    и не падает на ограничениях уникальности. Внешние ключи подставляются
+    из словарей, подготовленных в prepare() одним запросом.
+    """
+
+    csv_delimiter = ','
+    csv_encoding = 'utf-8-sig'
+    csv_fieldnames = None
+    required_fields = None
+    success_message = 'Данные успешно загружены в базу данных.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_file', nargs='+', type=str)
+        parser.add_argument(
+            '--chunk-size', type=int, default=LOAD_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        for file_path in options['csv_file']:
+            if not os.path.exists(file_path):
+                self.stderr.write(self.style.ERROR(
+                    f'Файл отсутствует: {file_path}'))
+                continue
+            started = time.perf_counter()
+            self.prepare()
+            rows_count = 0
+            with open(file_path, 'r', encoding=self.csv_encoding) as file:
+                for chunk in chunked(
+                    self.read_rows(file, file_path), options['chunk_size']
+                ):
+                    with transaction.atomic():
+                        self.load_chunk(chunk, rows_count)
+                    rows_count += len(chunk)
+            self.finish()
+            elapsed = time.perf_counter() - started
+            self.stdout.write(self.style.SUCCESS(
+                f'{self.success_message} Обработано строк: {rows_count} '
+                f'за {elapsed:.2f} с ({rows_count / elapsed:.0f} строк/с).'
+            ))
+
+    def read_rows(self, file, file_path):
+        """Возвращает итератор строк файла CSV или элементов JSON-массива."""
+        if file_path.endswith('.json'):
+            return iter_json_array(file)
+        if self.csv_fieldnames is None:
+            return csv.DictReader(file, delimiter=self.csv_delimiter)
+        return csv.DictReader(
+            file,
+            fieldnames=self.csv_fieldnames,
+            delimiter=self.csv_delimiter
+        )
+
+    def prepare(self):
+        """Готовит словари для подстановки внешних ключей."""
+
+    def finish(self):
+        """Выполняется после загрузки файла."""
+
+    def build_objects(self, row, line_number):
+        """Возвращает список объектов модели, созданных по строке файла."""
+        raise NotImplementedError
+
+    def is_complete(self, row, line_number):
+        """Проверяет, что в строке заполнены обязательные столбцы.
+
+        Обязательные столбцы задаются атрибутом required_fields, по
+        умолчанию - все столбцы csv_fieldnames.
+        """
+        required = self.required_fields or self.csv_fieldnames or ()
+        missing = [name for name in required if not row.get(name)]
+        if missing:
+            self.report_error(
+                f'Не заполнены столбцы: {", ".join(missing)}.', line_number)
+            return False
+        return True
+
+    def load_chunk(self, rows, offset):
+        """Сохраняет пачку строк в базу данных, пропуская неполные строки."""
+        objects = []
+        for line_number, row in enumerate(rows, start=offset + 1):
+            if self.is_complete(row, line_number):
+                objects.extend(self.build_objects(row, line_number))
+        if objects:
+            type(objects[0]).objects.bulk_create(
+                objects, ignore_conflicts=True)
+
+    def report_error(self, message, line_number):
+        self.stderr.write(self.style.ERROR(
+            f'{message} Номер строки: {line_number}'))
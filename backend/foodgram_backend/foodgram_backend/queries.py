@@ -0,0 +1,156 @@
+from django.db import connections, router, transaction
+
+
+def insert_or_ignore(model, **values):
+    """Вставляет строку одним запросом, пропуская нарушения уникальности.
+
+    Использует INSERT ... ON CONFLICT DO NOTHING на PostgreSQL и SQLite
+    и INSERT IGNORE на MySQL. Возвращает True, если строка была вставлена.
+    """
+    using = router.db_for_write(model)
+    connection = connections[using]
+    ops = connection.ops
+    fields = [model._meta.get_field(name) for name in values]
+    sql = '{} {} ({}) VALUES ({}) {}'.format(
+        ops.insert_statement(ignore_conflicts=True),
+        ops.quote_name(model._meta.db_table),
+        ', '.join(ops.quote_name(field.column) for field in fields),
+        ', '.join(['%s'] * len(fields)),
+        ops.ignore_conflicts_suffix_sql(ignore_conflicts=True),
+    )
+    params = [
+        field.get_db_prep_save(value, connection)
+        for field, value in zip(fields, values.values())
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.rowcount > 0
+
+
+def can_return_rows(connection):
+    """Проверяет, поддерживает ли база данных INSERT и DELETE с RETURNING."""
+    if connection.vendor == 'sqlite':
+        return connection.Database.sqlite_version_info >= (3, 35)
+    return connection.vendor == 'postgresql'
+
+
+def bulk_insert_or_ignore(model, fields, rows, returning):
+    """Вставляет строки одним запросом, пропуская нарушения уникальности.
+
+    rows - последовательность кортежей значений полей fields. Возвращает
+    список значений поля returning только вставленных строк, поэтому
+    строки, одновременно вставленные другой транзакцией, в него не
+    попадают. Без поддержки RETURNING строки вставляются по одной.
+    """
+    rows = list(rows)
+    if not rows:
+        return []
+    using = router.db_for_write(model)
+    connection = connections[using]
+    if not can_return_rows(connection):
+        position = list(fields).index(returning)
+        return [
+            row[position] for row in rows
+            if insert_or_ignore(model, **dict(zip(fields, row)))
+        ]
+    ops = connection.ops
+    model_fields = [model._meta.get_field(name) for name in fields]
+    placeholder = '({})'.format(', '.join(['%s'] * len(model_fields)))
+    sql = '{} {} ({}) VALUES {} {} RETURNING {}'.format(
+        ops.insert_statement(ignore_conflicts=True),
+        ops.quote_name(model._meta.db_table),
+        ', '.join(ops.quote_name(field.column) for field in model_fields),
+        ', '.join([placeholder] * len(rows)),
+        ops.ignore_conflicts_suffix_sql(ignore_conflicts=True),
+        ops.quote_name(model._meta.get_field(returning).column),
+    )
+    params = [
+        field.get_db_prep_save(value, connection)
+        for row in rows
+        for field, value in zip(model_fields, row)
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [value for value, in cursor.fetchall()]
+
+
+def delete_returning(queryset, *fields):
+    """Удаляет строки набора запросов и возвращает значения их полей.
+
+    Возвращает список кортежей значений полей fields только удалённых
+    этим запросом строк. Сигналы удаления не отправляются, каскадное
+    удаление остаётся базе данных. Без поддержки RETURNING строки
+    блокируются select_for_update() и удаляются вторым запросом.
+    """
+    using = queryset.db
+    connection = connections[using]
+    model = queryset.model
+    if not can_return_rows(connection):
+        with transaction.atomic(using=using, savepoint=False):
+            rows = list(queryset.select_for_update().values_list(
+                'pk', *fields))
+            model._base_manager.using(using).filter(
+                pk__in=[row[0] for row in rows])._raw_delete(using)
+        return [row[1:] for row in rows]
+    ops = connection.ops
+    opts = model._meta
+    subquery, params = queryset.order_by().values('pk').query.get_compiler(
+        using).as_sql()
+    sql = 'DELETE FROM {} WHERE {} IN ({}) RETURNING {}'.format(
+        ops.quote_name(opts.db_table),
+        ops.quote_name(opts.pk.column),
+        subquery,
+        ', '.join(
+            ops.quote_name(opts.get_field(name).column) for name in fields),
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [tuple(row) for row in cursor.fetchall()]
+
+
+UPSERT_BATCH_SIZE = 250
+
+
+def upsert_increment(model, key_fields, field, rows):
+    """Прибавляет значения к полю строк, создавая недостающие строки.
+
+    rows - последовательность кортежей значений полей key_fields и field.
+    По ключу key_fields должно действовать ограничение уникальности.
+    Использует INSERT ... ON CONFLICT DO UPDATE на PostgreSQL и SQLite
+    и INSERT ... ON DUPLICATE KEY UPDATE на MySQL, строки вставляются
+    пачками по UPSERT_BATCH_SIZE.
+    """
+    using = router.db_for_write(model)
+    connection = connections[using]
+    ops = connection.ops
+    fields = [
+        model._meta.get_field(name) for name in (*key_fields, field)]
+    table = ops.quote_name(model._meta.db_table)
+    columns = [ops.quote_name(field.column) for field in fields]
+    value = columns[-1]
+    if connection.vendor == 'mysql':
+        suffix = (
+            f'ON DUPLICATE KEY UPDATE {value} = {value} + VALUES({value})')
+    else:
+        suffix = (
+            f'ON CONFLICT ({", ".join(columns[:-1])}) DO UPDATE '
+            f'SET {value} = {table}.{value} + EXCLUDED.{value}'
+        )
+    placeholder = '({})'.format(', '.join(['%s'] * len(fields)))
+    rows = list(rows)
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+            batch = rows[start:start + UPSERT_BATCH_SIZE]
+            cursor.execute(
+                'INSERT INTO {} ({}) VALUES {} {}'.format(
+                    table,
+                    ', '.join(columns),
+                    ', '.join([placeholder] * len(batch)),
+                    suffix
+                ),
+                [
+                    field.get_db_prep_save(item, connection)
+                    for row in batch
+                    for field, item in zip(fields, row)
+                ]
+            )
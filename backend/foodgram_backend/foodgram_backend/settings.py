@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/3.2/ref/settings/
 """
 import os
+import tempfile
 from pathlib import Path
 
 from django.core.management.utils import get_random_secret_key
@@ -55,7 +56,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'foodgram_backend.instrumentation.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'foodgram_backend.compression.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -64,7 +67,61 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-ROOT_URLCONF = 'foodgram_backend.urls'
+# Query count, database, serialization and total time of every request
+# are logged as a JSON line at DEBUG level, and at INFO level for sampled
+# requests and requests slower than SLOW_REQUEST_THRESHOLD_MS. Set
+# SERVER_TIMING_HEADER=True to also send them in the Server-Timing header,
+# which exposes them to every client, so keep it off in production.
+# Queries slower than SLOW_QUERY_THRESHOLD_MS are logged with their SQL.
+# A share of INSTRUMENTATION_SAMPLE_RATE requests is checked for SQL
+# repeated at least N_PLUS_ONE_THRESHOLD times.
+
+SERVER_TIMING_HEADER = os.getenv('SERVER_TIMING_HEADER', 'False') == 'True'
+
+SLOW_REQUEST_THRESHOLD_MS = float(
+    os.getenv('SLOW_REQUEST_THRESHOLD_MS', 500))
+
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv('SLOW_QUERY_THRESHOLD_MS', 100))
+
+INSTRUMENTATION_SAMPLE_RATE = float(
+    os.getenv('INSTRUMENTATION_SAMPLE_RATE', 0.01))
+
+N_PLUS_ONE_THRESHOLD = int(os.getenv('N_PLUS_ONE_THRESHOLD', 5))
+
+# The test runner raises the instrumentation logger to WARNING so that
+# per-request JSON lines do not clutter the test output.
+
+TEST_RUNNER = 'foodgram_backend.test_runner.TestRunner'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'foodgram_backend.instrumentation': {
+            'handlers': ['console'],
+            'level': os.getenv('INSTRUMENTATION_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
+# Under an ASGI server the read-only recipe, tag, ingredient and
+# subscription endpoints can be served by async views. Each request runs
+# in a single call to a pool of ASYNC_ORM_WORKERS threads, so all its ORM
+# queries share one database connection, kept or closed afterwards
+# according to CONN_MAX_AGE or DB_CONNECTION_POOL.
+
+ASYNC_READ_VIEWS = os.getenv('ASYNC_READ_VIEWS', 'False') == 'True'
+
+ASYNC_ORM_WORKERS = int(os.getenv('ASYNC_ORM_WORKERS', 8))
+
+ROOT_URLCONF = (
+    'foodgram_backend.async_urls' if ASYNC_READ_VIEWS
+    else 'foodgram_backend.urls'
+)
 
 
 TEMPLATES = [
@@ -105,9 +162,146 @@ else:
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': BASE_DIR / 'db.sqlite3',
+            # Tests use a file database because an in-memory one does
+            # not allow the concurrent writers of the concurrency tests.
+            # Set SQLITE3_TEST_DATABASE to change its location.
+            'TEST': {'NAME': os.getenv(
+                'SQLITE3_TEST_DATABASE',
+                os.path.join(tempfile.gettempdir(), 'foodgram_test.sqlite3')
+            )},
         }
     }
 
+# Set DB_CONNECTION_POOL=True to reuse connections between requests
+# through the pooled backends from foodgram_backend.db_backends.
+
+if os.getenv('DB_CONNECTION_POOL', default='False') == 'True':
+    DATABASES['default']['ENGINE'] = DATABASES['default']['ENGINE'].replace(
+        'django.db.backends.', 'foodgram_backend.db_backends.')
+    DATABASES['default']['POOL'] = {
+        'SIZE': int(os.getenv('DB_POOL_SIZE', 10)),
+        'IDLE_TIMEOUT': int(os.getenv('DB_POOL_IDLE_TIMEOUT', 300)),
+        'HEALTH_CHECKS': os.getenv('DB_POOL_HEALTH_CHECKS', 'True') == 'True',
+        'STATS_INTERVAL': int(os.getenv('DB_POOL_STATS_INTERVAL', 1000)),
+    }
+
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+# The catalog cache keeps pre-rendered tags and ingredients responses.
+# Set CATALOG_CACHE_LOCATION to a directory to share it between workers.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'catalog': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'catalog',
+    },
+    'recipes': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'recipes',
+    },
+    'relations': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'relations',
+    },
+}
+
+if os.getenv('CATALOG_CACHE_LOCATION'):
+    CACHES['catalog'] = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv('CATALOG_CACHE_LOCATION'),
+    }
+
+CATALOG_CACHE_TIMEOUT = int(os.getenv('CATALOG_CACHE_TIMEOUT', 60 * 60 * 24))
+
+# The viewer-independent part of each recipe representation is cached
+# under its id and version. The version changes on every edit of the
+# recipe, its tags and ingredients or its author's profile, so entries
+# never need invalidation and old versions simply expire.
+
+if os.getenv('RECIPE_CACHE_LOCATION'):
+    CACHES['recipes'] = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv('RECIPE_CACHE_LOCATION'),
+    }
+
+CACHES['recipes']['OPTIONS'] = {
+    'MAX_ENTRIES': int(os.getenv('RECIPE_CACHE_MAX_ENTRIES', 10000)),
+}
+
+RECIPE_CACHE_TIMEOUT = int(os.getenv('RECIPE_CACHE_TIMEOUT', 60 * 60 * 24))
+
+# Responses of CATALOG_MEMORY_CACHE_SIZE recently requested catalog pages
+# are also kept in process memory. Unfiltered catalog pages are stored
+# together with their br, gzip and deflate variants compressed at
+# PRECOMPRESSION_LEVELS, filtered ones are compressed per request.
+
+CATALOG_MEMORY_CACHE_SIZE = int(os.getenv('CATALOG_MEMORY_CACHE_SIZE', 256))
+
+# Responses shorter than COMPRESSION_MIN_LENGTH bytes are sent as is.
+# Brotli is used only when the brotli package is installed.
+
+COMPRESSION_MIN_LENGTH = int(os.getenv('COMPRESSION_MIN_LENGTH', 500))
+
+COMPRESSION_LEVELS = {
+    'br': int(os.getenv('COMPRESSION_BROTLI_QUALITY', 4)),
+    'gzip': int(os.getenv('COMPRESSION_GZIP_LEVEL', 6)),
+    'deflate': int(os.getenv('COMPRESSION_GZIP_LEVEL', 6)),
+}
+
+PRECOMPRESSION_LEVELS = {
+    'br': 11,
+    'gzip': 9,
+    'deflate': 9,
+}
+
+# Favorites, shopping cart and subscriptions ids of recently active users
+# are kept in process memory under a per-user version stored in the
+# relations cache. Every change bumps the version, so other workers reload
+# the ids on their next request once USER_RELATIONS_CACHE_LOCATION points
+# all of them at one directory. The timeout bounds the lifetime of the ids
+# otherwise.
+
+if os.getenv('USER_RELATIONS_CACHE_LOCATION'):
+    CACHES['relations'] = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv('USER_RELATIONS_CACHE_LOCATION'),
+    }
+
+USER_RELATIONS_CACHE_SIZE = int(os.getenv('USER_RELATIONS_CACHE_SIZE', 10000))
+
+USER_RELATIONS_CACHE_TIMEOUT = int(
+    os.getenv('USER_RELATIONS_CACHE_TIMEOUT', 60))
+
+# Token to user pairs are cached in process memory and, when
+# TOKEN_CACHE_ALIAS names one of CACHES, in that shared cache as well.
+# Logout and user changes invalidate both, other workers drop their
+# copies after TOKEN_CACHE_TIMEOUT seconds.
+
+TOKEN_CACHE_SIZE = int(os.getenv('TOKEN_CACHE_SIZE', 10000))
+
+TOKEN_CACHE_TIMEOUT = int(os.getenv('TOKEN_CACHE_TIMEOUT', 30))
+
+TOKEN_CACHE_SHARED_TIMEOUT = int(
+    os.getenv('TOKEN_CACHE_SHARED_TIMEOUT', 60 * 10))
+
+TOKEN_CACHE_ALIAS = os.getenv('TOKEN_CACHE_ALIAS') or None
+
+TOKEN_CACHE_STATS_INTERVAL = int(
+    os.getenv('TOKEN_CACHE_STATS_INTERVAL', 1000))
+
+# Bulk favorite, shopping cart and subscription endpoints accept at most
+# BULK_WRITE_MAX_ITEMS ids per request.
+
+BULK_WRITE_MAX_ITEMS = int(os.getenv('BULK_WRITE_MAX_ITEMS', 100))
+
+# List endpoints of recipes, tags and ingredients build response dicts
+# from values_list() rows instead of DRF serializers.
+
+FAST_LIST_RENDERING = os.getenv('FAST_LIST_RENDERING', 'True') == 'True'
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -133,7 +327,11 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
+    ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 6,
@@ -185,6 +383,10 @@ STATIC_ROOT = BASE_DIR / "collected_static"
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Number of threads that build resized copies of uploaded recipe images.
+
+IMAGE_PROCESSING_WORKERS = int(os.getenv('IMAGE_PROCESSING_WORKERS', 2))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
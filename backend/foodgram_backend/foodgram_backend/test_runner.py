@@ -0,0 +1,16 @@
+import logging
+
+from django.test.runner import DiscoverRunner
+
+
+class TestRunner(DiscoverRunner):
+    """Запуск тестов без журнала показателей запросов.
+
+    Строки журнала foodgram_backend.instrumentation с уровнем ниже
+    WARNING не выводятся, тесты проверяют их через assertLogs().
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        logging.getLogger('foodgram_backend.instrumentation').setLevel(
+            logging.WARNING)
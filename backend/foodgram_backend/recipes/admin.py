@@ -1,9 +1,10 @@
 from django.contrib import admin
+from django.db.models import Q
 
 from .models import (
     Favorites,
     Recipe,
-    Ingredient, IngredientsInRecipe, ShoppingCart, Tag)
+    Ingredient, IngredientsInRecipe, ShoppingCart, ShoppingTotal, Tag)
 
 
 class TagAdmin(admin.ModelAdmin):
@@ -33,22 +34,52 @@ class RecipeAdmin(admin.ModelAdmin):
         'pub_date',
         'author',
         'name',
-        'tags_list'
+        'tags_list',
+        'favorites_count',
     )
-    search_fields = ('name', 'author__username', 'tags__name')
+    search_fields = ('author__username', 'tags__name', 'tags__slug')
     list_display_links = ('name', 'author')
-    readonly_fields = ('favorites_count',)
+    list_select_related = ('author',)
+    readonly_fields = (
+        'favorites_count',
+        'shopping_cart_count',
+        'ingredients_count',
+    )
     inlines = [IngredientsInRecipeInline]
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related('tags')
+
+    def save_related(self, request, form, formsets, change):
+        recipe = form.instance
+        old_amounts = dict(recipe.ingredients_in_recipe.values_list(
+            'ingredient_id', 'amount'))
+        super().save_related(request, form, formsets, change)
+        ShoppingTotal.objects.apply_recipe_change(
+            recipe.pk, old_amounts,
+            dict(recipe.ingredients_in_recipe.values_list(
+                'ingredient_id', 'amount'))
+        )
+        Recipe.objects.filter(pk=recipe.pk).refresh_ingredients()
+
+    def get_search_results(self, request, queryset, search_term):
+        """Метод поиска рецептов.
+
+        Название, описание и ингредиенты ищутся по полнотекстовому
+        индексу, автор и теги - по полям search_fields.
+        """
+        if not search_term:
+            return queryset, False
+        by_fields, _ = super().get_search_results(
+            request, queryset, search_term)
+        return queryset.filter(
+            Q(pk__in=queryset.search(search_term).order_by().values('pk'))
+            | Q(pk__in=by_fields.order_by().values('pk'))
+        ), False
+
     def tags_list(self, obj):
         return ", ".join([tag.name for tag in obj.tags.all()])
 
-    def favorites_count(self, obj):
-        return obj.favorites.count()
-
-    favorites_count.short_description = (
-        "Добавлено в избранное кол-во раз: ")
-
 
 class IngredientsInRecipeAdmin(admin.ModelAdmin):
     """Административная конфигурация для ингредиентов в рецепте."""
@@ -60,6 +91,28 @@ class IngredientsInRecipeAdmin(admin.ModelAdmin):
     )
     list_per_page = 25
 
+    @staticmethod
+    def ingredients_changed(recipe_ids):
+        """Обновляет суммы корзин и рецепты с изменёнными ингредиентами."""
+        ShoppingTotal.objects.rebuild_for_recipes(recipe_ids)
+        Recipe.objects.filter(pk__in=recipe_ids).refresh_ingredients()
+
+    def save_model(self, request, obj, form, change):
+        recipe_ids = {obj.recipe_id}
+        if change and 'recipe' in form.changed_data:
+            recipe_ids.add(form.initial['recipe'])
+        super().save_model(request, obj, form, change)
+        self.ingredients_changed(recipe_ids)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        self.ingredients_changed({obj.recipe_id})
+
+    def delete_queryset(self, request, queryset):
+        recipe_ids = set(queryset.values_list('recipe_id', flat=True))
+        super().delete_queryset(request, queryset)
+        self.ingredients_changed(recipe_ids)
+
 
 class ShoppingCartAdmin(admin.ModelAdmin):
     """Административная конфигурация для корзины покупок."""
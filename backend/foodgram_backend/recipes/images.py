@@ -0,0 +1,123 @@
+import logging
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps, features
+
+from foodgram_backend.constants import (
+    RECIPE_IMAGE_QUALITY, RECIPE_IMAGE_VARIANTS)
+
+logger = logging.getLogger(__name__)
+
+VARIANTS_DIRECTORY = 'recipes/images/variants'
+
+IMAGE_FORMATS = {
+    'webp': 'WEBP',
+    'jpeg': 'JPEG',
+}
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.IMAGE_PROCESSING_WORKERS,
+    thread_name_prefix='recipe-images'
+)
+
+
+def get_image_formats():
+    """Возвращает форматы уменьшенных копий, доступные в Pillow."""
+    return [
+        extension for extension in IMAGE_FORMATS
+        if extension != 'webp' or features.check('webp')
+    ]
+
+
+def get_variant_name(image_name, variant, extension):
+    """Возвращает путь уменьшенной копии изображения в хранилище."""
+    stem = posixpath.splitext(posixpath.basename(image_name))[0]
+    return f'{VARIANTS_DIRECTORY}/{stem}_{variant}.{extension}'
+
+
+def render_variant(image, width, extension):
+    """Уменьшает изображение до заданной ширины и кодирует его."""
+    variant = image.copy()
+    variant.thumbnail((width, width * 4))
+    if variant.mode not in ('RGB', 'L'):
+        variant = variant.convert('RGB')
+    buffer = BytesIO()
+    variant.save(
+        buffer, IMAGE_FORMATS[extension], quality=RECIPE_IMAGE_QUALITY)
+    return variant.width, buffer.getvalue()
+
+
+def get_variant_files(variants):
+    """Возвращает пути файлов уменьшенных копий из поля image_variants."""
+    return {
+        name
+        for variant in variants.values()
+        for key, name in variant.items() if key != 'width'
+    }
+
+
+def delete_variant_files(variants, keep=()):
+    """Удаляет из хранилища файлы уменьшенных копий, кроме путей keep."""
+    for name in get_variant_files(variants) - set(keep):
+        default_storage.delete(name)
+
+
+def generate_image_variants(recipe_id, image_name, previous_variants=None):
+    """Создаёт уменьшенные копии изображения рецепта.
+
+    Копии сохраняются рядом с оригиналом, а их пути записываются в поле
+    image_variants, если изображение рецепта за это время не сменилось.
+    После этого удаляются файлы previous_variants - копий прежнего
+    изображения. Если изображение сменилось, удаляются созданные копии.
+    """
+    from .models import Recipe
+
+    with default_storage.open(image_name) as file:
+        image = ImageOps.exif_transpose(Image.open(file))
+        image.load()
+    variants = {}
+    for variant, width in RECIPE_IMAGE_VARIANTS.items():
+        variants[variant] = {}
+        for extension in get_image_formats():
+            name = get_variant_name(image_name, variant, extension)
+            variant_width, content = render_variant(image, width, extension)
+            default_storage.delete(name)
+            variants[variant][extension] = default_storage.save(
+                name, ContentFile(content))
+        variants[variant]['width'] = variant_width
+    recipes = Recipe.objects.filter(pk=recipe_id, image=image_name)
+    if recipes.update(image_variants=variants):
+        recipes.bump_version()
+        delete_variant_files(
+            previous_variants or {}, keep=get_variant_files(variants))
+    else:
+        delete_variant_files(variants)
+    return variants
+
+
+def process_in_worker(recipe_id, image_name, previous_variants):
+    """Создаёт копии изображения в потоке пула и закрывает соединения."""
+    try:
+        generate_image_variants(recipe_id, image_name, previous_variants)
+    except Exception:
+        logger.exception(
+            'Не удалось создать копии изображения %s', image_name)
+    finally:
+        close_old_connections()
+
+
+def schedule_image_variants(recipe, previous_variants=None):
+    """Ставит создание копий изображения в очередь после коммита.
+
+    previous_variants - копии прежнего изображения, которые удаляются
+    после сохранения новых.
+    """
+    image_name = recipe.image.name
+    transaction.on_commit(lambda: executor.submit(
+        process_in_worker, recipe.pk, image_name, previous_variants))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.models import ShoppingTotal
+
+
+class Command(BaseCommand):
+    help = (
+        'Сверяет суммы ингредиентов в корзинах покупок с корзинами, '
+        'с ключом --fix пересчитывает разошедшиеся суммы.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('user_ids', nargs='*', type=int)
+        parser.add_argument('--fix', action='store_true')
+
+    def handle(self, *args, **options):
+        drift = ShoppingTotal.objects.find_drift(options['user_ids'] or None)
+        if not drift:
+            self.stdout.write(self.style.SUCCESS('Расхождений нет.'))
+            return
+        for user_id, ingredient_id, expected, stored in drift:
+            self.stdout.write(
+                f'Пользователь {user_id}, ингредиент {ingredient_id}: '
+                f'ожидается {expected}, сохранено {stored}.'
+            )
+        if not options['fix']:
+            raise CommandError(f'Найдено расхождений: {len(drift)}.')
+        ShoppingTotal.objects.rebuild(
+            {user_id for user_id, *_ in drift})
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено расхождений: {len(drift)}.'))
@@ -1,30 +1,18 @@
-from django.core.management.base import BaseCommand
-import os
-import csv
-
+from api.cache import bump_catalog_version
+from foodgram_backend.loaders import BulkLoadCommand
 from recipes.models import Ingredient
 
 
-class Command(BaseCommand):
+class Command(BulkLoadCommand):
+    help = 'Загружает ингредиенты из CSV или JSON файлов.'
+    csv_fieldnames = ('name', 'measurement_unit')
+    success_message = 'Ингредиенты успешно созданы в базе данных.'
 
-    def add_arguments(self, parser):
-        parser.add_argument('csv_file', nargs='+', type=str)
+    def build_objects(self, row, line_number):
+        return [Ingredient(
+            name=row['name'],
+            measurement_unit=row['measurement_unit']
+        )]
 
-    def handle(self, *args, **options):
-        ingredients_to_create = []
-        for csv_file_path in options['csv_file']:
-            if os.path.exists(csv_file_path):
-                with open(csv_file_path, 'r', encoding='utf-8') as file:
-                    reader = csv.reader(file)
-                    for row in reader:
-                        ingredient = Ingredient(
-                            name=row[0],
-                            measurement_unit=row[1]
-                        )
-                        ingredients_to_create.append(ingredient)
-                    Ingredient.objects.bulk_create(ingredients_to_create)
-                    self.stdout.write(self.style.SUCCESS(
-                        'Ингредиенты успешно созданы в базе данных.'))
-            else:
-                self.stderr.write(self.style.ERROR(
-                    f'Файл отсутствует: {csv_file_path}'))
+    def finish(self):
+        bump_catalog_version('ingredients')
@@ -1,58 +1,106 @@
-import os
-import csv
-
-from django.core.management.base import BaseCommand
-
+from foodgram_backend.loaders import BulkLoadCommand
+from recipes.models import Ingredient, IngredientsInRecipe, Recipe, Tag
 from users.models import CustomUser
-from recipes.models import Recipe
 
 
-class Command(BaseCommand):
+class Command(BulkLoadCommand):
+    help = 'Загружает рецепты с ингредиентами и тегами из CSV или JSON.'
+    csv_delimiter = ';'
+    success_message = 'Рецепты успешно созданы.'
+
+    def prepare(self):
+        self.authors = dict(
+            CustomUser.objects.values_list('username', 'id'))
+        self.ingredients = set(
+            Ingredient.objects.values_list('id', flat=True))
+        self.tags = set(Tag.objects.values_list('id', flat=True))
+        self.existing = set(Recipe.objects.values_list('author_id', 'name'))
 
-    def add_arguments(self, parser):
-        parser.add_argument('csv_file', nargs='+', type=str)
+    def parse_row(self, row, line_number):
+        """Разбирает строку файла, возвращает None при ошибках в ней."""
+        author_id = self.authors.get(row['author_username'])
+        if author_id is None:
+            self.report_error(
+                f'Не найден автор {row["author_username"]}.', line_number)
+            return None
+        try:
+            ingredients_id = [
+                int(value) for value in str(row['ingredients_id']).split(',')]
+            ingredients_amount = [
+                int(value)
+                for value in str(row['ingredients_amount']).split(',')
+            ]
+            tags_id = [int(value) for value in str(row['tags']).split(',')]
+        except ValueError:
+            self.report_error('Значения должны быть целыми числами.',
+                              line_number)
+            return None
+        if len(ingredients_id) != len(ingredients_amount):
+            self.report_error(
+                'Не совпадает количество в столбце ingredients_id и '
+                'количество значений в столбце ingredients_amount.',
+                line_number
+            )
+            return None
+        unknown = (
+            set(ingredients_id) - self.ingredients
+        ) | (set(tags_id) - self.tags)
+        if unknown:
+            self.report_error(
+                f'Не найдены ингредиенты или теги: {sorted(unknown)}.',
+                line_number
+            )
+            return None
+        return (
+            author_id, list(zip(ingredients_id, ingredients_amount)), tags_id)
 
-    def handle(self, *args, **options):
-        for csv_file_path in options['csv_file']:
-            if os.path.exists(csv_file_path):
-                with open(csv_file_path, 'r', encoding='utf-8-sig') as file:
-                    reader = csv.DictReader(file, delimiter=';')
-                    line_number = 1
-                    for row in reader:
-                        line_number += 1
-                        author = CustomUser.objects.get(
-                            username=row['author_username'])
-                        recipe = Recipe.objects.create(
-                            name=row['name'],
-                            text=row['text'],
-                            cooking_time=row['cooking_time'],
-                            image=row['image'],
-                            author=author
-                        )
-                        ingredients_id = row['ingredients_id'].split(',')
-                        ingredients_amount = (
-                            row['ingredients_amount'].split(','))
-                        try:
-                            if len(ingredients_id) != len(ingredients_amount):
-                                raise ValueError(
-                                    'Не совпадает количество в столбце '
-                                    'ingredients_id и количество значений'
-                                    ' в столбце ingredients_amount. '
-                                    f'Номер строки: {line_number}'
-                                )
-                            for item in range(len(ingredients_id)):
-                                recipe.ingredients_in_recipe.create(
-                                    ingredient_id=int(ingredients_id[item]),
-                                    amount=int(ingredients_amount[item])
-                                )
-                            tags_id = row['tags'].split(',')
-                            for tag in tags_id:
-                                recipe.tags.add(int(tag))
-                        except ValueError as error:
-                            self.stdout.write(self.style.ERROR(str(error)))
-                    line_number -= 1
-                    self.stdout.write(self.style.SUCCESS(
-                        f'Рецепты успешно созданы, {line_number} шт'))
-            else:
-                self.stderr.write(self.style.ERROR(
-                    f'Отсутствует файл: {csv_file_path}'))
+    def load_chunk(self, rows, offset):
+        parsed = {}
+        recipes = []
+        for line_number, row in enumerate(rows, start=offset + 1):
+            key = (self.authors.get(row['author_username']), row['name'])
+            if key in self.existing or key in parsed:
+                continue
+            relations = self.parse_row(row, line_number)
+            if relations is None:
+                continue
+            parsed[key] = relations
+            recipes.append(Recipe(
+                name=row['name'],
+                text=row['text'],
+                cooking_time=row['cooking_time'],
+                image=row['image'],
+                author_id=relations[0],
+                ingredients_count=len(relations[1])
+            ))
+        if not recipes:
+            return
+        Recipe.objects.bulk_create(recipes)
+        recipe_ids = {
+            (author_id, name): recipe_id
+            for recipe_id, author_id, name in Recipe.objects.filter(
+                author_id__in={author_id for author_id, _ in parsed},
+                name__in={name for _, name in parsed}
+            ).values_list('id', 'author_id', 'name')
+        }
+        ingredients_in_recipe = []
+        recipe_tags = []
+        for key, (_, ingredients, tags_id) in parsed.items():
+            recipe_id = recipe_ids[key]
+            ingredients_in_recipe.extend(
+                IngredientsInRecipe(
+                    recipe_id=recipe_id,
+                    ingredient_id=ingredient_id,
+                    amount=amount
+                ) for ingredient_id, amount in ingredients
+            )
+            recipe_tags.extend(
+                Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+                for tag_id in tags_id
+            )
+        IngredientsInRecipe.objects.bulk_create(ingredients_in_recipe)
+        Recipe.tags.through.objects.bulk_create(
+            recipe_tags, ignore_conflicts=True)
+        Recipe.objects.filter(
+            pk__in=recipe_ids.values()).update_search_index()
+        self.existing.update(parsed)
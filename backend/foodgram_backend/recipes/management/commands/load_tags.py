@@ -1,29 +1,15 @@
-import os
-import csv
-
-from django.core.management.base import BaseCommand
-
+from api.cache import bump_catalog_version
+from foodgram_backend.loaders import BulkLoadCommand
 from recipes.models import Tag
 
 
-class Command(BaseCommand):
+class Command(BulkLoadCommand):
+    help = 'Загружает теги из CSV или JSON файлов.'
+    csv_fieldnames = ('name', 'color', 'slug')
+    success_message = 'Теги успешно созданы в базе данных.'
 
-    def add_arguments(self, parser):
-        parser.add_argument('csv_file', nargs='+', type=str)
+    def build_objects(self, row, line_number):
+        return [Tag(name=row['name'], color=row['color'], slug=row['slug'])]
 
-    def handle(self, *args, **options):
-        for csv_file_path in options['csv_file']:
-            if os.path.exists(csv_file_path):
-                with open(csv_file_path, 'r', encoding='utf-8-sig') as file:
-                    reader = csv.reader(file)
-                    for row in reader:
-                        Tag.objects.create(
-                            name=row[0],
-                            color=row[1],
-                            slug=row[2]
-                        )
-                    self.stdout.write(self.style.SUCCESS(
-                        'Теги успешно созданы в базе данных.'))
-            else:
-                self.stderr.write(self.style.ERROR(
-                    f'Файл отсутствует: {csv_file_path}'))
+    def finish(self):
+        bump_catalog_version('tags')
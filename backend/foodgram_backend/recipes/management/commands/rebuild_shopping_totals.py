@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from recipes.models import ShoppingTotal
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает суммы ингредиентов в корзинах покупок заново '
+        'для указанных пользователей или для всех.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('user_ids', nargs='*', type=int)
+
+    def handle(self, *args, **options):
+        created = ShoppingTotal.objects.rebuild(options['user_ids'] or None)
+        self.stdout.write(self.style.SUCCESS(
+            f'Суммы корзин пересчитаны, строк: {created}.'))
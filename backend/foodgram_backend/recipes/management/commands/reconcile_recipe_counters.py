@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает счётчики избранного, корзины и ингредиентов '
+        'рецептов, разошедшиеся с данными.'
+    )
+
+    def handle(self, *args, **options):
+        fixed = Recipe.objects.reconcile_counters()
+        self.stdout.write(self.style.SUCCESS(
+            f'Счётчики пересчитаны, исправлено рецептов: {fixed}.'))
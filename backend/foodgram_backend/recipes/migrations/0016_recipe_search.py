@@ -0,0 +1,76 @@
+# Generated by Django 3.2.16 on 2026-10-18 06:27
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+INGREDIENT_NAMES_SQL = (
+    'COALESCE(('
+    'SELECT {aggregate} '
+    'FROM recipes_ingredientsinrecipe AS item '
+    'INNER JOIN recipes_ingredient AS ingredient '
+    'ON ingredient.id = item.ingredient_id '
+    "WHERE item.recipe_id = recipe.id), '')"
+)
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        ingredient_names = INGREDIENT_NAMES_SQL.format(
+            aggregate="string_agg(ingredient.name, ' ')")
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS recipes_recipe_search_vector_gin '
+            'ON recipes_recipe USING gin (search_vector)'
+        )
+        schema_editor.execute(
+            'UPDATE recipes_recipe AS recipe SET search_vector = '
+            "setweight(to_tsvector('russian', recipe.name), 'A') || "
+            f"setweight(to_tsvector('russian', {ingredient_names}), 'B') || "
+            "setweight(to_tsvector('russian', recipe.text), 'C')"
+        )
+    elif vendor == 'sqlite':
+        ingredient_names = INGREDIENT_NAMES_SQL.format(
+            aggregate="group_concat(ingredient.name, ' ')")
+        schema_editor.execute(
+            'CREATE VIRTUAL TABLE IF NOT EXISTS recipes_recipe_fts '
+            'USING fts5(name, ingredients, text, '
+            "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+        )
+        schema_editor.execute(
+            'CREATE TRIGGER IF NOT EXISTS recipes_recipe_fts_delete '
+            'AFTER DELETE ON recipes_recipe BEGIN '
+            'DELETE FROM recipes_recipe_fts WHERE rowid = old.id; END'
+        )
+        schema_editor.execute(
+            'INSERT OR REPLACE INTO recipes_recipe_fts '
+            '(rowid, name, ingredients, text) '
+            f'SELECT recipe.id, recipe.name, {ingredient_names}, recipe.text '
+            'FROM recipes_recipe AS recipe'
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            'DROP INDEX IF EXISTS recipes_recipe_search_vector_gin')
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            'DROP TRIGGER IF EXISTS recipes_recipe_fts_delete')
+        schema_editor.execute('DROP TABLE IF EXISTS recipes_recipe_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0015_recipe_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 3.2.16 on 2026-10-18 06:33
+
+from django.db import migrations, models
+from django.db.models import Count, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def remove_duplicates(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    for model_name, counter_field in (
+        ('Favorites', 'favorites_count'),
+        ('ShoppingCart', 'shopping_cart_count'),
+    ):
+        model = apps.get_model('recipes', model_name)
+        duplicates = model.objects.values('user', 'recipe').annotate(
+            first_id=Min('id'), count=Count('id')
+        ).filter(count__gt=1).order_by()
+        recipe_ids = set()
+        for duplicate in duplicates:
+            model.objects.filter(
+                user=duplicate['user'], recipe=duplicate['recipe']
+            ).exclude(id=duplicate['first_id']).delete()
+            recipe_ids.add(duplicate['recipe'])
+        if recipe_ids:
+            Recipe.objects.filter(pk__in=recipe_ids).update(**{
+                counter_field: Coalesce(Subquery(
+                    model.objects.filter(recipe=OuterRef('pk')).order_by(
+                    ).values('recipe').annotate(
+                        count=Count('pk')).values('count')
+                ), 0)
+            })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0016_recipe_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='favorites',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_favorites_user_recipe'),
+        ),
+        migrations.AddConstraint(
+            model_name='shoppingcart',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_shoppingcart_user_recipe'),
+        ),
+    ]
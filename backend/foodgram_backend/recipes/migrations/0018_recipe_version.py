@@ -0,0 +1,19 @@
+# Generated by Django 3.2.16 on 2026-10-18 06:58
+
+from django.db import migrations, models
+import recipes.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0017_unique_user_recipe'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='version',
+            field=models.BigIntegerField(default=recipes.models.get_recipe_version, editable=False, verbose_name='Версия'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 3.2.16 on 2026-10-18 07:04
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F, Sum
+import django.db.models.deletion
+
+
+def fill_totals(apps, schema_editor):
+    ShoppingCart = apps.get_model('recipes', 'ShoppingCart')
+    ShoppingTotal = apps.get_model('recipes', 'ShoppingTotal')
+    totals = ShoppingCart.objects.filter(
+        recipe__ingredients_in_recipe__isnull=False
+    ).values(
+        'user_id',
+        ingredient_id=F('recipe__ingredients_in_recipe__ingredient'),
+    ).annotate(
+        amount=Sum('recipe__ingredients_in_recipe__amount')
+    ).order_by()
+    ShoppingTotal.objects.bulk_create(
+        (ShoppingTotal(**total) for total in totals.iterator()),
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0018_recipe_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShoppingTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.IntegerField(verbose_name='Количество')),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_totals', to='recipes.ingredient', verbose_name='Ингредиент')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_totals', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Сумма ингредиента в корзине',
+                'verbose_name_plural': 'Суммы ингредиентов в корзинах',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='shoppingtotal',
+            constraint=models.UniqueConstraint(fields=('user', 'ingredient'), name='unique_shopping_total'),
+        ),
+        migrations.RunPython(fill_totals, migrations.RunPython.noop),
+    ]
@@ -1,19 +1,50 @@
-from django.db import models
+import hashlib
+import re
+import time
+from collections import Counter, defaultdict
+
+from django.contrib.postgres.search import (
+    SearchQuery, SearchRank, SearchVector, SearchVectorField)
+from django.db import connections, models, transaction
+from django.db.models import (
+    Count, F, OuterRef, Prefetch, Q, Subquery, Sum, Value, Window)
+from django.db.models.functions import Coalesce, Greatest, RowNumber
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator, MaxValueValidator
 from colorfield import fields
 
 from users.models import CustomUser
+from foodgram_backend.queries import (
+    bulk_insert_or_ignore,
+    delete_returning,
+    insert_or_ignore,
+    upsert_increment
+)
 from foodgram_backend.constants import (
     MAX_ACCEPTABLE_VALUE,
     MAX_RECIPES_CHARFIELD_LENGTH,
-    MIN_ACCEPTABLE_VALUE
+    MIN_ACCEPTABLE_VALUE,
+    RECIPE_SEARCH_CONFIG,
+    RECIPE_SEARCH_WEIGHTS
 )
 
 
 User = get_user_model()
 
 
+def get_recipe_version():
+    """Возвращает новую версию рецепта - текущее время в миллисекундах."""
+    return int(time.time() * 1000)
+
+
+def get_file_digest(file):
+    """Возвращает SHA-256 содержимого файла, читая его частями."""
+    digest = hashlib.sha256()
+    for chunk in file.chunks():
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
 class Tag(models.Model):
     """Модель тегов к рецептам."""
 
@@ -68,6 +99,185 @@ class Ingredient(models.Model):
         return self.name
 
 
+class RecipeQuerySet(models.QuerySet):
+    """Набор запросов рецептов с подготовкой данных для сериализации."""
+
+    def with_related(self):
+        """Подгружает автора, теги и ингредиенты рецептов заранее."""
+        return self.select_related('author').prefetch_related(
+            'tags',
+            Prefetch(
+                'ingredients_in_recipe',
+                queryset=IngredientsInRecipe.objects.select_related(
+                    'ingredient')
+            )
+        )
+
+    def latest_by_author(self, author_ids, limit=None):
+        """Возвращает последние рецепты авторов одним запросом.
+
+        Рецепты группируются в словарь по id автора. При заданном limit
+        для каждого автора отбирается не более limit рецептов: оконной
+        функцией ROW_NUMBER() там, где база данных её поддерживает,
+        иначе отсечением лишних рецептов на стороне Python.
+        """
+        queryset = self.filter(author_id__in=author_ids)
+        recipes = defaultdict(list)
+        if limit is not None and connections[
+            self.db
+        ].features.supports_over_clause:
+            sql, params = queryset.annotate(
+                row_number=Window(
+                    expression=RowNumber(),
+                    partition_by=F('author_id'),
+                    order_by=(F('pub_date').desc(), F('id').desc())
+                )
+            ).order_by().query.sql_with_params()
+            queryset = self.raw(
+                f'SELECT * FROM ({sql}) ranked '
+                'WHERE ranked.row_number <= %s '
+                'ORDER BY ranked.author_id, ranked.row_number',
+                (*params, limit),
+                using=self.db
+            )
+            limit = None
+        else:
+            queryset = queryset.order_by('author_id', '-pub_date', '-id')
+        for recipe in queryset:
+            author_recipes = recipes[recipe.author_id]
+            if limit is None or len(author_recipes) < limit:
+                author_recipes.append(recipe)
+        return recipes
+
+    def bump_version(self):
+        """Увеличивает версии рецептов, делая устаревшими их кэши."""
+        return self.update(version=Greatest(
+            Value(get_recipe_version()), F('version') + 1))
+
+    def refresh_ingredients(self):
+        """Обновляет рецепты после изменения их ингредиентов в обход API.
+
+        Пересчитывает число ингредиентов, поисковый индекс и версии
+        рецептов набора запросов.
+        """
+        self.update(ingredients_count=Coalesce(Subquery(
+            IngredientsInRecipe.objects.filter(
+                recipe=OuterRef('pk')
+            ).order_by().values('recipe').annotate(
+                count=Count('pk')).values('count')
+        ), 0))
+        self.update_search_index()
+        self.bump_version()
+
+    def reconcile_counters(self):
+        """Пересчитывает счётчики рецептов, разошедшиеся с данными.
+
+        Счётчики меняются при каждой записи связей через менеджер, модель
+        или набор запросов, метод лишь исправляет расхождения после
+        bulk_create() или ручных правок базы. Возвращает количество
+        исправленных рецептов.
+        """
+        actual = {
+            counter_field: Coalesce(Subquery(
+                model.objects.filter(recipe=OuterRef('pk')).order_by().values(
+                    'recipe').annotate(count=Count('pk')).values('count')
+            ), 0)
+            for counter_field, model in (
+                ('favorites_count', Favorites),
+                ('shopping_cart_count', ShoppingCart),
+                ('ingredients_count', IngredientsInRecipe),
+            )
+        }
+        drifted = self.annotate(**{
+            f'actual_{field}': value for field, value in actual.items()
+        }).filter(
+            ~Q(favorites_count=F('actual_favorites_count'))
+            | ~Q(shopping_cart_count=F('actual_shopping_cart_count'))
+            | ~Q(ingredients_count=F('actual_ingredients_count'))
+        ).values_list('pk', flat=True)
+        return self.model.objects.filter(pk__in=list(drifted)).update(
+            **actual)
+
+    def search(self, query):
+        """Ищет рецепты по названию, ингредиентам и описанию.
+
+        Рецепты сортируются по релевантности. На PostgreSQL поиск идёт
+        по полю search_vector с GIN-индексом, на SQLite - по таблице
+        FTS5 recipes_recipe_fts, где последнее слово запроса ищется
+        как префикс. Индекс поддерживается методом update_search_index().
+        """
+        vendor = connections[self.db].vendor
+        if vendor == 'postgresql':
+            search_query = SearchQuery(query, config=RECIPE_SEARCH_CONFIG)
+            return self.filter(search_vector=search_query).annotate(
+                search_rank=SearchRank(F('search_vector'), search_query)
+            ).order_by('-search_rank', '-pub_date', '-id')
+        if vendor == 'sqlite':
+            words = re.findall(r'\w+', query)
+            if not words:
+                return self.none()
+            match = ' '.join(f'"{word}"' for word in words) + '*'
+            weights = ', '.join(map(str, RECIPE_SEARCH_WEIGHTS.values()))
+            return self.extra(
+                select={
+                    'search_rank': f'bm25(recipes_recipe_fts, {weights})'
+                },
+                tables=['recipes_recipe_fts'],
+                where=[
+                    'recipes_recipe_fts.rowid = recipes_recipe.id',
+                    'recipes_recipe_fts MATCH %s',
+                ],
+                params=[match],
+            ).order_by('search_rank', '-pub_date', '-id')
+        return self.filter(
+            Q(name__icontains=query)
+            | Q(text__icontains=query)
+            | Q(ingredients__name__icontains=query)
+        ).distinct()
+
+    def update_search_index(self):
+        """Обновляет поисковый индекс рецептов из набора запросов."""
+        connection = connections[self.db]
+        if connection.vendor == 'postgresql':
+            from django.contrib.postgres.aggregates import StringAgg
+
+            ingredient_names = Coalesce(Subquery(
+                IngredientsInRecipe.objects.filter(
+                    recipe=OuterRef('pk')
+                ).order_by().values('recipe').annotate(
+                    names=StringAgg('ingredient__name', ' ')
+                ).values('names')
+            ), Value(''))
+            self.model.objects.filter(
+                pk__in=self.values('pk')
+            ).update(search_vector=(
+                SearchVector(
+                    'name', weight='A', config=RECIPE_SEARCH_CONFIG)
+                + SearchVector(
+                    ingredient_names, weight='B',
+                    config=RECIPE_SEARCH_CONFIG)
+                + SearchVector(
+                    'text', weight='C', config=RECIPE_SEARCH_CONFIG)
+            ))
+        elif connection.vendor == 'sqlite':
+            ids_sql, params = self.order_by().values(
+                'pk').query.get_compiler(self.db).as_sql()
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'INSERT OR REPLACE INTO recipes_recipe_fts '
+                    '(rowid, name, ingredients, text) '
+                    'SELECT recipe.id, recipe.name, COALESCE(('
+                    'SELECT group_concat(ingredient.name, \' \') '
+                    'FROM recipes_ingredientsinrecipe AS item '
+                    'INNER JOIN recipes_ingredient AS ingredient '
+                    'ON ingredient.id = item.ingredient_id '
+                    'WHERE item.recipe_id = recipe.id), \'\'), recipe.text '
+                    f'FROM recipes_recipe AS recipe WHERE recipe.id IN '
+                    f'({ids_sql})',
+                    params
+                )
+
+
 class Recipe(models.Model):
     """Модель рецептов."""
 
@@ -82,6 +292,18 @@ class Recipe(models.Model):
         verbose_name='Изображение',
         upload_to='recipes/images/'
     )
+    image_digest = models.CharField(
+        verbose_name='Хэш изображения',
+        max_length=64,
+        blank=True,
+        editable=False
+    )
+    image_variants = models.JSONField(
+        verbose_name='Уменьшенные копии изображения',
+        default=dict,
+        blank=True,
+        editable=False
+    )
     cooking_time = models.PositiveSmallIntegerField(
         verbose_name='Время приготовления (мин.)',
         validators=[
@@ -117,15 +339,78 @@ class Recipe(models.Model):
         verbose_name='Дата и время публикации',
         auto_now_add=True
     )
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='Добавлено в избранное кол-во раз',
+        default=0,
+        editable=False
+    )
+    shopping_cart_count = models.PositiveIntegerField(
+        verbose_name='Добавлено в корзину кол-во раз',
+        default=0,
+        editable=False
+    )
+    ingredients_count = models.PositiveIntegerField(
+        verbose_name='Количество ингредиентов',
+        default=0,
+        editable=False
+    )
+    search_vector = SearchVectorField(
+        verbose_name='Поисковый вектор',
+        null=True,
+        editable=False
+    )
+    version = models.BigIntegerField(
+        verbose_name='Версия',
+        default=get_recipe_version,
+        editable=False
+    )
+
+    objects = RecipeQuerySet.as_manager()
+
+    derived_fields = (
+        'favorites_count', 'shopping_cart_count', 'search_vector', 'version',
+        'image_variants'
+    )
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ('-pub_date',)
+        indexes = (
+            models.Index(
+                fields=('-pub_date', '-id'),
+                name='recipe_pub_date_id_idx'
+            ),
+            models.Index(
+                fields=('-favorites_count', '-id'),
+                name='recipe_favorites_count_idx'
+            ),
+        )
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        """Сохраняет рецепт, не перезаписывая счётчики и поисковый вектор.
+
+        Счётчики меняются только атомарными F()-выражениями, поисковый
+        вектор - методом update_search_index(), версия - методом
+        bump_version(), а уменьшенные копии изображения записывает поток
+        обработки изображений, поэтому сохранение ранее загруженного
+        экземпляра не должно затирать их. Для нового файла изображения
+        запоминается его хэш, по которому повторная загрузка того же файла
+        пропускается.
+        """
+        if self.image and not self.image._committed:
+            self.image_digest = get_file_digest(self.image)
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.derived_fields
+            ]
+        super().save(*args, **kwargs)
+
 
 class IngredientsInRecipe(models.Model):
     """Модель ингредиентов и их количества в рецепте."""
@@ -168,8 +453,109 @@ class IngredientsInRecipe(models.Model):
         return f'{self.ingredient.name} в рецепте "{self.recipe}"'
 
 
+class UserRecipeRelationQuerySet(models.QuerySet):
+    """Набор запросов связей рецептов с пользователями."""
+
+    def delete(self):
+        """Удаляет связи одним запросом, уменьшая счётчики рецептов.
+
+        Изменения применяются только для строк, удалённых этим запросом,
+        поэтому одновременное удаление тех же связей не уменьшает
+        счётчики дважды.
+        """
+        with transaction.atomic(using=self.db, savepoint=False):
+            pairs = delete_returning(self, 'user_id', 'recipe_id')
+            self.model.objects.relations_changed(pairs, -1)
+        return len(pairs), {self.model._meta.label: len(pairs)}
+
+
+class UserRecipeRelationManager(
+    models.Manager.from_queryset(UserRecipeRelationQuerySet)
+):
+    """Менеджер связей рецептов с пользователями.
+
+    Связи создаются и удаляются одним запросом, а изменения счётчика
+    рецепта, имя которого задаётся атрибутом counter_field модели,
+    применяются методом relations_changed() только для строк, которые
+    этот запрос действительно вставил или удалил. Повторные и
+    одновременные запросы не создают дубликатов благодаря ограничению
+    уникальности и не меняют счётчики дважды.
+    """
+
+    def relations_changed(self, pairs, sign):
+        """Вызывается в транзакции после создания или удаления связей.
+
+        pairs - пары (user_id, recipe_id) вставленных при sign=1 или
+        удалённых при sign=-1 связей. Счётчики рецептов меняются одним
+        запросом на каждое число изменившихся связей рецепта.
+        """
+        counts = defaultdict(list)
+        for recipe_id, count in Counter(
+            recipe_id for _, recipe_id in pairs
+        ).items():
+            counts[count].append(recipe_id)
+        counter_field = self.model.counter_field
+        for count, recipe_ids in counts.items():
+            Recipe.objects.filter(pk__in=recipe_ids).update(
+                **{counter_field: F(counter_field) + count * sign})
+
+    def add(self, user_id, recipe_id):
+        """Создаёт связь и увеличивает счётчик рецепта.
+
+        Возвращает False, если связь уже существовала.
+        """
+        with transaction.atomic(using=self.db):
+            added = insert_or_ignore(
+                self.model, user=user_id, recipe=recipe_id)
+            if added:
+                self.relations_changed([(user_id, recipe_id)], 1)
+        return added
+
+    def remove(self, user_id, recipe_id):
+        """Удаляет связь и уменьшает счётчик рецепта.
+
+        Возвращает False, если связи не было.
+        """
+        return bool(self.remove_many(user_id, [recipe_id]))
+
+    def add_many(self, user_id, recipe_ids):
+        """Создаёт связи с несколькими рецептами и увеличивает их счётчики.
+
+        Рецепты recipe_ids должны существовать. Связи вставляются одним
+        запросом с пропуском конфликтов. Возвращает множество id
+        рецептов, связи с которыми были созданы этим запросом.
+        """
+        with transaction.atomic(using=self.db):
+            added = set(bulk_insert_or_ignore(
+                self.model, ('user', 'recipe'),
+                [(user_id, recipe_id) for recipe_id in set(recipe_ids)],
+                'recipe'
+            ))
+            self.relations_changed(
+                [(user_id, recipe_id) for recipe_id in added], 1)
+        return added
+
+    def remove_many(self, user_id, recipe_ids):
+        """Удаляет связи с несколькими рецептами и уменьшает их счётчики.
+
+        Связи удаляются одним запросом DELETE. Возвращает множество id
+        рецептов, связи с которыми были удалены этим запросом.
+        """
+        with transaction.atomic(using=self.db):
+            pairs = delete_returning(
+                self.filter(user_id=user_id, recipe_id__in=recipe_ids),
+                'user_id', 'recipe_id'
+            )
+            self.relations_changed(pairs, -1)
+        return {recipe_id for _, recipe_id in pairs}
+
+
 class UserRecipeRelatedModel(models.Model):
-    """Модель для связи рецептов с пользователями."""
+    """Модель для связи рецептов с пользователями.
+
+    Сохранение и удаление отдельных связей, в том числе из админки,
+    меняют счётчики рецептов так же, как методы менеджера.
+    """
     user = models.ForeignKey(
         CustomUser,
         on_delete=models.CASCADE,
@@ -181,14 +567,75 @@ class UserRecipeRelatedModel(models.Model):
         verbose_name='Рецепт'
     )
 
+    objects = UserRecipeRelationManager()
+
+    counter_field = None
+
     class Meta:
         abstract = True
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'recipe'),
+                name='unique_%(class)s_user_recipe'
+            ),
+        )
+
+    def save(self, *args, **kwargs):
+        """Сохраняет связь, перенося её изменение в счётчики рецептов."""
+        manager = type(self).objects
+        with transaction.atomic(
+            using=kwargs.get('using'), savepoint=False
+        ):
+            old = None if self._state.adding else manager.filter(
+                pk=self.pk).values_list('user_id', 'recipe_id').first()
+            super().save(*args, **kwargs)
+            new = (self.user_id, self.recipe_id)
+            if old != new:
+                if old is not None:
+                    manager.relations_changed([old], -1)
+                manager.relations_changed([new], 1)
+
+    def delete(self, *args, **kwargs):
+        """Удаляет связь, уменьшая счётчик рецепта."""
+        return type(self).objects.filter(pk=self.pk).delete()
+
+
+class ShoppingCartQuerySet(UserRecipeRelationQuerySet):
+    """Набор запросов корзины покупок."""
+
+    def get_totals(self):
+        """Возвращает суммы ингредиентов рецептов корзины по пользователям.
+
+        Строки - словари с ключами user_id, ingredient_id и amount.
+        """
+        return self.filter(
+            recipe__ingredients_in_recipe__isnull=False
+        ).values(
+            'user_id',
+            ingredient_id=F('recipe__ingredients_in_recipe__ingredient'),
+        ).annotate(
+            amount=Sum('recipe__ingredients_in_recipe__amount')
+        ).order_by()
+
+
+class ShoppingCartManager(
+    UserRecipeRelationManager.from_queryset(ShoppingCartQuerySet)
+):
+    """Менеджер корзины, переносящий рецепты в суммы ингредиентов."""
+
+    def relations_changed(self, pairs, sign):
+        super().relations_changed(pairs, sign)
+        ShoppingTotal.objects.apply_cart_change(pairs, sign)
 
 
 class ShoppingCart(UserRecipeRelatedModel):
     """Модель корзины покупок."""
 
-    class Meta:
+    counter_field = 'shopping_cart_count'
+
+    objects = ShoppingCartManager()
+
+    class Meta(UserRecipeRelatedModel.Meta):
         verbose_name = 'Список покупок'
         verbose_name_plural = 'Списки покупок'
         default_related_name = 'shopping_cart'
@@ -200,10 +647,182 @@ class ShoppingCart(UserRecipeRelatedModel):
 class Favorites(UserRecipeRelatedModel):
     """Модель избранных рецептов."""
 
-    class Meta:
+    counter_field = 'favorites_count'
+
+    class Meta(UserRecipeRelatedModel.Meta):
         verbose_name = 'Избранные рецепты'
         verbose_name_plural = 'Избранные рецепты'
         default_related_name = 'favorites'
 
     def __str__(self):
         return f'Рецепт {self.recipe} в избранных {self.user}'
+
+
+class ShoppingTotalManager(models.Manager):
+    """Менеджер сумм ингредиентов в корзинах пользователей.
+
+    Суммы меняются приращениями в той же транзакции, что и корзина или
+    ингредиенты рецептов. Строки с нулевой суммой удаляются.
+    """
+
+    def apply(self, rows, sign=1):
+        """Прибавляет к суммам строки, умноженные на sign.
+
+        rows - словари с ключами user_id, ingredient_id и amount.
+        """
+        deltas = defaultdict(int)
+        for row in rows:
+            deltas[row['user_id'], row['ingredient_id']] += (
+                row['amount'] * sign)
+        deltas = {key: delta for key, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        upsert_increment(
+            self.model, ('user', 'ingredient'), 'amount',
+            [(*key, delta) for key, delta in deltas.items()]
+        )
+        if sign < 0 or any(delta < 0 for delta in deltas.values()):
+            self.filter(
+                user_id__in={user_id for user_id, _ in deltas},
+                amount__lte=0
+            ).delete()
+
+    def apply_cart_change(self, pairs, sign):
+        """Прибавляет к суммам рецепты корзин, умноженные на sign.
+
+        pairs - пары (user_id, recipe_id) добавленных при sign=1 или
+        удалённых при sign=-1 рецептов корзин. Количества читаются из
+        ингредиентов рецептов, а не из корзин, поэтому учитываются только
+        переданные строки.
+        """
+        if not pairs:
+            return
+        amounts = defaultdict(list)
+        rows = IngredientsInRecipe.objects.filter(
+            recipe_id__in={recipe_id for _, recipe_id in pairs}
+        ).values_list('recipe_id', 'ingredient_id', 'amount')
+        for recipe_id, ingredient_id, amount in rows:
+            amounts[recipe_id].append((ingredient_id, amount))
+        self.apply((
+            {'user_id': user_id, 'ingredient_id': ingredient_id,
+             'amount': amount}
+            for user_id, recipe_id in pairs
+            for ingredient_id, amount in amounts[recipe_id]
+        ), sign)
+
+    def apply_recipe_change(self, recipe_id, old_amounts, new_amounts):
+        """Переносит изменение ингредиентов рецепта в суммы корзин.
+
+        old_amounts и new_amounts - словари количеств по id ингредиентов
+        до и после изменения рецепта.
+        """
+        changes = {
+            ingredient_id: new_amounts.get(ingredient_id, 0) - (
+                old_amounts.get(ingredient_id, 0))
+            for ingredient_id in {*old_amounts, *new_amounts}
+        }
+        changes = {
+            ingredient_id: change for ingredient_id, change in changes.items()
+            if change
+        }
+        if not changes:
+            return
+        user_ids = ShoppingCart.objects.filter(
+            recipe_id=recipe_id).values_list('user_id', flat=True)
+        self.apply(
+            {'user_id': user_id, 'ingredient_id': ingredient_id,
+             'amount': change}
+            for user_id in user_ids
+            for ingredient_id, change in changes.items()
+        )
+
+    def get_expected(self, user_ids=None):
+        """Возвращает суммы, посчитанные заново по корзинам."""
+        carts = ShoppingCart.objects.all()
+        if user_ids is not None:
+            carts = carts.filter(user_id__in=user_ids)
+        return {
+            (row['user_id'], row['ingredient_id']): row['amount']
+            for row in carts.get_totals()
+        }
+
+    def rebuild(self, user_ids=None):
+        """Пересчитывает суммы пользователей user_ids или всех заново.
+
+        Возвращает количество созданных строк.
+        """
+        with transaction.atomic(using=self.db):
+            totals = self.all()
+            if user_ids is not None:
+                totals = totals.filter(user_id__in=user_ids)
+            totals.delete()
+            return len(self.bulk_create(
+                (
+                    self.model(
+                        user_id=user_id, ingredient_id=ingredient_id,
+                        amount=amount
+                    )
+                    for (user_id, ingredient_id), amount in
+                    self.get_expected(user_ids).items()
+                ),
+                batch_size=1000
+            ))
+
+    def rebuild_for_recipes(self, recipe_ids):
+        """Пересчитывает суммы пользователей, в корзинах которых рецепты."""
+        return self.rebuild(set(ShoppingCart.objects.filter(
+            recipe_id__in=recipe_ids).values_list('user_id', flat=True)))
+
+    def find_drift(self, user_ids=None):
+        """Возвращает расхождения сумм с корзинами.
+
+        Расхождение - кортеж (user_id, ingredient_id, ожидаемая сумма,
+        сохранённая сумма), отсутствующая сумма считается нулевой.
+        """
+        stored = self.all()
+        if user_ids is not None:
+            stored = stored.filter(user_id__in=user_ids)
+        stored = {
+            (user_id, ingredient_id): amount
+            for user_id, ingredient_id, amount in stored.values_list(
+                'user_id', 'ingredient_id', 'amount')
+        }
+        expected = self.get_expected(user_ids)
+        return sorted(
+            (*key, expected.get(key, 0), stored.get(key, 0))
+            for key in {*expected, *stored}
+            if expected.get(key, 0) != stored.get(key, 0)
+        )
+
+
+class ShoppingTotal(models.Model):
+    """Модель суммы ингредиента в корзине покупок пользователя."""
+
+    user = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        related_name='shopping_totals',
+        verbose_name='Пользователь'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='shopping_totals',
+        verbose_name='Ингредиент'
+    )
+    amount = models.IntegerField(verbose_name='Количество')
+
+    objects = ShoppingTotalManager()
+
+    class Meta:
+        verbose_name = 'Сумма ингредиента в корзине'
+        verbose_name_plural = 'Суммы ингредиентов в корзинах'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'ingredient'),
+                name='unique_shopping_total'
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.ingredient} в корзине {self.user}: {self.amount}'
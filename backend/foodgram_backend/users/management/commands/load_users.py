@@ -1,42 +1,70 @@
 import os
-import csv
+from concurrent.futures import ThreadPoolExecutor
 
-from django.core.management.base import BaseCommand
+from django.contrib.auth.hashers import make_password
 from rest_framework.authtoken.models import Token
 
+from foodgram_backend.loaders import BulkLoadCommand
 from users.models import CustomUser
 
 
-class Command(BaseCommand):
-
-    def add_arguments(self, parser):
-        parser.add_argument('csv_file', nargs='+', type=str)
-
-    def handle(self, *args, **options):
-        for csv_file_path in options['csv_file']:
-            if os.path.exists(csv_file_path):
-                with open(csv_file_path, 'r', encoding='utf-8') as file:
-                    reader = csv.reader(file)
-                    for row in reader:
-                        if row[5] != 'True':
-                            user = CustomUser.objects.create_user(
-                                username=row[0],
-                                first_name=row[1],
-                                last_name=row[2],
-                                email=row[3],
-                                password=row[4]
-                            )
-                        elif row[5] == 'True':
-                            user = CustomUser.objects.create_superuser(
-                                username=row[0],
-                                first_name=row[1],
-                                last_name=row[2],
-                                email=row[3],
-                                password=row[4]
-                            )
-                        Token.objects.get_or_create(user=user)
-                    self.stdout.write(self.style.SUCCESS(
-                        'Пользователи успешно созданы в базе данных.'))
-            else:
-                self.stderr.write(self.style.ERROR(
-                    f'Файл отсутствует: {csv_file_path}'))
+class Command(BulkLoadCommand):
+    help = 'Загружает пользователей из CSV или JSON файлов и создаёт токены.'
+    csv_encoding = 'utf-8'
+    csv_fieldnames = (
+        'username', 'first_name', 'last_name', 'email', 'password',
+        'is_superuser'
+    )
+    required_fields = csv_fieldnames[:-1]
+    success_message = 'Пользователи успешно созданы в базе данных.'
+
+    def prepare(self):
+        self.executor = ThreadPoolExecutor(max_workers=os.cpu_count())
+
+    def finish(self):
+        self.executor.shutdown()
+
+    def load_chunk(self, rows, offset):
+        """Создаёт новых пользователей пачки и их токены.
+
+        Строки с незаполненными обязательными столбцами пропускаются с
+        сообщением об ошибке.
+
+        Пароли хешируются параллельно в пуле потоков: PBKDF2 отпускает
+        GIL, поэтому хеширование пачки занимает время одного-двух хешей
+        на ядро процессора.
+        """
+        rows = [
+            row for line_number, row in enumerate(rows, start=offset + 1)
+            if self.is_complete(row, line_number)
+        ]
+        usernames = [row['username'] for row in rows]
+        existing = set(CustomUser.objects.filter(
+            username__in=usernames
+        ).values_list('username', flat=True))
+        rows = [row for row in rows if row['username'] not in existing]
+        passwords = self.executor.map(
+            make_password, [row['password'] for row in rows])
+        users = []
+        for row, password in zip(rows, passwords):
+            is_superuser = str(row.get('is_superuser')) == 'True'
+            users.append(CustomUser(
+                username=row['username'],
+                first_name=row['first_name'],
+                last_name=row['last_name'],
+                email=CustomUser.objects.normalize_email(row['email']),
+                password=password,
+                is_staff=is_superuser,
+                is_superuser=is_superuser
+            ))
+        CustomUser.objects.bulk_create(users, ignore_conflicts=True)
+        Token.objects.bulk_create(
+            [
+                Token(user_id=user_id, key=Token.generate_key())
+                for user_id in CustomUser.objects.filter(
+                    username__in=usernames,
+                    auth_token__isnull=True
+                ).values_list('id', flat=True)
+            ],
+            ignore_conflicts=True
+        )
@@ -1,10 +1,11 @@
-from django.db import models
+from django.db import models, transaction
 from django.db.models import F, Q
 from django.contrib.auth.models import AbstractUser
 from django.contrib.auth.validators import UnicodeUsernameValidator
 
 from foodgram_backend.constants import (
     MAX_USERS_CHARFIELD_LENGTH)
+from foodgram_backend.queries import bulk_insert_or_ignore, delete_returning
 
 
 class CustomUser(AbstractUser):
@@ -41,6 +42,41 @@ class CustomUser(AbstractUser):
         return self.username
 
 
+class SubscriptionManager(models.Manager):
+    """Менеджер подписок с массовым созданием и удалением."""
+
+    def add_many(self, subscriber_id, author_ids):
+        """Подписывает пользователя на нескольких авторов.
+
+        Авторы author_ids должны существовать и не совпадать с
+        подписчиком. Подписки вставляются одним запросом с пропуском
+        конфликтов. Возвращает множество id авторов подписок, созданных
+        этим запросом.
+        """
+        with transaction.atomic(using=self.db):
+            return set(bulk_insert_or_ignore(
+                self.model, ('subscriber', 'subscribed_to'),
+                [(subscriber_id, author_id) for author_id in set(author_ids)],
+                'subscribed_to'
+            ))
+
+    def remove_many(self, subscriber_id, author_ids):
+        """Отписывает пользователя от нескольких авторов одним DELETE.
+
+        Возвращает множество id авторов подписок, удалённых этим запросом.
+        """
+        with transaction.atomic(using=self.db):
+            return {
+                author_id for author_id, in delete_returning(
+                    self.filter(
+                        subscriber_id=subscriber_id,
+                        subscribed_to_id__in=author_ids
+                    ),
+                    'subscribed_to_id'
+                )
+            }
+
+
 class Subscription(models.Model):
     """Класс модели подписок пользователей."""
     subscriber = models.ForeignKey(
@@ -56,6 +92,8 @@ class Subscription(models.Model):
         verbose_name='подписан на'
     )
 
+    objects = SubscriptionManager()
+
     class Meta:
         verbose_name = 'Подписка'
         verbose_name_plural = 'Подписки'